@@ -0,0 +1,99 @@
+"""
+Benchmark of the shared formatting module.
+Compares plugins.formatting against the slicing-loop implementations it replaced,
+over every price and change string in generation_data.json.
+Run from the repository root: python benchmarks/bench_formatting.py
+"""
+import json
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from plugins.formatting import clear_change_memo, format_change, format_magnitude, format_number
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'generation_data.json')
+ROUNDS = 200
+def legacy_format_number(number):
+    """The slicing loop previously in plugins/utils.py"""
+    if isinstance(number, float):
+        num_str = f"{number:f}"
+        if '.' in num_str:
+            num_str = num_str.rstrip('0').rstrip('.') if '.' in num_str else num_str
+    else:
+        num_str = str(number)
+    num_str = num_str.replace(',', '')
+    if '.' in num_str:
+        int_part, dec_part = num_str.split('.')
+    else:
+        int_part, dec_part = num_str, ''
+    if len(int_part) > 3:
+        formatted_int = ''
+        while int_part:
+            formatted_int = int_part[-3:] + (',' + formatted_int if formatted_int else '')
+            int_part = int_part[:-3]
+    else:
+        formatted_int = int_part
+    if dec_part:
+        return f"{formatted_int}.{dec_part}"
+    else:
+        return formatted_int
+def legacy_format_change(change):
+    """The change parser previously in plugins/utils.py"""
+    change = change.strip('()')
+    if '(' in change:
+        change = change.split('(')[1].split(')')[0]
+    parts = change.split()
+    if len(parts) > 1:
+        change_value = parts[-1].replace(',', '')
+    else:
+        change_value = change.replace(',', '')
+    try:
+        formatted_change = legacy_format_number(change_value)
+        if change.startswith('-'):
+            return f"📉 {formatted_change}-"
+        else:
+            return f"📈 {formatted_change}+"
+    except:
+        return change
+def legacy_format_magnitude(price):
+    """The magnitude words previously built in CryptoHandler._format_price"""
+    price = int(price) if price == int(price) else price
+    if price >= 1_000_000_000_000:
+        return f"{price / 1_000_000_000_000:.2f} تریلیون"
+    elif price >= 1_000_000_000:
+        return f"{price / 1_000_000_000:.2f} میلیارد"
+    elif price >= 1_000_000:
+        return f"{price / 1_000_000:.2f} میلیون"
+    elif price >= 1_000:
+        return f"{price / 1_000:.2f} هزار"
+    else:
+        return f"{price:,}"
+def measure(label, func, rounds=ROUNDS):
+    """Print the mean run time of func in microseconds"""
+    func()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = (time.perf_counter() - started) * 1_000_000 / rounds
+    print(f"{label:<40} {elapsed:10.1f} us")
+def main():
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    items = [item for section in ('mainCurrencies', 'minorCurrencies', 'GoldType') for item in data[section]['data']]
+    prices = [item[field] for item in items for field in ('livePrice', 'lowest', 'highest')]
+    changes = [item['change'] for item in items]
+    amounts = [float(price) * 10_000 for price in prices]
+    mismatches = [price for price in prices if format_number(price) != legacy_format_number(price)]
+    print(f"{len(prices)} prices, {len(changes)} changes, {len(mismatches)} number mismatches")
+    measure("format_number (legacy loop)", lambda: [legacy_format_number(p) for p in prices])
+    measure("format_number (grouping)", lambda: [format_number(p) for p in prices])
+    measure("format_number (Persian digits)", lambda: [format_number(p, persian=True) for p in prices])
+    measure("format_change (legacy parse)", lambda: [legacy_format_change(c) for c in changes])
+    def cold_changes():
+        clear_change_memo()
+        return [format_change(c) for c in changes]
+    measure("format_change (cold memo)", cold_changes)
+    measure("format_change (memoized)", lambda: [format_change(c) for c in changes])
+    measure("magnitude words (legacy)", lambda: [legacy_format_magnitude(a) for a in amounts])
+    measure("format_magnitude", lambda: [format_magnitude(a) for a in amounts])
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of the typed ingest path.
+Compares decoding generation_data.json into plain dicts and re-parsing fields per
+request against decoding once into slotted Quote records.
+Run from the repository root: python benchmarks/bench_ingest.py
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from plugins.ingest import JSON_BACKEND, QuoteBook, decode_json
+from plugins.utils import format_number, format_change
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'generation_data.json')
+ROUNDS = 200
+def measure(label, func, rounds=ROUNDS):
+    """Print the mean run time of func in milliseconds"""
+    func()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = (time.perf_counter() - started) * 1000 / rounds
+    print(f"{label:<40} {elapsed:8.3f} ms")
+def measure_memory(label, func):
+    """Print the memory retained by the object returned from func"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print(f"{label:<40} {size / 1024:8.1f} KiB")
+    return result
+def render_from_dicts(data):
+    """Format every quote the way the handlers did before records existed"""
+    for section in ('mainCurrencies', 'minorCurrencies', 'GoldType'):
+        for item in data[section]['data']:
+            format_number(item['livePrice'])
+            format_change(item['change'])
+            format_number(item['lowest'])
+            format_number(item['highest'])
+def render_from_records(book):
+    """Read the pre-parsed fields of every quote"""
+    for quote in book:
+        quote.price_text
+        quote.change_text
+        quote.lowest_text
+        quote.highest_text
+def main():
+    with open(DATA_PATH, 'rb') as f:
+        body = f.read()
+    data = json.loads(body)
+    book = QuoteBook(data)
+    print(f"Payload: {len(body) / 1024:.1f} KiB, {len(book)} quotes, decoder: {JSON_BACKEND}")
+    print("Parse time")
+    measure("json.loads", lambda: json.loads(body))
+    measure(f"decode_json ({JSON_BACKEND})", lambda: decode_json(body))
+    measure("decode_json + QuoteBook", lambda: QuoteBook(decode_json(body)))
+    print("Per-request formatting of the whole board")
+    measure("dicts, parsed on every request", lambda: render_from_dicts(data), ROUNDS * 5)
+    measure("records, parsed once", lambda: render_from_records(book), ROUNDS * 5)
+    print("Retained memory")
+    measure_memory("decoded dicts", lambda: json.loads(body))
+    measure_memory("QuoteBook records", lambda: QuoteBook(data))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark of instrument handler registration at startup.
+Runs the plugin module loaders and the instrument catalog registration from main
+against a recording client in a fresh interpreter and reports time, RSS and module counts.
+Run from the repository root: python benchmarks/bench_startup.py
+"""
+import json
+import os
+import subprocess
+import sys
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHILD = r'''
+import json, os, resource, sys, time
+sys.path.insert(0, os.getcwd())
+import main
+class RecordingClient:
+    """Collects registered handlers instead of talking to Telegram"""
+    def __init__(self):
+        self.registered_message_patterns = set()
+        self.handlers = 0
+    def add_event_handler(self, callback, event=None):
+        self.handlers += 1
+modules_before = len(sys.modules)
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+client = RecordingClient()
+started = time.perf_counter()
+main.register_currency_handlers(client)
+main.register_gold_handlers(client)
+main.instrument_catalog.register(client)
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({
+    'elapsed_ms': elapsed_ms,
+    'rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+    'modules': len(sys.modules) - modules_before,
+    'handlers': client.handlers,
+    'triggers': len(client.registered_message_patterns),
+}))
+'''
+ROUNDS = 5
+def main():
+    runs = []
+    for _ in range(ROUNDS):
+        output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, capture_output=True, text=True, check=True)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run['elapsed_ms'])
+    print(f"{'registration time (best of %d)' % ROUNDS:<40} {best['elapsed_ms']:8.1f} ms")
+    print(f"{'peak RSS growth':<40} {best['rss_kib']:8d} KiB")
+    print(f"{'modules added to sys.modules':<40} {best['modules']:8d}")
+    print(f"{'event handlers registered':<40} {best['handlers']:8d}")
+    print(f"{'triggers claimed':<40} {best['triggers']:8d}")
+if __name__ == '__main__':
+    main()
@@ -1,57 +1,55 @@
 from telethon import events
 from telethon.tl.custom import Button
-from .utils import format_number, format_change, create_currency_buttons
+from .utils import format_number, format_change, create_currency_buttons, create_header_row, NOOP_DATA
 from .constants import ITEMS_PER_PAGE, BASE_CHART_URL
-import math
+from .pages import BoardPages, paginate
+from plugins.edits import edit_if_changed
+from plugins.callbacks import ACTION_MINOR_PAGE, acknowledged, callback_router, encode_callback, notify_error
+def build_minor_currency_pages(data):
+    """Render every page of the minor currencies board."""
+    minor_currencies = data.get('minorCurrencies', {}).get('data', [])
+    chunks = paginate(minor_currencies, ITEMS_PER_PAGE)
+    total_pages = len(chunks)
+    pages = []
+    for page_number, chunk in enumerate(chunks, start=1):
+        all_buttons = []
+        all_buttons.append(create_header_row())
+        for currency in chunk:
+            all_buttons.extend(create_currency_buttons(currency, BASE_CHART_URL))
+        navigation_buttons_row = []
+        if page_number > 1:
+            navigation_buttons_row.append(Button.inline("⬅️ قبلی", data=encode_callback(ACTION_MINOR_PAGE, page=page_number - 1)))
+        navigation_buttons_row.append(Button.inline(f"📄 {page_number}/{total_pages}", data=NOOP_DATA))
+        if page_number < total_pages:
+            navigation_buttons_row.append(Button.inline("بعدی ➡️", data=encode_callback(ACTION_MINOR_PAGE, page=page_number + 1)))
+        all_buttons.append(navigation_buttons_row)
+        all_buttons.append([Button.inline("🏠 صفحه اصلی", data="home")])
+        pages.append((f"📜 لیست ارزهای فرعی (صفحه {page_number}):", all_buttons))
+    return pages
+minor_currency_pages = BoardPages('minor currencies', build_minor_currency_pages)
 async def show_minor_currencies_page(event, page_number, client):
     """Display a paginated list of minor currencies."""
-    data = client.currency_data
-    if not data or 'minorCurrencies' not in data or not data['minorCurrencies'].get('data'):
-        await event.edit("متاسفانه اطلاعات ارزهای فرعی در حال حاضر در دسترس نیست. ❌")
-        return
-    minor_currencies = data['minorCurrencies']['data']
-    total_items = len(minor_currencies)
-    total_pages = max(1, math.ceil(total_items / ITEMS_PER_PAGE))
-    page_number = min(max(1, page_number), total_pages)
-    start_index = (page_number - 1) * ITEMS_PER_PAGE
-    end_index = start_index + ITEMS_PER_PAGE
-    current_page_currencies = minor_currencies[start_index:end_index]
-    if not current_page_currencies and page_number > 1:
-        await event.answer("صفحه دیگری وجود ندارد.", alert=True)
+    rendered = minor_currency_pages.get(client, page_number)
+    if not rendered:
+        await edit_if_changed(event, "متاسفانه اطلاعات ارزهای فرعی در حال حاضر در دسترس نیست. ❌")
         return
-    elif not current_page_currencies and page_number == 1:
-        await event.edit("هیچ ارز فرعی برای نمایش وجود ندارد.")
-        return
-    all_buttons = []
-    all_buttons.append([
-        Button.inline("💱 نوع", b'noop_header'),
-        Button.inline("💰 قیمت", b'noop_header'),
-        Button.inline("📊 تغییر", b'noop_header')
-    ])
-    for currency in current_page_currencies:
-        all_buttons.extend(create_currency_buttons(currency, BASE_CHART_URL))
-    navigation_buttons_row = []
-    if page_number > 1:
-        navigation_buttons_row.append(Button.inline("⬅️ قبلی", data=f"minor_curr_page_{page_number - 1}"))
-    navigation_buttons_row.append(Button.inline(f"📄 {page_number}/{total_pages}", data="noop_page_count"))
-    if end_index < total_items:
-        navigation_buttons_row.append(Button.inline("بعدی ➡️", data=f"minor_curr_page_{page_number + 1}"))
-    if navigation_buttons_row:
-        all_buttons.append(navigation_buttons_row)
-    all_buttons.append([Button.inline("🏠 صفحه اصلی", data="home")])
-    message = f"📜 لیست ارزهای فرعی (صفحه {page_number}):"
+    page_number, total_pages, message, markup = rendered
     try:
         if isinstance(event, events.CallbackQuery.Event):
-            await event.edit(message, buttons=all_buttons)
-            await event.answer()
+            await edit_if_changed(event, message, markup)
         else:
-            await event.respond(message, buttons=all_buttons)
+            await event.respond(message, buttons=markup)
     except Exception as e:
         if isinstance(event, events.CallbackQuery.Event):
-            await event.answer("خطایی در بروزرسانی لیست ارزهای فرعی رخ داد.", alert=True)
+            await notify_error(event, "خطایی در بروزرسانی لیست ارزهای فرعی رخ داد.")
         else:
             await event.respond("خطایی در نمایش لیست ارزهای فرعی رخ داد.")
+@callback_router.route(ACTION_MINOR_PAGE, 'minor_currencies_page', "خطایی در بروزرسانی لیست ارزهای فرعی رخ داد.")
+async def handle_minor_currency_page(event, payload):
+    """Handle minor currency page navigation from a compact callback."""
+    await show_minor_currencies_page(event, payload.page, event.client)
 @events.register(events.CallbackQuery(pattern=r"minor_curr_page_(\d+)"))
+@acknowledged('minor_currencies_page', "خطایی در بروزرسانی لیست ارزهای فرعی رخ داد.")
 async def handle_minor_currency_page_navigation(event):
     """Handle minor currency page navigation via inline buttons."""
     page_number = int(event.pattern_match.group(1))
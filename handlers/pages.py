@@ -0,0 +1,51 @@
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from plugins.snapshot import stale_note
+logger = logging.getLogger(__name__)
+class BoardPages:
+    """All pages of a paginated board, rendered once per cache version"""
+    def __init__(self, name: str, build_pages: Callable[[Dict[str, Any]], List[Tuple[str, list]]]):
+        """Create a board
+        Args:
+            name: Board name used in log messages
+            build_pages: Builds the (message, buttons) pairs of every page from the cached data
+        """
+        self.name = name
+        self._build_pages = build_pages
+        self._version = None
+        self._pages: List[Tuple[str, Any]] = []
+    def _refresh(self, client):
+        """Re-render every page if the cached data changed"""
+        version = client.currency_cache.version
+        if version == self._version:
+            return
+        started = time.perf_counter()
+        data = client.currency_cache.get_data()
+        pages = self._build_pages(data) if data else []
+        self._pages = [(message, client.build_reply_markup(buttons)) for message, buttons in pages]
+        self._version = version
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.debug(f"Rendered {len(self._pages)} {self.name} pages in {elapsed_ms:.1f}ms")
+    def get(self, client, page_number: int) -> Optional[Tuple[int, int, str, Any]]:
+        """Get a rendered page
+        Args:
+            client: The Telegram client holding the currency cache
+            page_number: 1-based page number, clamped to the available pages
+        Returns:
+            Tuple of (page number, total pages, message, reply markup) or None if there is no data,
+            with the message marked while the data is still the restored snapshot
+        """
+        client.currency_cache.note_request()
+        self._refresh(client)
+        if not self._pages:
+            return None
+        page_number = min(max(1, page_number), len(self._pages))
+        message, markup = self._pages[page_number - 1]
+        note = stale_note(client.currency_cache)
+        if note:
+            message = f"{message}\n{note}"
+        return page_number, len(self._pages), message, markup
+def paginate(items: list, per_page: int) -> List[list]:
+    """Split items into pages of at most per_page items"""
+    return [items[i:i + per_page] for i in range(0, len(items), per_page)]
@@ -1,7 +1,10 @@
 from telethon import Button
 from typing import List, Dict, Any
 from .constants import CURRENCY_FLAGS
+from plugins.callbacks import ACTION_NOOP, encode_callback
+from plugins.formatting import format_number, format_change
 COUNTRY_FLAGS_MAP = {item['name']: item['flag'] for item in CURRENCY_FLAGS}
+NOOP_DATA = encode_callback(ACTION_NOOP)
 def get_data_from_cache(client) -> Dict[str, Any]:
     """Get fresh data from cache"""
     return client.currency_cache.get_data()
@@ -17,49 +20,10 @@ def create_home_button() -> List[Button]:
 def create_header_row() -> List[Button]:
     """Create standard header row for rates"""
     return [
-        Button.inline("💱 نوع", b'noop_header'),
-        Button.inline("💰 قیمت", b'noop_header'),
-        Button.inline("📊 تغییر", b'noop_header')
+        Button.inline("💱 نوع", NOOP_DATA),
+        Button.inline("💰 قیمت", NOOP_DATA),
+        Button.inline("📊 تغییر", NOOP_DATA)
     ]
-def format_number(number: str) -> str:
-    """Format number with commas"""
-    try:
-        num_str = str(number).replace(',', '')
-        if len(num_str) > 3:
-            parts = []
-            while num_str:
-                parts.append(num_str[-3:])
-                num_str = num_str[:-3]
-            return ','.join(reversed(parts))
-        return num_str
-    except:
-        return str(number)
-def format_change(change: str) -> str:
-    """Format price change with arrows"""
-    try:
-        change_str = str(change).strip('()')
-        if '(' in str(change):
-            parts_for_percentage = str(change).split('(')
-            if len(parts_for_percentage) > 1:
-                percentage_part = parts_for_percentage[1].split(')')[0]
-            value_part = change_str.split(')')[-1].strip() if ')' in change_str else change_str
-        else:
-            value_part = change_str
-        change_value_numeric = value_part.split()[-1].replace(',', '')
-        formatted_change = format_number(change_value_numeric)
-        is_negative = False
-        try:
-            if float(change_value_numeric) < 0:
-                is_negative = True
-        except ValueError:
-            if str(change).startswith('-'):
-                 is_negative = True
-        if is_negative:
-            return f"📉 {format_number(change_value_numeric.lstrip('-'))}-"
-        else:
-            return f"📈 {formatted_change}+"
-    except Exception as e:
-        return str(change)
 def create_currency_buttons(currency: Dict[str, Any], base_url: str) -> List[List[Button]]:
     """Create buttons for a single currency item with name, price, change, and chart link."""
     raw_name = currency.get('currencyName', 'N/A')
@@ -68,9 +32,10 @@ def create_currency_buttons(currency: Dict[str, Any], base_url: str) -> List[Lis
     price = format_number(currency.get('livePrice', 'N/A'))
     change_value = currency.get('change', 'N/A')
     formatted_change_display = format_change(change_value)
+    data = encode_callback(ACTION_NOOP, raw_name)
     buttons = [
-        [Button.inline(f"{display_name}", data=f"noop_{raw_name.replace(' ', '_')}"),
-         Button.inline(f"{price} ت", data=f"noop_price_{raw_name.replace(' ', '_')}"),
-         Button.inline(f"{formatted_change_display}", data=f"noop_change_{raw_name.replace(' ', '_')}")]
+        [Button.inline(f"{display_name}", data=data),
+         Button.inline(f"{price} ت", data=data),
+         Button.inline(f"{formatted_change_display}", data=data)]
     ]
     return buttons
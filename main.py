@@ -1,11 +1,11 @@
+import time
+BOOT_STARTED = time.perf_counter()
 import os
 import asyncio
+import functools
 import logging
-import glob
-import importlib.util
 import sys
 from typing import List
-import subprocess
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
@@ -23,6 +23,20 @@ from handlers.gold_display import register_handlers as register_gold_display_han
 from plugins.inline_query import register_inline_handlers
 from plugins.crypto import register_crypto_handlers, crypto_cache as crypto_data_cache
 from plugins.user_db import user_db
+from plugins.search import fuzzy_index, register_fuzzy_handlers, is_request_message
+from plugins.edits import edit_if_changed
+from plugins.callbacks import acknowledged, register_callback_handlers
+from plugins.instruments import instrument_catalog
+from plugins.boot import boot_timeline
+from plugins.reloader import plugin_reloader
+from plugins.dispatch import event_dispatcher
+from plugins.outbound import outbound_scheduler
+from plugins.group_replies import group_replies
+from plugins.ratelimit import rate_limiter
+from plugins.conversations import conversations
+from run_migrations import run_migrations, DB_PATH as MIGRATIONS_DB_PATH
+boot_timeline.started = BOOT_STARTED
+boot_timeline.record('imports', BOOT_STARTED, time.perf_counter())
 if sys.platform != 'win32':
     try:
         import uvloop
@@ -36,131 +50,71 @@ API_ID = ''
 API_HASH = ''
 BOT_TOKEN = ''
 ADMIN_IDS = [7150795159]
-def load_module(file_path):
-    """Load a Python module from file path, setting its package context."""
-    module_name_for_spec = None
-    module_object = None
-    try:
-        normalized_file_path = os.path.normpath(file_path)
-        module_name_for_spec = os.path.splitext(normalized_file_path)[0].replace(os.sep, '.')
-        spec = importlib.util.spec_from_file_location(module_name_for_spec, file_path)
-        if spec is None:
-            logger.error(f"Could not create spec for module {file_path} (intended name {module_name_for_spec})")
-            return None
-        module_object = importlib.util.module_from_spec(spec)
-        sys.modules[module_name_for_spec] = module_object
-        spec.loader.exec_module(module_object)
-        return module_object
-    except Exception as e:
-        effective_module_name = module_name_for_spec if module_name_for_spec is not None else "unknown_module_path"
-        if module_object is not None and module_name_for_spec is not None and module_name_for_spec in sys.modules:
-            if sys.modules[module_name_for_spec] is module_object:
-                del sys.modules[module_name_for_spec]
-        logger.error(f"Failed to load module {file_path} (as {effective_module_name}): {e}")
-        return None
+GROUP_COALESCE_WINDOW = 10.0
+ONLINE_MIGRATION_DELAY = 300
 def register_currency_handlers(client):
     """Register all currency handlers from plugins directory"""
-    currency_files = glob.glob('plugins/*.py')
-    for file_path in currency_files:
-        if file_path.endswith(('__init__.py', 'utils.py', 'cache.py', 'currency_template.py', 'generate_handlers.py')):
-            continue
-        module = load_module(file_path)
-        if module and hasattr(module, 'TRIGGERS') and hasattr(module, 'handle_currency'):
-            registered_from_this_file = False
-            for trigger in module.TRIGGERS:
-                pattern_key = f"^{trigger}$"
-                if pattern_key not in client.registered_message_patterns:
-                    client.add_event_handler(
-                        lambda event, current_module=module: asyncio.create_task(self_hosted_handle_currency_wrapper(event, client, current_module)),
-                        events.NewMessage(pattern=pattern_key, incoming=True)
-                    )
-                    client.registered_message_patterns.add(pattern_key)
-                    logger.info(f"Registered currency handler for trigger '{trigger}' from {file_path}")
-                    registered_from_this_file = True
-                else:
-                    logger.warning(f"Skipping duplicate currency handler registration for trigger '{trigger}' from {file_path}. It's already handled.")
-            if registered_from_this_file:
-                 logger.info(f"Successfully processed currency handlers from {file_path}")
+    plugin_reloader.load_directory(client, 'plugins')
 def register_gold_handlers(client):
     """Register all gold handlers from plugins/gold directory"""
-    gold_files = glob.glob('plugins/gold/*.py')
-    for file_path in gold_files:
-        if file_path.endswith(('__init__.py', 'generate_handlers.py')):
-            continue
-        module = load_module(file_path)
-        if module:
-            if hasattr(module, 'TRIGGERS') and hasattr(module, 'handle_gold'):
-                registered_trigger_based_handler = False
-                for trigger in module.TRIGGERS:
-                    pattern_key = f"^{trigger}$"
-                    if pattern_key not in client.registered_message_patterns:
-                        client.add_event_handler(
-                            lambda event, current_module=module: asyncio.create_task(self_hosted_handle_gold_wrapper(event, client, current_module)),
-                            events.NewMessage(pattern=pattern_key, incoming=True)
-                        )
-                        client.registered_message_patterns.add(pattern_key)
-                        logger.info(f"Registered gold handler for trigger '{trigger}' from {file_path}")
-                        registered_trigger_based_handler = True
-                    else:
-                        logger.warning(f"Skipping duplicate gold handler registration for trigger '{trigger}' from {file_path}. It's already handled.")
-                if registered_trigger_based_handler:
-                    logger.info(f"Successfully processed trigger-based gold handlers from {file_path}")
-            elif hasattr(module, 'handle_gold_command'):
-                pattern_key_command = "^/gold$"
-                if pattern_key_command not in client.registered_message_patterns:
-                    client.add_event_handler(
-                        lambda event, current_module=module: asyncio.create_task(self_hosted_handle_gold_command_wrapper(event, client, current_module)),
-                        events.NewMessage(pattern=pattern_key_command)
-                    )
-                    client.registered_message_patterns.add(pattern_key_command)
-                    logger.info(f"Registered gold command handler for '/gold' from {file_path}")
-                else:
-                    logger.warning(f"Skipping duplicate gold command handler registration for '/gold' from {file_path}. It's already handled by another plugin.")
-async def self_hosted_handle_currency_wrapper(event, client, current_module):
-    client.currency_data = client.currency_cache.get_data()
-    await current_module.handle_currency(event, client)
-async def self_hosted_handle_gold_wrapper(event, client, current_module):
-    full_cache_data = client.currency_cache.get_data()
-    client.currency_data = full_cache_data
-    client.gold_data = full_cache_data.get('GoldType', {})
-    await current_module.handle_gold(event, client)
-async def self_hosted_handle_gold_command_wrapper(event, client, current_module):
-    full_cache_data = client.currency_cache.get_data()
-    client.currency_data = full_cache_data
-    client.gold_data = full_cache_data.get('GoldType', {})
-    await current_module.handle_gold_command(event, client)
-async def init_client():
-    """Initialize and connect the client"""
-    global client
+    plugin_reloader.load_directory(client, os.path.join('plugins', 'gold'))
+def create_client():
+    """Create the client from the saved session, without connecting"""
     session_file = 'session.txt'
     if os.path.exists(session_file):
         with open(session_file, 'r') as file:
             session_string = file.read().strip()
-        client = TelegramClient(StringSession(session_string), API_ID, API_HASH)
-    else:
-        client = TelegramClient(StringSession(), API_ID, API_HASH)
-    logger.info("Running database migrations...")
-    try:
-        subprocess.run([sys.executable, 'run_migrations.py'], check=True)
-        logger.info("Database migrations completed successfully")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error running migrations: {e}")
-        raise
-    await client.start(bot_token=BOT_TOKEN)
-    from plugins.admin import AdminPanel
-    admin_panel = AdminPanel(client, user_db, ADMIN_IDS)
-    logger.info("Admin panel initialized")
+        return TelegramClient(StringSession(session_string), API_ID, API_HASH)
+    return TelegramClient(StringSession(), API_ID, API_HASH)
+async def connect_client(client, migrations):
+    """Connect to Telegram and sign in once the schema is ready
+    An authorized session starts receiving updates as soon as it connects, so the
+    connection waits for the migrations; handler registration and the feeds overlap them instead.
+    The bot's username is resolved once here, so handlers build their links without a round trip.
+    Args:
+        client: The client returned by create_client
+        migrations: Future of the migration run; no update is handled before it finishes
+    """
+    session_file = 'session.txt'
     try:
+        await migrations
         logger.info("Connecting to Telegram...")
+        with boot_timeline.phase('connect'):
+            await client.connect()
+        with boot_timeline.phase('sign in'):
+            await client.start(bot_token=BOT_TOKEN)
+            client.bot_username = (await client.get_me()).username
         if not os.path.exists(session_file):
             session_string = client.session.save()
             with open(session_file, 'w') as file:
                 file.write(session_string)
         logger.info("Successfully connected to Telegram!")
-        return client
     except Exception as e:
         logger.error(f"Failed to connect to Telegram: {str(e)}")
         raise
+async def report_boot_timeline(timeout: float = 30):
+    """Wait for the first fresh feed data and log the boot timeline"""
+    def wait_first_data():
+        return currency_cache.wait_fresh(timeout) and crypto_data_cache.wait_fresh(timeout)
+    if not await boot_timeline.run_in_executor('first data', wait_first_data):
+        logger.warning(f"No fresh feed data within {timeout}s of startup")
+    logger.info(f"Boot timeline:\n{boot_timeline.format()}")
+async def run_online_migrations(delay: float = ONLINE_MIGRATION_DELAY):
+    """Apply the online migrations, such as index builds, while the bot is serving
+    They hold the database write lock for the whole build, so they wait until the
+    startup traffic has settled and no handler is queued.
+    Args:
+        delay: Seconds to wait after startup before looking for a quiet moment
+    """
+    await asyncio.sleep(delay)
+    while event_dispatcher.pending:
+        await asyncio.sleep(5)
+    try:
+        applied = await asyncio.get_event_loop().run_in_executor(None, run_migrations, MIGRATIONS_DB_PATH, True)
+        if applied:
+            logger.info(f"Applied {applied} online migration(s)")
+    except Exception as e:
+        logger.error(f"Error running online migrations: {str(e)}")
 client = None
 @events.register(events.NewMessage(pattern='/start'))
 async def start(event):
@@ -168,14 +122,16 @@ async def start(event):
     sender = await event.get_sender()
     logger.info(f"User {sender.id} ({sender.username}) started bot with /start command.")
     try:
-        user_db.add_user(
+        await asyncio.get_event_loop().run_in_executor(None, functools.partial(
+            user_db.add_user,
             user_id=sender.id,
             username=sender.username,
             first_name=sender.first_name,
             last_name=sender.last_name,
             is_bot=sender.bot,
-            language_code=getattr(sender, 'lang_code', None)
-        )
+            language_code=getattr(sender, 'lang_code', None),
+            access_hash=getattr(sender, 'access_hash', None)
+        ))
         logger.info(f"Saved user {sender.id} to database")
     except Exception as e:
         logger.error(f"Error saving user to database: {str(e)}")
@@ -199,58 +155,39 @@ async def start(event):
             [Button.inline("📈 قیمت سایر ارزها", b'cmd_minor_currencies'), Button.inline("₿ قیمت رمزارزها", b'cmd_crypto')],
             [Button.inline("💱 تبدیل ارز", b'cmd_currency_convert')],
             [Button.url("📢 کانال ما", "https://t.me/TelebotCraft"),
-             Button.url("➕ افزودن به گروه", f"https://t.me/{(await event.client.get_me()).username}?startgroup=true")]
+             Button.url("➕ افزودن به گروه", f"https://t.me/{event.client.bot_username}?startgroup=true")]
         ]
         await event.reply(welcome_text, buttons=buttons, parse_mode='html')
     raise events.StopPropagation
 @events.register(events.CallbackQuery(pattern=r"cmd_main_curr"))
+@acknowledged('main_currencies', "خطا در نمایش ارزهای اصلی.")
 async def handle_main_currencies_command(event):
     """Handle main currencies command button"""
-    try:
-        event.client.currency_data = currency_cache.get_data()
-        await show_main_currencies_page(event, 1, event.client)
-        await event.answer()
-    except Exception as e:
-        await event.answer(f"خطا در نمایش ارزهای اصلی: {str(e)}", alert=True)
-    raise events.StopPropagation
+    event.client.currency_data = currency_cache.get_data()
+    await show_main_currencies_page(event, 1, event.client)
 @events.register(events.CallbackQuery(pattern=r"cmd_minor_curr"))
+@acknowledged('minor_currencies', "خطا در نمایش ارزهای فرعی.")
 async def handle_minor_currencies_command(event):
     """Handle minor currencies command button"""
-    try:
-        event.client.currency_data = currency_cache.get_data()
-        await show_minor_currencies_page(event, 1, event.client)
-        await event.answer()
-    except Exception as e:
-        await event.answer(f"خطا در نمایش ارزهای فرعی: {str(e)}", alert=True)
-    raise events.StopPropagation
+    event.client.currency_data = currency_cache.get_data()
+    await show_minor_currencies_page(event, 1, event.client)
 @events.register(events.CallbackQuery(pattern=r"cmd_gold_display"))
+@acknowledged('gold_display', "خطا در نمایش قیمت طلا.")
 async def handle_gold_display_command(event):
     """Handle gold display command button"""
-    try:
-        event.client.currency_data = currency_cache.get_data()
-        await show_gold_page(event, 1, event.client)
-        await event.answer()
-    except Exception as e:
-        await event.answer(f"خطا در نمایش قیمت طلا: {str(e)}", alert=True)
-    raise events.StopPropagation
+    event.client.currency_data = currency_cache.get_data()
+    await show_gold_page(event, 1, event.client)
 @events.register(events.CallbackQuery(pattern=b"cmd_crypto"))
+@acknowledged('crypto_list', "خطا در نمایش ارزهای دیجیتال.")
 async def handle_crypto_command(event):
     """Handle crypto command button"""
-    try:
-        logger.info("Crypto button clicked - using show_crypto_list from crypto_handler.py")
-        await event.respond("🔍 درحال بارگذاری لیست ارزهای دیجیتال... لطفاً صبر کنید.")
-        from plugins.crypto.crypto_handler import show_crypto_list
-        await show_crypto_list(event, event.client)
-        await event.answer()
-    except Exception as e:
-        logger.error(f"Error in crypto command: {str(e)}", exc_info=True)
-        await event.answer(f"خطا در نمایش ارزهای دیجیتال: {str(e)}", alert=True)
-    raise events.StopPropagation
+    from plugins.crypto.crypto_handler import show_crypto_list
+    await show_crypto_list(event, event.client)
 @events.register(events.CallbackQuery(pattern=r"cmd_currency_convert"))
+@acknowledged('currency_convert_help', "خطا در نمایش راهنمای تبدیل ارز.")
 async def handle_currency_convert_command(event):
     """Handle currency conversion command button"""
-    try:
-        help_text = """
+    help_text = """
 💱 راهنمای تبدیل ارز:
 برای تبدیل به تومان، کافیست مقدار و نام ارز را بنویسید:
 • `100 دلار`
@@ -271,21 +208,17 @@ async def handle_currency_convert_command(event):
 • تومان (TOMAN)
 • ریال (IRR)
 و سایر ارزهای موجود در ربات
-        """
-        buttons = [
-            [Button.inline("🏠 بازگشت به خانه", b'home')],
-            [Button.url("📢 کانال ما", "https://t.me/TelebotCraft")]
-        ]
-        await event.edit(help_text, buttons=buttons)
-        await event.answer()
-    except Exception as e:
-        await event.answer(f"خطا در نمایش راهنمای تبدیل ارز: {str(e)}", alert=True)
-    raise events.StopPropagation
+    """
+    buttons = [
+        [Button.inline("🏠 بازگشت به خانه", b'home')],
+        [Button.url("📢 کانال ما", "https://t.me/TelebotCraft")]
+    ]
+    await edit_if_changed(event, help_text, buttons)
 @events.register(events.CallbackQuery(pattern=r"home"))
+@acknowledged('home', "خطا در بازگشت به صفحه اصلی.")
 async def handle_home(event):
     """Handle home button press"""
-    try:
-        welcome_text = """
+    welcome_text = """
 <b>🌟 به ربات نرخ ارز خوش آمدید!</b>
 <b>📈 برای دریافت نرخ لحظه‌ای:</b>
 • دستور /rates را برای مشاهده ارزها ارسال کنید
@@ -298,72 +231,97 @@ async def handle_home(event):
 • نام ارز دیجیتال را به فارسی یا انگلیسی تایپ کنید
 مثال: بیت کوین، btc، اتریوم
 • یا از فرمت «مقدار نام_ارز» استفاده کنید (مثال: 2 btc، ۱۰ اتریوم)
-        """
-        buttons = [
-            [Button.inline("💵 ارزهای اصلی", b'cmd_main_curr'), Button.inline("💴 ارزهای فرعی", b'cmd_minor_curr')],
-            [Button.inline("🥇 قیمت طلا", b'cmd_gold_display'), Button.inline("🪙 ارزهای دیجیتال", b'cmd_crypto')],
-            [Button.inline("💱 تبدیل ارز", b'cmd_currency_convert')],
-            [Button.url("📢 کانال ما", "https://t.me/TelebotCraft"),
-             Button.url("➕ افزودن به گروه", f"https://t.me/{(await event.client.get_me()).username}?startgroup=true")]
-        ]
-        await event.edit(welcome_text, buttons=buttons, parse_mode='html')
-        await event.answer()
-    except Exception as e:
-        await event.answer(f"خطا در بازگشت به صفحه اصلی: {str(e)}", alert=True)
-    raise events.StopPropagation
+    """
+    buttons = [
+        [Button.inline("💵 ارزهای اصلی", b'cmd_main_curr'), Button.inline("💴 ارزهای فرعی", b'cmd_minor_curr')],
+        [Button.inline("🥇 قیمت طلا", b'cmd_gold_display'), Button.inline("🪙 ارزهای دیجیتال", b'cmd_crypto')],
+        [Button.inline("💱 تبدیل ارز", b'cmd_currency_convert')],
+        [Button.url("📢 کانال ما", "https://t.me/TelebotCraft"),
+         Button.url("➕ افزودن به گروه", f"https://t.me/{event.client.bot_username}?startgroup=true")]
+    ]
+    await edit_if_changed(event, welcome_text, buttons, parse_mode='html')
 async def main():
     """Main function to start the bot"""
     try:
         global client
-        client = await init_client()
+        client = create_client()
+        outbound_scheduler.install(client)
+        group_replies.window = GROUP_COALESCE_WINDOW
+        currency_cache.start()
+        crypto_data_cache.start()
+        boot_timeline.mark('feeds started')
+        asyncio.ensure_future(report_boot_timeline())
+        logger.info("Running database migrations...")
+        migrations = asyncio.ensure_future(boot_timeline.run_in_executor('migrations', run_migrations))
+        connect = asyncio.ensure_future(connect_client(client, migrations))
+        await asyncio.sleep(0)
         client.currency_data = None
         client.currency_cache = currency_cache
         client.gold_data = {}
+        client.bot_username = None
         client.registered_message_patterns = set()
-        client.add_event_handler(start)
-        client.add_event_handler(handle_main_currencies_command)
-        client.add_event_handler(handle_minor_currencies_command)
-        client.add_event_handler(handle_gold_display_command)
-        client.add_event_handler(handle_crypto_command)
-        client.add_event_handler(handle_currency_convert_command)
-        client.add_event_handler(handle_home)
-        register_currency_handlers(client)
-        register_gold_handlers(client)
-        register_main_currency_handlers(client)
-        register_minor_currency_handlers(client)
-        register_gold_display_handlers(client)
-        register_inline_handlers(client)
-        logger.info("Registered inline query handlers")
-        register_crypto_handlers(client)
-        logger.info("Registered crypto handlers")
-        from plugins.currency_converter import TRIGGERS as converter_triggers, handle_currency as handle_currency_converter
-        async def handle_currency_converter_wrapper(event):
-            client.currency_data = client.currency_cache.get_data()
-            await handle_currency_converter(event, client)
-        for trigger in converter_triggers:
-            pattern_key = f"^{trigger}$"
-            if pattern_key not in client.registered_message_patterns:
-                client.add_event_handler(
-                    handle_currency_converter_wrapper,
-                    events.NewMessage(pattern=pattern_key, incoming=True)
-                )
-                client.registered_message_patterns.add(pattern_key)
-                logger.info(f"Registered currency converter handler for trigger '{trigger}'")
-        client.add_event_handler(
-            handle_currency_converter_wrapper,
-            events.NewMessage(pattern=r'\d+\s*[a-zA-Z\u0600-\u06FF]+', incoming=True)
-        )
-        logger.info("Registered currency converter handler for amount patterns")
-        from plugins.crypto.crypto_handler import initialize_crypto_plugin
-        initialize_crypto_plugin(client)
-        logger.info("Crypto plugin initialized")
-        currency_cache.start()
-        logger.info("Bot started successfully!")
+        with boot_timeline.phase('core handlers'):
+            rate_limiter.register(client, ADMIN_IDS, is_request_message)
+            conversations.register(client)
+            client.add_event_handler(start)
+            client.add_event_handler(handle_main_currencies_command)
+            client.add_event_handler(handle_minor_currencies_command)
+            client.add_event_handler(handle_gold_display_command)
+            client.add_event_handler(handle_crypto_command)
+            client.add_event_handler(handle_currency_convert_command)
+            client.add_event_handler(handle_home)
+            register_callback_handlers(client)
+        with boot_timeline.phase('plugin load'):
+            register_currency_handlers(client)
+            register_gold_handlers(client)
+            instrument_catalog.load()
+        with boot_timeline.phase('registration'):
+            instrument_catalog.register(client)
+            register_main_currency_handlers(client)
+            register_minor_currency_handlers(client)
+            register_gold_display_handlers(client)
+            register_inline_handlers(client)
+            logger.info("Registered inline query handlers")
+            register_crypto_handlers(client)
+            logger.info("Registered crypto handlers")
+            from plugins.currency_converter import TRIGGERS as converter_triggers, handle_currency as handle_currency_converter
+            async def handle_currency_converter_wrapper(event):
+                client.currency_data = client.currency_cache.get_data()
+                await handle_currency_converter(event, client)
+            for trigger in converter_triggers:
+                pattern_key = f"^{trigger}$"
+                if pattern_key not in client.registered_message_patterns:
+                    client.add_event_handler(
+                        handle_currency_converter_wrapper,
+                        events.NewMessage(pattern=pattern_key, incoming=True)
+                    )
+                    client.registered_message_patterns.add(pattern_key)
+                    fuzzy_index.add(trigger)
+                    logger.info(f"Registered currency converter handler for trigger '{trigger}'")
+            client.add_event_handler(
+                handle_currency_converter_wrapper,
+                events.NewMessage(pattern=r'\d+\s*[a-zA-Z\u0600-\u06FF]+', incoming=True)
+            )
+            logger.info("Registered currency converter handler for amount patterns")
+            from plugins.crypto.crypto_handler import initialize_crypto_plugin
+            initialize_crypto_plugin(client)
+            logger.info("Crypto plugin initialized")
+            register_fuzzy_handlers(client)
+            from plugins.admin import AdminPanel
+            admin_panel = AdminPanel(client, user_db, ADMIN_IDS)
+        await asyncio.gather(connect, migrations)
+        logger.info("Database migrations completed successfully")
+        boot_timeline.mark('ready')
+        asyncio.ensure_future(run_online_migrations())
+        plugin_reloader.start()
+        logger.info(f"Bot started successfully in {boot_timeline.elapsed_ms:.0f}ms")
         await client.run_until_disconnected()
     except Exception as e:
         logger.error(f"Error in main function: {str(e)}")
         raise
     finally:
+        plugin_reloader.stop()
+        event_dispatcher.stop()
         currency_cache.stop()
         try:
             user_db.close()
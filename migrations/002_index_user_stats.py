@@ -0,0 +1,16 @@
+"""
+Migration script to index user_stats for the admin statistics queries
+Built online after startup, since it scans the whole table.
+"""
+import sqlite3
+ONLINE = True
+def upgrade(conn: sqlite3.Connection):
+    """Index user_stats by time for activity counts and by user for user info"""
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_stats_timestamp_user
+        ON user_stats (timestamp, user_id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_stats_user_action
+        ON user_stats (user_id, action)
+    ''')
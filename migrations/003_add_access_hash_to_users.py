@@ -0,0 +1,12 @@
+"""
+Migration script to add access_hash column to users table
+"""
+import sqlite3
+def upgrade(conn: sqlite3.Connection):
+    """Add the access_hash column used to address users without resolving them"""
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(users)")]
+    if 'access_hash' not in columns:
+        conn.execute('''
+            ALTER TABLE users
+            ADD COLUMN access_hash INTEGER
+        ''')
@@ -2,12 +2,26 @@
 پنل مدیریت
 مدیریت دستورات ادمین، ارسال پیام همگانی و آمار ربات
 """
-import asyncio
 import logging
+import os
 import time
 from typing import List, Optional
 from telethon import events, Button
+from telethon.tl.types import InputPeerUser
+from ..edits import edit_if_changed
+from ..boot import boot_timeline
+from ..dispatch import event_dispatcher
+from ..outbound import outbound_scheduler, outbound_lane, LANE_BROADCAST
+from ..group_replies import group_replies
+from ..ratelimit import rate_limiter
+from ..conversations import conversations
+from ..reloader import plugin_reloader
+from ..polling import poll_scheduler
+from ..cache import currency_cache, FEED_NAME as CURRENCY_FEED
+from ..crypto.crypto_cache import crypto_cache, FEED_NAME as CRYPTO_FEED
 logger = logging.getLogger(__name__)
+STATE_BROADCAST = 'admin:broadcast'
+STATE_USER_INFO = 'admin:user_info'
 class AdminPanel:
     def __init__(self, client, user_db, admin_ids: List[int]):
         """Initialize the admin panel
@@ -36,7 +50,8 @@ class AdminPanel:
             buttons = [
                 [Button.inline("📊 آمار", b"admin:stats")],
                 [Button.inline("📢 ارسال همگانی", b"admin:broadcast")],
-                [Button.inline("👥 اطلاعات کاربر", b"admin:user_info")]
+                [Button.inline("👥 اطلاعات کاربر", b"admin:user_info")],
+                [Button.inline("⏱ زمان‌بندی راه‌اندازی", b"admin:boot")]
             ]
             await event.respond("👨‍💼 **پنل مدیریت**\n\nیک گزینه را انتخاب کنید:", buttons=buttons)
         @self.client.on(events.CallbackQuery(data=b"admin:stats"))
@@ -74,13 +89,82 @@ class AdminPanel:
                 )
                 for day, count in messages_data:
                     stats_message += f"• {day}: `{count:,}` پیام\n"
+                stats_message += f"\n⚙️ صف پردازش (در حال اجرا: `{event_dispatcher.running}`):\n"
+                for name, queue in event_dispatcher.snapshot().items():
+                    stats_message += (
+                        f"• {name}: `{queue['depth']}` در صف (بیشینه `{queue['max_depth']}`)، "
+                        f"حذف `{queue['shed'] + queue['stale']}`، انتظار `{queue['wait_ms_avg']:.0f}ms`\n"
+                    )
+                coalesced = group_replies.stats
+                stats_message += (
+                    f"\n👥 پاسخ‌های تکراری در گروه‌ها (پنجره {coalesced['window']:.0f} ثانیه): "
+                    f"`{coalesced['suppressed']:,}` حذف از `{coalesced['admitted'] + coalesced['suppressed']:,}` درخواست\n"
+                )
+                stats_message += f"\n🚦 محدودیت نرخ ({rate_limiter.throttled_users:,} کاربر محدود شده):\n"
+                for kind, limits in rate_limiter.snapshot().items():
+                    stats_message += f"• {kind}: `{limits['throttled']:,}` رد از `{limits['allowed'] + limits['throttled']:,}`\n"
+                offenders = rate_limiter.top_offenders()
+                if offenders:
+                    stats_message += "• بیشترین: " + "، ".join(f"`{user_id}` ({count:,})" for user_id, count in offenders) + "\n"
+                stats_message += "\n📤 ارسال پیام:\n"
+                for name, lane in outbound_scheduler.snapshot().items():
+                    stats_message += (
+                        f"• {name}: `{lane['sent']:,}` ارسال، `{lane['queued']}` در صف، "
+                        f"حذف `{lane['dropped']}`، FloodWait `{lane['flood_waits']}`، "
+                        f"تاخیر `{lane['latency_ms_avg']:.0f}ms` (بیشینه `{lane['latency_ms_max']:.0f}ms`)\n"
+                    )
+                stats_message += "\n🔄 زمان‌بندی دریافت داده:\n"
+                for feed, decision in poll_scheduler.decisions().items():
+                    volatility = decision['volatility']
+                    stats_message += (
+                        f"• {feed}: هر `{decision['interval']:.0f}` ثانیه ({decision['reason']})، "
+                        f"نوسان `{'-' if volatility is None else f'{volatility:.0%}'}`، "
+                        f"درخواست `{decision['request_rate']:.1f}` در دقیقه، "
+                        f"بروزرسانی زودهنگام `{decision['early_refreshes']}`، "
+                        f"بعدی `{poll_scheduler.seconds_until_next(feed):.0f}` ثانیه\n"
+                    )
+                for feed, cache in ((CURRENCY_FEED, currency_cache), (CRYPTO_FEED, crypto_cache)):
+                    polls = cache.refresh_stats
+                    stats_message += (
+                        f"• {feed}: `{polls['requests']:,}` درخواست، `{polls['changed']:,}` تغییر، "
+                        f"`{polls['skipped']:,}` رد شده (304: `{polls['not_modified']:,}`، "
+                        f"بدون تغییر: `{polls['unchanged']:,}`)، خطا `{polls['failed']:,}`\n"
+                    )
                 buttons = [
                     [Button.inline("🔙 بازگشت", b"admin:back")]
                 ]
-                await event.edit(stats_message, buttons=buttons)
+                await edit_if_changed(event, stats_message, buttons)
             except Exception as e:
                 logger.error(f"Error getting stats: {str(e)}")
                 await event.answer("❌ خطا در دریافت آمار", alert=True)
+        @self.client.on(events.CallbackQuery(data=b"admin:boot"))
+        async def show_boot_timeline(event):
+            """Show how long each startup phase took"""
+            if not self.is_admin(event.sender_id):
+                await event.answer("❌ Access denied", alert=True)
+                return
+            message = (
+                "⏱ **زمان‌بندی راه‌اندازی**\n\n"
+                f"```\n{boot_timeline.format()}\n```"
+            )
+            buttons = [
+                [Button.inline("🔙 بازگشت", b"admin:back")]
+            ]
+            await edit_if_changed(event, message, buttons)
+        @self.client.on(events.NewMessage(pattern=r'^/reload$'))
+        async def reload_plugins(event):
+            """Reload changed plugin files now and show what was reloaded"""
+            if not self.is_admin(event.sender_id):
+                await event.respond("❌ شما مجوز دسترسی به پنل مدیریت را ندارید.")
+                return
+            reports = plugin_reloader.scan()
+            if reports:
+                title = f"🔄 **{len(reports)} پلاگین بارگذاری مجدد شد**"
+            else:
+                title = "🔄 **تغییری در پلاگین‌ها یافت نشد**\n\nآخرین بارگذاری‌ها:"
+                reports = plugin_reloader.history[:10]
+            lines = [self.format_reload_report(report) for report in reports] or ["هنوز پلاگینی بارگذاری مجدد نشده است."]
+            await event.respond(f"{title}\n\n" + "\n".join(lines))
         @self.client.on(events.CallbackQuery(data=b"admin:broadcast"))
         async def start_broadcast(event):
             """Start broadcast flow"""
@@ -90,124 +174,142 @@ class AdminPanel:
             if self.broadcast_in_progress:
                 await event.answer("⚠️ در حال حاضر یک ارسال همگانی در حال انجام است", alert=True)
                 return
-            await event.edit(
+            conversations.end(event.chat_id, event.sender_id)
+            await edit_if_changed(
+                event,
                 "📢 **پیامی که می‌خواهید به صورت همگانی ارسال کنید را ارسال کنید**\n\n"
                 "می‌توانید از قالب‌بندی مارک‌داون استفاده کنید. برای انصراف /cancel ارسال کنید.",
-                buttons=[[Button.inline("🔙 انصراف", b"admin:back")]]
+                [[Button.inline("🔙 انصراف", b"admin:back")]]
             )
+            conversations.start(event.chat_id, event.sender_id, STATE_BROADCAST, receive_broadcast, data=event)
+        async def receive_broadcast(broadcast_event, conversation):
+            """Send the admin's message to every user"""
+            if broadcast_event.raw_text == '/cancel':
+                await broadcast_event.respond("❌ ارسال همگانی لغو شد")
+                return
+            if self.broadcast_in_progress:
+                await broadcast_event.respond("⚠️ در حال حاضر یک ارسال همگانی در حال انجام است")
+                return
+            event = conversation.data
             self.broadcast_in_progress = True
-            self.broadcast_sender = event.sender_id
-            @self.client.on(events.NewMessage(from_users=self.admin_ids))
-            async def handle_broadcast_message(broadcast_event):
-                if broadcast_event.raw_text == '/cancel':
-                    self.broadcast_in_progress = False
-                    await broadcast_event.respond("❌ ارسال همگانی لغو شد")
-                    return
-                self.client.remove_event_handler(handle_broadcast_message)
-                self.broadcast_in_progress = False
-                cursor = self.user_db.conn.cursor()
-                cursor.execute("SELECT user_id FROM users")
-                user_ids = [row[0] for row in cursor.fetchall()]
-                total_users = len(user_ids)
+            try:
+                targets = self.user_db.get_delivery_targets()
+                total_users = len(targets)
                 success = 0
                 failed = 0
-                await event.edit(f"📢 در حال ارسال به {total_users} کاربر...")
-                for user_id in user_ids:
-                    try:
-                        await self.client.send_message(user_id, broadcast_event.message)
-                        success += 1
-                        await asyncio.sleep(0.1)
-                    except Exception as e:
-                        logger.error(f"Failed to send to {user_id}: {str(e)}")
-                        failed += 1
-                summary = (
-                    f"✅ **ارسال همگانی تکمیل شد**\n\n"
-                    f"📤 ارسال موفق: `{success:,}`\n"
-                    f"❌ ناموفق: `{failed:,}`\n"
-                    f"📊 درصد موفقیت: `{(success/max(1, total_users)*100):.1f}%`"
-                )
-                await event.respond(summary)
+                await edit_if_changed(event, f"📢 در حال ارسال به {total_users} کاربر...")
+                with outbound_lane(LANE_BROADCAST):
+                    for user_id, access_hash in targets:
+                        peer = InputPeerUser(user_id, access_hash) if access_hash is not None else user_id
+                        try:
+                            await self.client.send_message(peer, broadcast_event.message)
+                            success += 1
+                        except Exception as e:
+                            logger.error(f"Failed to send to {user_id}: {str(e)}")
+                            failed += 1
+            finally:
+                self.broadcast_in_progress = False
+            summary = (
+                f"✅ **ارسال همگانی تکمیل شد**\n\n"
+                f"📤 ارسال موفق: `{success:,}`\n"
+                f"❌ ناموفق: `{failed:,}`\n"
+                f"📊 درصد موفقیت: `{(success/max(1, total_users)*100):.1f}%`"
+            )
+            await event.respond(summary)
         @self.client.on(events.CallbackQuery(data=b"admin:user_info"))
         async def user_info_prompt(event):
             """Prompt for user ID to get info"""
             if not self.is_admin(event.sender_id):
                 await event.answer("❌ Access denied", alert=True)
                 return
-            await event.edit(
+            await edit_if_changed(
+                event,
                 "👤 **اطلاعات کاربر**\n\n"
                 "لطفاً آیدی عددی یا یوزرنیم کاربر را ارسال کنید.",
-                buttons=[[Button.inline("🔙 بازگشت", b"admin:back")]]
+                [[Button.inline("🔙 بازگشت", b"admin:back")]]
             )
-            @self.client.on(events.NewMessage(from_users=event.sender_id))
-            async def handle_user_info_query(user_event):
-                if user_event.raw_text == '/cancel':
-                    await user_event.respond("❌ عملیات لغو شد")
-                    self.client.remove_event_handler(handle_user_info_query)
-                    return
-                user_input = user_event.raw_text.strip()
-                if user_input.startswith('@'):
-                    user_input = user_input[1:]
-                try:
-                    user_id = int(user_input)
-                    cursor = self.user_db.conn.cursor()
-                    cursor.execute("""
-                        SELECT * FROM users
-                        WHERE user_id = ?
-                    """, (user_id,))
-                    user_data = cursor.fetchone()
-                except ValueError:
-                    cursor = self.user_db.conn.cursor()
-                    cursor.execute("""
-                        SELECT * FROM users
-                        WHERE username = ?
-                    """, (user_input.lower(),))
-                    user_data = cursor.fetchone()
-                if not user_data:
-                    await user_event.respond("❌ کاربر یافت نشد")
-                    self.client.remove_event_handler(handle_user_info_query)
-                    return
+            conversations.start(event.chat_id, event.sender_id, STATE_USER_INFO, receive_user_query)
+        async def receive_user_query(user_event, conversation):
+            """Look up the user the admin asked about"""
+            if user_event.raw_text == '/cancel':
+                await user_event.respond("❌ عملیات لغو شد")
+                return
+            user_input = user_event.raw_text.strip()
+            if user_input.startswith('@'):
+                user_input = user_input[1:]
+            try:
+                user_id = int(user_input)
+                cursor = self.user_db.conn.cursor()
                 cursor.execute("""
-                    SELECT action, COUNT(*) as count, MAX(timestamp) as last_seen
-                    FROM user_stats
+                    SELECT * FROM users
                     WHERE user_id = ?
-                    GROUP BY action
-                """, (user_data[0],))
-                stats = cursor.fetchall()
-                user_info = (
-                    f"👤 **اطلاعات کاربر**\n\n"
-                    f"🆔 شناسه: `{user_data[0]}`\n"
-                    f"👤 نام: {user_data[2] or 'ندارد'}"
-                    f"{(' ' + user_data[3]) if user_data[3] else ''}\n"
-                    f"🔗 نام کاربری: @{user_data[1] or 'ندارد'}\n"
-                    f"🤖 ربات: {'✅' if user_data[4] else '❌'}\n"
-                    f"🌐 زبان: {user_data[5] or 'ندارد'}\n"
-                    f"📅 اولین بازدید: <code>{self._format_timestamp(user_data[6])}</code>\n"
-                    f"🕒 آخرین بازدید: <code>{self._format_timestamp(user_data[7])}</code>\n"
-                    f"🔢 تعداد تعاملات: `{user_data[8]:,}`\n\n"
-                    "📊 **آمار فعالیت**\n"
-                )
-                for action, count, last_seen in stats:
-                    action_fa = {
-                        'start': 'شروع',
-                        'message': 'پیام',
-                        'callback': 'کلیک دکمه',
-                        'inline_query': 'جستجوی اینلاین'
-                    }.get(action, action)
-                    user_info += f"• {action_fa}: `{count:,}` (آخرین: {self._format_timestamp(last_seen)})\n"
-                await user_event.respond(user_info, parse_mode='html')
-                self.client.remove_event_handler(handle_user_info_query)
+                """, (user_id,))
+                user_data = cursor.fetchone()
+            except ValueError:
+                cursor = self.user_db.conn.cursor()
+                cursor.execute("""
+                    SELECT * FROM users
+                    WHERE username = ?
+                """, (user_input.lower(),))
+                user_data = cursor.fetchone()
+            if not user_data:
+                await user_event.respond("❌ کاربر یافت نشد")
+                return
+            cursor.execute("""
+                SELECT action, COUNT(*) as count, MAX(timestamp) as last_seen
+                FROM user_stats
+                WHERE user_id = ?
+                GROUP BY action
+            """, (user_data[0],))
+            stats = cursor.fetchall()
+            user_info = (
+                f"👤 **اطلاعات کاربر**\n\n"
+                f"🆔 شناسه: `{user_data[0]}`\n"
+                f"👤 نام: {user_data[2] or 'ندارد'}"
+                f"{(' ' + user_data[3]) if user_data[3] else ''}\n"
+                f"🔗 نام کاربری: @{user_data[1] or 'ندارد'}\n"
+                f"🤖 ربات: {'✅' if user_data[4] else '❌'}\n"
+                f"🌐 زبان: {user_data[5] or 'ندارد'}\n"
+                f"📅 اولین بازدید: <code>{self._format_timestamp(user_data[6])}</code>\n"
+                f"🕒 آخرین بازدید: <code>{self._format_timestamp(user_data[7])}</code>\n"
+                f"🔢 تعداد تعاملات: `{user_data[8]:,}`\n\n"
+                "📊 **آمار فعالیت**\n"
+            )
+            for action, count, last_seen in stats:
+                action_fa = {
+                    'start': 'شروع',
+                    'message': 'پیام',
+                    'callback': 'کلیک دکمه',
+                    'inline_query': 'جستجوی اینلاین'
+                }.get(action, action)
+                user_info += f"• {action_fa}: `{count:,}` (آخرین: {self._format_timestamp(last_seen)})\n"
+            await user_event.respond(user_info, parse_mode='html')
         @self.client.on(events.CallbackQuery(data=b"admin:back"))
         async def back_to_admin(event):
             """Return to admin main menu"""
             if not self.is_admin(event.sender_id):
                 await event.answer("❌ Access denied", alert=True)
                 return
+            conversations.end(event.chat_id, event.sender_id)
             buttons = [
                 [Button.inline("📊 آمار", b"admin:stats")],
                 [Button.inline("📢 ارسال همگانی", b"admin:broadcast")],
-                [Button.inline("👥 اطلاعات کاربر", b"admin:user_info")]
+                [Button.inline("👥 اطلاعات کاربر", b"admin:user_info")],
+                [Button.inline("⏱ زمان‌بندی راه‌اندازی", b"admin:boot")]
             ]
-            await event.edit("👨‍💼 **پنل مدیریت**\n\nیک گزینه را انتخاب کنید:", buttons=buttons)
+            await edit_if_changed(event, "👨‍💼 **پنل مدیریت**\n\nیک گزینه را انتخاب کنید:", buttons)
+    @staticmethod
+    def format_reload_report(report) -> str:
+        """Format one plugin reload report as a message line"""
+        icons = {'loaded': '🆕', 'reloaded': '✅', 'removed': '🗑', 'failed': '❌'}
+        line = (
+            f"{icons.get(report.action, '•')} `{os.path.basename(report.path)}` "
+            f"{report.action} {time.strftime('%H:%M:%S', time.localtime(report.at))} "
+            f"- {report.duration_ms:.1f}ms (+{report.added}/-{report.removed})"
+        )
+        if report.error:
+            line += f"\n    {report.error}"
+        return line
     @staticmethod
     def _format_timestamp(timestamp: int) -> str:
         """Format a Unix timestamp to a readable date"""
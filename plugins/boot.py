@@ -0,0 +1,65 @@
+"""
+Startup timeline for the currency bot.
+This module records when each boot phase started and how long it took, so slow
+or serialized phases show up in the startup log and the admin panel.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+logger = logging.getLogger('Boot')
+class BootTimeline:
+    """Start offsets and durations of the boot phases"""
+    def __init__(self, started: Optional[float] = None):
+        """Initialize the timeline
+        Args:
+            started: perf_counter value the offsets are measured from, defaults to now
+        """
+        self.started = started if started is not None else time.perf_counter()
+        self._phases: List[Tuple[str, float, float]] = []
+        self._lock = threading.Lock()
+    def record(self, name: str, start: float, end: float):
+        """Record a finished phase from perf_counter timestamps"""
+        with self._lock:
+            self._phases.append((name, start, end))
+        logger.debug(f"Boot phase {name} took {(end - start) * 1000:.1f}ms")
+    def mark(self, name: str):
+        """Record an instantaneous milestone"""
+        now = time.perf_counter()
+        self.record(name, now, now)
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as one phase, also around awaits"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+    async def run_in_executor(self, name: str, func: Callable[..., Any], *args) -> Any:
+        """Run a blocking function in the default executor as one phase"""
+        loop = asyncio.get_event_loop()
+        with self.phase(name):
+            return await loop.run_in_executor(None, func, *args)
+    @property
+    def phases(self) -> List[Tuple[str, float, float]]:
+        """Get (name, start offset ms, duration ms) of every phase in start order"""
+        with self._lock:
+            phases = sorted(self._phases, key=lambda phase: phase[1])
+        return [(name, (start - self.started) * 1000, (end - start) * 1000) for name, start, end in phases]
+    @property
+    def elapsed_ms(self) -> float:
+        """Get the offset of the latest phase end"""
+        with self._lock:
+            if not self._phases:
+                return 0.0
+            return (max(end for _, _, end in self._phases) - self.started) * 1000
+    def format(self) -> str:
+        """Render the timeline as aligned text lines"""
+        lines = [f"{'phase':<22}{'start':>10}{'took':>10}"]
+        for name, offset_ms, duration_ms in self.phases:
+            lines.append(f"{name:<22}{offset_ms:>8.0f}ms{duration_ms:>8.0f}ms")
+        lines.append(f"{'total':<22}{self.elapsed_ms:>8.0f}ms")
+        return '\n'.join(lines)
+boot_timeline = BootTimeline()
@@ -1,24 +1,56 @@
 import time
 from typing import Optional, Dict, Any
 import threading
-import requests
 import logging
+from .snapshot import save_snapshot, load_snapshot
+from .ingest import QuoteBook, decode_json
+from .formatting import clear_change_memo
+from .polling import ConditionalPoller, FeedSchedule, poll_scheduler, MARKET_CALENDAR, POLL_CHANGED, POLL_NOT_MODIFIED, POLL_UNCHANGED
+FEED_NAME = 'currency'
 class CurrencyCache:
-    def __init__(self, update_interval: int = 60):
+    def __init__(self, update_interval: int = 60, snapshot_path: Optional[str] = 'data/currency_snapshot.bin'):
         self._cache: Optional[Dict[str, Any]] = None
+        self._quotes = QuoteBook(None)
         self._last_update: float = 0
+        self._stale = False
+        self._fresh = threading.Event()
+        self._snapshot_path = snapshot_path
         self._update_interval = update_interval
         self._lock = threading.Lock()
         self._update_thread: Optional[threading.Thread] = None
         self._running = False
         self._api_url = 'https://apiarz.qprjz.workers.dev/'
+        self._poller = ConditionalPoller(self._api_url, name='currency feed')
+        self._version = 0
+        poll_scheduler.register(FEED_NAME, FeedSchedule(
+            base_interval=update_interval,
+            calendar=MARKET_CALENDAR,
+            off_hours_interval=update_interval * 3
+        ))
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger('CurrencyCache')
+        self._load_snapshot()
+    def _load_snapshot(self):
+        """Warm the cache from the last persisted snapshot, marked as stale"""
+        if not self._snapshot_path:
+            return
+        snapshot = load_snapshot(self._snapshot_path)
+        if snapshot:
+            data, saved_at = snapshot
+            with self._lock:
+                if self._cache is None:
+                    self._cache = data
+                    self._quotes = QuoteBook(data)
+                    self._last_update = saved_at
+                    self._stale = True
+                    self._version += 1
     def start(self):
-        """Start the background update thread"""
+        """Start the background update thread, unless it is already running"""
+        if self._running:
+            return
         self._running = True
         self._update_thread = threading.Thread(target=self._update_loop, daemon=True)
         self._update_thread.start()
@@ -26,38 +58,102 @@ class CurrencyCache:
     def stop(self):
         """Stop the background update thread"""
         self._running = False
+        poll_scheduler.wake(FEED_NAME)
         if self._update_thread:
             self._update_thread.join()
         self.logger.info("Cache update thread stopped")
     def _fetch_data(self) -> Optional[Dict[str, Any]]:
-        """Fetch fresh data from the API"""
+        """Fetch fresh data from the API, or None if it failed or did not change"""
+        status, body = self._poller.fetch()
+        if status in (POLL_NOT_MODIFIED, POLL_UNCHANGED):
+            self._mark_unchanged()
+            return None
+        if status != POLL_CHANGED:
+            return None
         try:
-            response = requests.get(self._api_url)
-            if response.status_code == 200:
-                return response.json()
-            self.logger.warning(f"API request failed with status code: {response.status_code}")
-        except Exception as e:
-            self.logger.error(f"Error fetching data: {str(e)}")
-        return None
+            data = decode_json(body)
+        except ValueError as e:
+            self.logger.error(f"Error decoding data: {str(e)}")
+            self._poller.reject()
+            return None
+        self._poller.accept()
+        return data
+    def _mark_unchanged(self):
+        """Record that the source confirmed the cached data is still current"""
+        with self._lock:
+            if self._cache is None:
+                return
+            self._last_update = time.time()
+            self._stale = False
+            total = len(self._quotes)
+        self._fresh.set()
+        poll_scheduler.observe(FEED_NAME, 0, total)
     def _update_loop(self):
         """Background thread that updates the cache periodically"""
         while self._running:
             self._update_cache()
-            time.sleep(self._update_interval)
+            if self._running:
+                poll_scheduler.wait(FEED_NAME, poll_scheduler.next_interval(FEED_NAME))
     def _update_cache(self):
         """Update the cache with fresh data"""
         new_data = self._fetch_data()
         if new_data:
+            clear_change_memo()
+            quotes = QuoteBook(new_data)
+            old_prices = self._quotes.prices()
+            new_prices = quotes.prices()
+            changed = sum(1 for key, price in new_prices.items() if old_prices.get(key) != price)
+            poll_scheduler.observe(FEED_NAME, changed, len(new_prices))
             with self._lock:
                 self._cache = new_data
+                self._quotes = quotes
                 self._last_update = time.time()
+                self._stale = False
+                self._version += 1
                 self.logger.info("Cache updated successfully")
+            self._fresh.set()
+            if self._snapshot_path:
+                save_snapshot(self._snapshot_path, new_data, self._last_update)
+    def wait_fresh(self, timeout: Optional[float] = None) -> bool:
+        """Block until the first successful fetch since startup
+        Args:
+            timeout: Longest time to wait, in seconds
+        Returns:
+            True if fresh data arrived, False on timeout
+        """
+        return self._fresh.wait(timeout)
+    def note_request(self):
+        """Record one user request served from this feed, called once per request at the handler"""
+        poll_scheduler.note_request(FEED_NAME)
     def get_data(self) -> Optional[Dict[str, Any]]:
         """Get the cached data"""
         with self._lock:
             return self._cache
+    def get_quotes(self) -> QuoteBook:
+        """Get the parsed quotes of the cached data"""
+        with self._lock:
+            return self._quotes
+    def get_quote(self, name: str, section: Optional[str] = None):
+        """Get the parsed quote of a single currency, or None if it is not cached"""
+        return self.get_quotes().get(name, section)
     @property
     def last_update_time(self) -> float:
         """Get the timestamp of the last update"""
         return self._last_update
+    @property
+    def version(self) -> int:
+        """Get a counter that changes only when the cached data is replaced"""
+        return self._version
+    @property
+    def refresh_stats(self):
+        """Get poll counters, including how many refreshes were skipped"""
+        return self._poller.stats
+    @property
+    def is_stale(self) -> bool:
+        """Whether the cached data comes from a snapshot and no live fetch succeeded yet"""
+        return self._stale
+    @property
+    def data_age(self) -> float:
+        """Get the age of the cached data in seconds"""
+        return time.time() - self._last_update if self._last_update else float('inf')
 currency_cache = CurrencyCache()
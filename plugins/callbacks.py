@@ -0,0 +1,216 @@
+"""
+Callback query middleware for the currency bot.
+This module acknowledges button presses immediately and runs the actual work
+in the background, so the client-side spinner never waits for a render or an edit.
+It also encodes button payloads as a few bytes and routes them through one dispatcher.
+"""
+import asyncio
+import functools
+import hashlib
+import logging
+import struct
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from telethon import events
+logger = logging.getLogger('Callbacks')
+CALLBACK_MARKER = 0xFF
+CALLBACK_FORMAT = struct.Struct('>BBIH')
+ACTION_NOOP = 0
+ACTION_MAIN_PAGE = 1
+ACTION_MINOR_PAGE = 2
+ACTION_GOLD_PAGE = 3
+ACTION_CRYPTO_LIST_IRT = 4
+ACTION_CRYPTO_LIST_USDT = 5
+ACTION_CRYPTO_PRICE = 6
+class InstrumentRegistry:
+    """Interned 32-bit ids of instrument names
+    Ids are derived from a hash of the name, so buttons rendered before a restart
+    keep their meaning once the same names are interned again.
+    """
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+    def intern(self, name: str) -> int:
+        """Get the id of a name, assigning one on first use"""
+        instrument_id = self._ids.get(name)
+        if instrument_id is not None:
+            return instrument_id
+        with self._lock:
+            instrument_id = int.from_bytes(hashlib.blake2b(name.encode('utf-8'), digest_size=4).digest(), 'big')
+            while self._names.get(instrument_id, name) != name:
+                instrument_id = (instrument_id + 1) & 0xFFFFFFFF
+            self._names[instrument_id] = name
+            self._ids[name] = instrument_id
+            return instrument_id
+    def name(self, instrument_id: int) -> Optional[str]:
+        """Get the name behind an id, or None if it was not interned in this process"""
+        return self._names.get(instrument_id)
+    def __len__(self) -> int:
+        return len(self._ids)
+instrument_ids = InstrumentRegistry()
+class CallbackPayload:
+    """A decoded compact callback"""
+    __slots__ = ('action', 'instrument', 'page')
+    def __init__(self, action: int, instrument: int, page: int):
+        self.action = action
+        self.instrument = instrument
+        self.page = page
+    @property
+    def instrument_name(self) -> Optional[str]:
+        """Get the interned name of the instrument"""
+        return instrument_ids.name(self.instrument)
+def encode_callback(action: int, instrument: Optional[str] = None, page: int = 0) -> bytes:
+    """Encode a button payload
+    Args:
+        action: One of the ACTION_* ids
+        instrument: Instrument name, interned into a 32-bit id
+        page: Page number, 0 when unused
+    Returns:
+        An 8-byte callback payload
+    """
+    instrument_id = instrument_ids.intern(instrument) if instrument else 0
+    return CALLBACK_FORMAT.pack(CALLBACK_MARKER, action, instrument_id, page)
+def decode_callback(data: bytes) -> Optional[CallbackPayload]:
+    """Decode a compact button payload
+    Used directly as the CallbackQuery pattern, so legacy text payloads never match.
+    Returns:
+        The payload, or None for data that is not a compact callback
+    """
+    if len(data) != CALLBACK_FORMAT.size or data[0] != CALLBACK_MARKER:
+        return None
+    _, action, instrument_id, page = CALLBACK_FORMAT.unpack(data)
+    return CallbackPayload(action, instrument_id, page)
+class CallbackMetrics:
+    """Per-handler timing counters of acknowledged callbacks"""
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+    def record(self, name: str, ack_ms: float, total_ms: float, failed: bool):
+        """Record one handled callback"""
+        stats = self._stats.setdefault(name, {
+            'count': 0, 'errors': 0, 'ack_ms_total': 0.0, 'ack_ms_max': 0.0, 'run_ms_total': 0.0, 'run_ms_max': 0.0
+        })
+        stats['count'] += 1
+        stats['errors'] += int(failed)
+        stats['ack_ms_total'] += ack_ms
+        stats['ack_ms_max'] = max(stats['ack_ms_max'], ack_ms)
+        stats['run_ms_total'] += total_ms
+        stats['run_ms_max'] = max(stats['run_ms_max'], total_ms)
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Get count, errors and average/maximum latencies per handler"""
+        result = {}
+        for name, stats in self._stats.items():
+            count = stats['count'] or 1
+            result[name] = {
+                'count': stats['count'],
+                'errors': stats['errors'],
+                'ack_ms_avg': stats['ack_ms_total'] / count,
+                'ack_ms_max': stats['ack_ms_max'],
+                'run_ms_avg': stats['run_ms_total'] / count,
+                'run_ms_max': stats['run_ms_max']
+            }
+        return result
+callback_metrics = CallbackMetrics()
+_background_tasks: Set[asyncio.Task] = set()
+async def notify_error(event, text: str):
+    """Show an error for a callback
+    Uses an alert while the query is still unanswered, otherwise a follow-up message.
+    """
+    if not getattr(event, '_answered', False):
+        await event.answer(text, alert=True)
+        return
+    try:
+        await event.respond(f"⚠️ {text}")
+    except Exception as e:
+        logger.warning(f"Could not deliver callback error '{text}': {str(e)}")
+async def _run_acknowledged(name: str, handler: Callable[..., Awaitable], event, args: Tuple, received: float,
+                            timing: Dict[str, float], error_text: str):
+    """Run an acknowledged handler and record its timing"""
+    failed = False
+    try:
+        await handler(event, *args)
+    except events.StopPropagation:
+        pass
+    except Exception as e:
+        failed = True
+        logger.error(f"Error in callback handler {name}: {str(e)}", exc_info=True)
+        await notify_error(event, error_text)
+    finally:
+        total_ms = (time.perf_counter() - received) * 1000
+        ack_ms = timing.get('ack_ms', total_ms)
+        callback_metrics.record(name, ack_ms, total_ms, failed)
+        logger.debug(f"Callback {name} acknowledged in {ack_ms:.1f}ms, finished in {total_ms:.1f}ms")
+async def _acknowledge_and_schedule(name: str, handler: Callable[..., Awaitable], event, args: Tuple, error_text: str):
+    """Run a callback's handler as a tracked background task and make sure the query is answered right away
+    The handler runs up to its first network call before the empty answer is sent, so a
+    handler that answers locally, such as an unchanged edit's toast, keeps its own text.
+    """
+    received = time.perf_counter()
+    timing = {}
+    task = asyncio.ensure_future(_run_acknowledged(name, handler, event, args, received, timing, error_text))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    await asyncio.sleep(0)
+    if not getattr(event, '_answered', False):
+        try:
+            await event.answer()
+        except Exception as e:
+            logger.warning(f"Could not acknowledge callback {name}: {str(e)}")
+    timing['ack_ms'] = (time.perf_counter() - received) * 1000
+def acknowledged(name: str, error_text: str = "خطایی رخ داد. لطفا دوباره تلاش کنید.", stop: bool = True):
+    """Decorate a CallbackQuery handler to answer immediately and run in the background
+    The handler may answer the query itself before its first network call, e.g. with a toast.
+    Args:
+        name: Handler name used in metrics and logs
+        error_text: Message shown through a follow-up if the handler fails
+        stop: Whether to stop propagation to later handlers
+    """
+    def decorator(handler: Callable[..., Awaitable]):
+        @functools.wraps(handler)
+        async def wrapper(event):
+            await _acknowledge_and_schedule(name, handler, event, (), error_text)
+            if stop:
+                raise events.StopPropagation
+        return wrapper
+    return decorator
+class CallbackRouter:
+    """Route compact callbacks to handlers by action id"""
+    def __init__(self):
+        self._routes: Dict[int, Tuple[str, Callable[..., Awaitable], str]] = {}
+    def route(self, action: int, name: str, error_text: str = "خطایی رخ داد. لطفا دوباره تلاش کنید."):
+        """Register a handler for an action
+        The handler is called as handler(event, payload) after the query is acknowledged.
+        Args:
+            action: One of the ACTION_* ids
+            name: Handler name used in metrics and logs
+            error_text: Message shown through a follow-up if the handler fails
+        """
+        def decorator(handler: Callable[..., Awaitable]):
+            if action in self._routes:
+                raise ValueError(f"Callback action {action} is already routed to {self._routes[action][0]}")
+            self._routes[action] = (name, handler, error_text)
+            return handler
+        return decorator
+    async def dispatch(self, event):
+        """Acknowledge a compact callback and run the handler of its action"""
+        payload: CallbackPayload = event.pattern_match
+        route = self._routes.get(payload.action)
+        if route is None:
+            if payload.action != ACTION_NOOP:
+                logger.warning(f"No handler for callback action {payload.action}")
+            await event.answer()
+        else:
+            name, handler, error_text = route
+            await _acknowledge_and_schedule(name, handler, event, (payload,), error_text)
+        raise events.StopPropagation
+callback_router = CallbackRouter()
+@events.register(events.CallbackQuery(pattern=rb'^noop'))
+async def handle_noop(event):
+    """Acknowledge display-only buttons so their spinner stops right away"""
+    await event.answer()
+    raise events.StopPropagation
+def register_callback_handlers(client):
+    """Register the shared callback handlers"""
+    client.add_event_handler(handle_noop)
+    client.add_event_handler(callback_router.dispatch, events.CallbackQuery(pattern=decode_callback))
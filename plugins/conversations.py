@@ -0,0 +1,92 @@
+"""
+Conversation state for multi-step flows of the currency bot.
+Flows that wait for a user's next message store a state per (chat, user) here
+instead of registering a handler of their own. One permanent handler routes the
+next message of that user to the stored step, and states expire after a timeout,
+so an abandoned flow leaves nothing behind.
+"""
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from telethon import events
+logger = logging.getLogger('Conversations')
+class Conversation:
+    """The step a user is expected to answer next"""
+    __slots__ = ('state', 'handler', 'expires_at', 'data')
+    def __init__(self, state: str, handler: Callable[..., Awaitable], expires_at: float, data: Any = None):
+        self.state = state
+        self.handler = handler
+        self.expires_at = expires_at
+        self.data = data
+class ConversationStore:
+    """Pending conversation steps keyed by (chat, user)"""
+    def __init__(self, default_timeout: float = 300.0):
+        """Initialize the store
+        Args:
+            default_timeout: Seconds a step waits for its answer
+        """
+        self.default_timeout = default_timeout
+        self._conversations: Dict[Tuple[Hashable, Hashable], Conversation] = {}
+        self.expired = 0
+    def _sweep(self, now: float):
+        """Drop every expired step"""
+        expired = [key for key, conversation in self._conversations.items() if conversation.expires_at <= now]
+        for key in expired:
+            del self._conversations[key]
+        self.expired += len(expired)
+    def start(self, chat_id: Hashable, user_id: Hashable, state: str, handler: Callable[..., Awaitable],
+              timeout: Optional[float] = None, data: Any = None) -> Conversation:
+        """Wait for a user's next message in a chat, replacing any step already pending
+        Args:
+            chat_id: The chat the answer is expected in
+            user_id: The user expected to answer
+            state: Name of the step, e.g. 'admin:broadcast'
+            handler: Called as handler(event, conversation) with the answer
+            timeout: Seconds to wait, defaults to default_timeout
+            data: Anything the step needs later
+        """
+        now = time.monotonic()
+        self._sweep(now)
+        conversation = Conversation(state, handler, now + (timeout or self.default_timeout), data)
+        self._conversations[(chat_id, user_id)] = conversation
+        return conversation
+    def get(self, chat_id: Hashable, user_id: Hashable) -> Optional[Conversation]:
+        """Get the pending step of a user in a chat, if it has not expired"""
+        key = (chat_id, user_id)
+        conversation = self._conversations.get(key)
+        if conversation is not None and conversation.expires_at <= time.monotonic():
+            del self._conversations[key]
+            self.expired += 1
+            return None
+        return conversation
+    def end(self, chat_id: Hashable, user_id: Hashable) -> Optional[Conversation]:
+        """Cancel the pending step of a user in a chat"""
+        return self._conversations.pop((chat_id, user_id), None)
+    def count(self, state: Optional[str] = None) -> int:
+        """Count the pending steps, optionally of one state"""
+        self._sweep(time.monotonic())
+        if state is None:
+            return len(self._conversations)
+        return sum(1 for conversation in self._conversations.values() if conversation.state == state)
+    async def dispatch(self, event):
+        """Route a message to the step its sender is expected to answer
+        The step is consumed before its handler runs; a handler that needs another
+        message starts the next step itself.
+        """
+        if not self._conversations:
+            return
+        conversation = self.get(event.chat_id, event.sender_id)
+        if conversation is None:
+            return
+        self.end(event.chat_id, event.sender_id)
+        try:
+            await conversation.handler(event, conversation)
+        except Exception as e:
+            logger.error(f"Error in conversation step {conversation.state}: {str(e)}", exc_info=True)
+        raise events.StopPropagation
+    def register(self, client):
+        """Register the permanent handler
+        Must be registered before the trigger handlers so answers are not also treated as requests.
+        """
+        client.add_event_handler(self.dispatch, events.NewMessage(incoming=True))
+conversations = ConversationStore()
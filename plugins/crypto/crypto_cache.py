@@ -3,16 +3,19 @@ Crypto cache module for the currency bot.
 This module handles fetching and caching cryptocurrency data from the Nobitex API.
 """
 import time
-import json
 import logging
 import threading
 import requests
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from ..snapshot import save_snapshot, load_snapshot
+from ..ingest import Orderbook, decode_json
+from ..polling import ConditionalPoller, FeedSchedule, poll_scheduler, CRYPTO_CALENDAR, POLL_CHANGED, POLL_NOT_MODIFIED, POLL_UNCHANGED
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger('CryptoCache')
+FEED_NAME = 'crypto'
 POPULAR_CRYPTO_SYMBOLS = [
     'BTCIRT', 'ETHIRT', 'LTCIRT', 'USDTIRT', 'XRPIRT', 'BCHIRT', 'BNBIRT', 'EOSIRT', 'XLMIRT', 'ETCIRT',
     'TRXIRT', 'DOGEIRT', 'UNIIRT', 'DAIIRT', 'LINKIRT', 'DOTIRT', 'AAVEIRT', 'ADAIRT', 'SHIBIRT', 'FTMIRT',
@@ -148,23 +151,104 @@ CRYPTO_INFO = {
     'OMG': {'name': 'او ام جی', 'icon': 'OMG'},
     'ENJ': {'name': 'انجین کوین', 'icon': 'ENJ'},
 }
+def split_symbol(symbol_pair: str) -> Tuple[Optional[str], Optional[str]]:
+    """Split a market symbol into its base symbol and quote currency
+    Args:
+        symbol_pair: The market symbol (e.g., 'BTCIRT')
+    Returns:
+        Tuple of (base symbol, 'IRT' or 'USDT'), or (None, None) for unknown markets
+    """
+    if symbol_pair.endswith("IRT"):
+        return symbol_pair[:-3], "IRT"
+    if symbol_pair.endswith("USDT") and symbol_pair != "USDT":
+        return symbol_pair[:-4], "USDT"
+    return None, None
+def crypto_triggers(symbol_pair: str) -> List[str]:
+    """Build the trigger words of a market symbol
+    Args:
+        symbol_pair: The market symbol (e.g., 'BTCIRT')
+    Returns:
+        List of trigger words, or an empty list for unknown markets
+    """
+    base_symbol, quote_currency = split_symbol(symbol_pair)
+    if not base_symbol:
+        return []
+    info = CRYPTO_INFO.get(base_symbol, {'name': base_symbol, 'icon': base_symbol})
+    triggers = []
+    triggers.append(base_symbol)
+    if info.get('name'):
+        triggers.append(info.get('name'))
+        triggers.append(f"قیمت {info.get('name')}")
+        triggers.append(f"نرخ {info.get('name')}")
+    if quote_currency == "IRT":
+        triggers.append(f"{base_symbol}IRT")
+        triggers.append(f"{base_symbol}/IRT")
+        triggers.append(f"{base_symbol} IRT")
+        if info.get('name'):
+            triggers.append(f"{info.get('name')} تومان")
+            triggers.append(f"{info.get('name')} به تومان")
+    elif quote_currency == "USDT":
+        triggers.append(f"{base_symbol}USDT")
+        triggers.append(f"{base_symbol}/USDT")
+        triggers.append(f"{base_symbol} USDT")
+        if info.get('name'):
+            triggers.append(f"{info.get('name')} دلار")
+            triggers.append(f"{info.get('name')} به دلار")
+    return triggers
 class CryptoCache:
     """Cache for cryptocurrency data from Nobitex API"""
-    def __init__(self, update_interval: int = 60):
+    def __init__(self, update_interval: int = 60, snapshot_path: Optional[str] = 'data/crypto_snapshot.bin'):
         """Initialize the crypto cache
         Args:
             update_interval: Time between updates in seconds (default: 60)
+            snapshot_path: Where the last good data is persisted, or None to disable
         """
         self._cache: Dict[str, Dict[str, Any]] = {}
+        self._records: Dict[str, Orderbook] = {}
         self._last_update: float = 0
+        self._stale = False
+        self._fresh = threading.Event()
+        self._snapshot_path = snapshot_path
         self._update_interval = update_interval
         self._lock = threading.Lock()
         self._update_thread: Optional[threading.Thread] = None
         self._running = False
         self._api_all_url = 'https://api.nobitex.ir/v3/orderbook/all'
         self._api_single_url = 'https://api.nobitex.ir/v3/orderbook/'
+        self._poller = ConditionalPoller(self._api_all_url, timeout=30, name='crypto feed')
+        self._unchanged = False
+        self._version = 0
+        poll_scheduler.register(FEED_NAME, FeedSchedule(
+            base_interval=update_interval,
+            calendar=CRYPTO_CALENDAR
+        ))
+        self._load_snapshot()
+    def _load_snapshot(self):
+        """Warm the cache from the last persisted snapshot, marked as stale"""
+        if not self._snapshot_path:
+            return
+        snapshot = load_snapshot(self._snapshot_path)
+        if snapshot:
+            data, saved_at = snapshot
+            with self._lock:
+                if not self._cache:
+                    self._cache = data
+                    self._records = {symbol: Orderbook(symbol, entry) for symbol, entry in data.items()}
+                    self._last_update = saved_at
+                    self._stale = True
+                    self._version += 1
+    def _save_snapshot(self):
+        """Persist the current cache contents to disk"""
+        if not self._snapshot_path:
+            return
+        with self._lock:
+            data = dict(self._cache)
+            saved_at = self._last_update
+        save_snapshot(self._snapshot_path, data, saved_at)
     def start(self):
-        """Start the background update thread"""
+        """Start the background update thread, unless it is already running"""
+        if self._running:
+            return
         self._running = True
         self._update_thread = threading.Thread(target=self._update_loop, daemon=True)
         self._update_thread.start()
@@ -172,27 +256,33 @@ class CryptoCache:
     def stop(self):
         """Stop the background update thread"""
         self._running = False
+        poll_scheduler.wake(FEED_NAME)
         if self._update_thread:
             self._update_thread.join()
         logger.info("Crypto cache update thread stopped")
     def _fetch_all_data(self) -> Optional[Dict[str, Any]]:
         """Fetch data for all crypto symbols from the API in a single request
         Returns:
-            The API response data or None if the request failed
+            The API response data, or None if the request failed or nothing changed
         """
+        status, body = self._poller.fetch()
+        if status in (POLL_NOT_MODIFIED, POLL_UNCHANGED):
+            self._unchanged = True
+            return None
+        if status != POLL_CHANGED:
+            return None
         try:
-            response = requests.get(self._api_all_url, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('status') == 'ok':
-                    return data
-                else:
-                    logger.warning(f"API returned non-ok status for all data: {data.get('status')}")
-            else:
-                logger.warning(f"API request failed for all data with status code: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Error fetching all data: {str(e)}")
-        return None
+            data = decode_json(body)
+        except ValueError as e:
+            logger.error(f"Error decoding all data: {str(e)}")
+            self._poller.reject()
+            return None
+        if data.get('status') != 'ok':
+            logger.warning(f"API returned non-ok status for all data: {data.get('status')}")
+            self._poller.reject()
+            return None
+        self._poller.accept()
+        return data
     def _fetch_single_data(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Fetch data for a specific crypto symbol from the API
         Args:
@@ -204,7 +294,7 @@ class CryptoCache:
             url = f"{self._api_single_url}{symbol}"
             response = requests.get(url, timeout=10)
             if response.status_code == 200:
-                data = response.json()
+                data = decode_json(response.content)
                 if data.get('status') == 'ok':
                     return data
                 else:
@@ -218,13 +308,27 @@ class CryptoCache:
         """Background thread that updates the cache periodically"""
         while self._running:
             self._update_cache()
-            time.sleep(self._update_interval)
+            if self._running:
+                poll_scheduler.wait(FEED_NAME, poll_scheduler.next_interval(FEED_NAME))
     def _update_cache(self):
         """Update the cache with fresh data for all symbols"""
         logger.info("Updating crypto cache...")
+        self._unchanged = False
         all_data = self._fetch_all_data()
+        if self._unchanged:
+            with self._lock:
+                if self._cache:
+                    self._last_update = time.time()
+                    self._stale = False
+                total = len(self._cache)
+            self._fresh.set()
+            poll_scheduler.observe(FEED_NAME, 0, total)
+            logger.info("Crypto data unchanged, skipping update")
+            return
         if all_data:
             current_time = time.time()
+            changed = 0
+            total = 0
             with self._lock:
                 all_data.pop('status', None)
                 for symbol, data in all_data.items():
@@ -235,6 +339,9 @@ class CryptoCache:
                         price_change = None
                         price_change_percent = None
                         current_price = data.get('lastTradePrice')
+                        total += 1
+                        if prev_price != current_price:
+                            changed += 1
                         if prev_price and current_price:
                             try:
                                 prev_price_float = float(prev_price)
@@ -255,18 +362,32 @@ class CryptoCache:
                             'bids': data.get('bids', []),
                             'timestamp': current_time
                         }
+                        self._records[symbol] = Orderbook(symbol, self._cache[symbol])
                 self._last_update = current_time
+                self._stale = False
+                self._version += 1
+            self._fresh.set()
+            poll_scheduler.observe(FEED_NAME, changed, total)
             logger.info(f"Crypto cache updated successfully with {len(all_data)} symbols")
+            self._save_snapshot()
         else:
             logger.warning("Failed to fetch all data at once, falling back to individual updates")
+            updated = 0
             for symbol in POPULAR_CRYPTO_SYMBOLS:
                 try:
-                    self._update_cache_for_symbol(symbol)
+                    if self._update_cache_for_symbol(symbol):
+                        updated += 1
                 except Exception as e:
                     logger.error(f"Error updating cache for {symbol}: {str(e)}")
+            if not updated:
+                logger.warning("Individual crypto updates failed, keeping previous data")
+                return
             with self._lock:
                 self._last_update = time.time()
+                self._stale = False
+            self._fresh.set()
             logger.info("Crypto cache updated successfully using individual requests")
+            self._save_snapshot()
     def _update_cache_for_symbol(self, symbol):
         """Update the cache for a specific symbol
         Args:
@@ -303,11 +424,24 @@ class CryptoCache:
                         'bids': data.get('bids', []),
                         'timestamp': time.time()
                     }
+                    self._records[symbol] = Orderbook(symbol, self._cache[symbol])
+                    self._version += 1
                 logger.debug(f"Updated cache for {symbol} with price change tracking")
                 return True
         except Exception as e:
             logger.error(f"Error updating cache for {symbol}: {str(e)}")
         return False
+    def wait_fresh(self, timeout: Optional[float] = None) -> bool:
+        """Block until the first successful fetch since startup
+        Args:
+            timeout: Longest time to wait, in seconds
+        Returns:
+            True if fresh data arrived, False on timeout
+        """
+        return self._fresh.wait(timeout)
+    def note_request(self):
+        """Record one user request served from this feed, called once per request at the handler"""
+        poll_scheduler.note_request(FEED_NAME)
     def get_data(self, symbol: Optional[str] = None) -> Any:
         """Get cached data for a specific symbol or all symbols
         Args:
@@ -319,6 +453,22 @@ class CryptoCache:
             if symbol:
                 return self._cache.get(symbol)
             return self._cache
+    def get_orderbook(self, symbol: str) -> Optional[Orderbook]:
+        """Get the parsed orderbook summary of a symbol
+        Args:
+            symbol: The crypto symbol (e.g., 'BTCIRT')
+        Returns:
+            The parsed record, or None if the symbol is not cached
+        """
+        with self._lock:
+            return self._records.get(symbol)
+    def get_orderbooks(self) -> Dict[str, Orderbook]:
+        """Get the parsed orderbook summaries of every cached symbol
+        Returns:
+            Dictionary mapping symbols to their records
+        """
+        with self._lock:
+            return dict(self._records)
     def get_all_symbols(self) -> List[str]:
         """Get a list of all available symbols in the cache
         Returns:
@@ -338,4 +488,20 @@ class CryptoCache:
     def last_update_time(self) -> float:
         """Get the timestamp of the last update"""
         return self._last_update
+    @property
+    def version(self) -> int:
+        """Get a counter that changes only when the cached data is replaced"""
+        return self._version
+    @property
+    def refresh_stats(self) -> Dict[str, int]:
+        """Get poll counters, including how many refreshes were skipped"""
+        return self._poller.stats
+    @property
+    def is_stale(self) -> bool:
+        """Whether the cached data comes from a snapshot and no live fetch succeeded yet"""
+        return self._stale
+    @property
+    def data_age(self) -> float:
+        """Get the age of the cached data in seconds"""
+        return time.time() - self._last_update if self._last_update else float('inf')
 crypto_cache = CryptoCache()
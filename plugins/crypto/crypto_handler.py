@@ -10,8 +10,17 @@ import json
 from typing import Dict, Any, List, Optional, Tuple
 from telethon import events
 from telethon.tl.custom import Button
-from .crypto_cache import crypto_cache, POPULAR_CRYPTO_SYMBOLS, CRYPTO_INFO
+from .crypto_cache import crypto_cache, crypto_triggers, split_symbol, POPULAR_CRYPTO_SYMBOLS, CRYPTO_INFO
 from .currency_converter import format_number
+from ..search import fuzzy_index
+from ..edits import edit_if_changed
+from ..formatting import format_magnitude
+from ..group_replies import group_replies
+from ..snapshot import stale_note
+from ..callbacks import (
+    ACTION_CRYPTO_LIST_IRT, ACTION_CRYPTO_LIST_USDT, ACTION_CRYPTO_PRICE, ACTION_NOOP, callback_router,
+    encode_callback, notify_error
+)
 PERSIAN_DIGITS = {
     '۰': '0',
     '۱': '1',
@@ -24,6 +33,7 @@ PERSIAN_DIGITS = {
     '۸': '8',
     '۹': '9',
 }
+USDT_TRIGGERS = ['usdt', 'تتر', 'تتر به تومان', 'قیمت تتر', 'نرخ تتر']
 USDT_PRICE_CACHE = {
     'price': None,
     'timestamp': 0,
@@ -76,6 +86,7 @@ class CryptoHandler:
             client: The Telegram client
             amount_str: Optional string representing the amount from the message
         """
+        crypto_cache.note_request()
         parsed_amount = None
         if amount_str:
             parsed_amount = self._parse_amount(amount_str)
@@ -83,7 +94,7 @@ class CryptoHandler:
                 try:
                     test_amount = float(amount_str.replace(',', '').replace(' ', ''))
                     if test_amount > 1000000000:
-                        await event.respond(f"❌ مقدار وارد شده بسیار بزرگ است. لطفاً عددی کمتر از 1,000,000,000 وارد کنید.")
+                        await event.reply(f"❌ مقدار وارد شده بسیار بزرگ است. لطفاً عددی کمتر از 1,000,000,000 وارد کنید.")
                     else:
                         return
                 except:
@@ -117,7 +128,7 @@ class CryptoHandler:
             crypto_cache._update_cache_for_symbol(self.symbol)
             data = crypto_cache.get_data(self.symbol)
         if not data:
-            await event.respond(f'اطلاعات {self.name} در حال حاضر در دسترس نیست. ❌')
+            await event.reply(f'اطلاعات {self.name} در حال حاضر در دسترس نیست. ❌')
             return
         price = self._format_price(data.get('lastTradePrice', '0'))
         best_ask = self._get_best_price(data.get('asks', []), 'ask')
@@ -206,7 +217,11 @@ class CryptoHandler:
             caption += f"{change_emoji} **تغییرات:** {change_text}\n"
         caption += f"📈 **قیمت فروش:** {raw_ask} {self.quote_name}\n"
         caption += f"📉 **قیمت خرید:** {raw_bid} {self.quote_name}\n\n"
-        caption += f"🕒 **بروزرسانی:** {update_time}\n\n"
+        caption += f"🕒 **بروزرسانی:** {update_time}\n"
+        note = stale_note(crypto_cache)
+        if note:
+            caption += f"{note}\n"
+        caption += "\n"
         if usd_price and 'IRT' in self.symbol and parsed_amount == 1.0 and amount_str is None:
             try:
                 raw_usd_price = f"{int(usdt_data.get('lastTradePrice', '0')):,}"
@@ -231,9 +246,9 @@ class CryptoHandler:
                 [Button.url("📢 @TelebotCraft", "https://t.me/TelebotCraft")]
             ]
         if hasattr(event, 'message_id') and hasattr(event, 'edit'):
-            await event.edit(caption, buttons=buttons)
+            await edit_if_changed(event, caption, buttons)
         else:
-            await event.respond(caption, buttons=buttons)
+            await event.reply(caption, buttons=buttons)
     def _format_price(self, price_str: str) -> str:
         """Format the price string with commas and convert large numbers to text
         Args:
@@ -245,17 +260,7 @@ class CryptoHandler:
             price_float = float(price_str)
             if 'IRT' in self.symbol:
                 price_float = price_float / 10
-            price = int(price_float) if price_float == int(price_float) else price_float
-            if price >= 1_000_000_000_000:
-                return f"{price / 1_000_000_000_000:.2f} تریلیون"
-            elif price >= 1_000_000_000:
-                return f"{price / 1_000_000_000:.2f} میلیارد"
-            elif price >= 1_000_000:
-                return f"{price / 1_000_000:.2f} میلیون"
-            elif price >= 1_000:
-                return f"{price / 1_000:.2f} هزار"
-            else:
-                return f"{price:,}"
+            return format_magnitude(price_float)
         except (ValueError, TypeError):
             return price_str
     def _get_best_price(self, orders: List[List[str]], order_type: str) -> str:
@@ -303,73 +308,155 @@ class CryptoHandler:
         elif 'USDT' in self.symbol:
             return f"{self.base_symbol}/USDT"
         return self.symbol
-async def show_crypto_list(event, client):
-    """Show the list of available cryptocurrencies
+CRYPTO_LIST_EMOJIS = {
+    'BTC': '₿',
+    'ETH': 'Ξ',
+    'LTC': 'Ł',
+    'USDT': '₮',
+    'BNB': '🔶',
+    'SOL': '☀️',
+    'ADA': '🦊',
+    'XRP': '💧',
+    'DOGE': 'Ð',
+    'DOT': '◉',
+    'SHIB': '🐕',
+    'MATIC': '🔷',
+    'AVAX': '🔺',
+    'TRX': '♦️',
+}
+CRYPTO_LIST_TABS = {
+    'irt': ('IRT', '🇮🇷 بازار تومان', '🔸'),
+    'usdt': ('USDT', '💵 بازار تتر', '🔹'),
+}
+CRYPTO_LIST_ACTIONS = {
+    'irt': ACTION_CRYPTO_LIST_IRT,
+    'usdt': ACTION_CRYPTO_LIST_USDT,
+}
+CRYPTO_LIST_PER_PAGE = 20
+class CryptoListPages:
+    """Pages of the crypto list for every quote tab, rendered once per crypto snapshot"""
+    def __init__(self, per_page: int = CRYPTO_LIST_PER_PAGE):
+        """Create the list
+        Args:
+            per_page: Number of crypto buttons on each page
+        """
+        self.per_page = per_page
+        self._version = None
+        self._pages: Dict[str, List[Tuple[str, Any]]] = {}
+    def _build_tab(self, tab: str, symbols: List[str]) -> List[Tuple[str, list]]:
+        """Render every page of one tab
+        Args:
+            tab: The tab key in CRYPTO_LIST_TABS
+            symbols: Cached market symbols, in display order
+        Returns:
+            List of (message, buttons) pairs
+        """
+        quote, label, default_icon = CRYPTO_LIST_TABS[tab]
+        coin_buttons = []
+        for symbol in symbols:
+            base_symbol, quote_currency = split_symbol(symbol)
+            if quote_currency != quote:
+                continue
+            info = crypto_cache.get_crypto_info(base_symbol)
+            emoji = CRYPTO_LIST_EMOJIS.get(base_symbol, info.get('icon', default_icon))
+            coin_buttons.append(Button.inline(f"{emoji} {info.get('name', base_symbol)}", encode_callback(ACTION_CRYPTO_PRICE, symbol)))
+        chunks = [coin_buttons[i:i + self.per_page] for i in range(0, len(coin_buttons), self.per_page)] or [[]]
+        message = f"🪙 <b>لیست ارزهای دیجیتال ({label}):</b>\n\nلطفا یکی از ارزهای دیجیتال را انتخاب کنید:"
+        tab_row = [
+            Button.inline(f"✅ {tab_label}" if key == tab else tab_label, encode_callback(CRYPTO_LIST_ACTIONS[key], page=1))
+            for key, (_, tab_label, _) in CRYPTO_LIST_TABS.items()
+        ]
+        pages = []
+        for page, chunk in enumerate(chunks, start=1):
+            buttons = [tab_row]
+            buttons.extend(chunk[i:i + 2] for i in range(0, len(chunk), 2))
+            nav_buttons = []
+            if page > 1:
+                nav_buttons.append(Button.inline("⬅️ قبلی", encode_callback(CRYPTO_LIST_ACTIONS[tab], page=page - 1)))
+            nav_buttons.append(Button.inline(f"📄 {page}/{len(chunks)}", encode_callback(ACTION_NOOP)))
+            if page < len(chunks):
+                nav_buttons.append(Button.inline("بعدی ➡️", encode_callback(CRYPTO_LIST_ACTIONS[tab], page=page + 1)))
+            buttons.append(nav_buttons)
+            buttons.append([Button.switch_inline("🔎 جستجوی ارز دیجیتال", query="", same_peer=True)])
+            buttons.append([Button.inline("🏠 بازگشت به منوی اصلی", b"home")])
+            buttons.append([Button.url("📢 کانال ما", "https://t.me/TelebotCraft")])
+            pages.append((message, buttons))
+        return pages
+    def _refresh(self, client):
+        """Re-render every tab if the crypto snapshot changed"""
+        version = crypto_cache.version
+        if version == self._version and self._pages:
+            return
+        started = time.perf_counter()
+        popular = [s for s in POPULAR_CRYPTO_SYMBOLS if s]
+        symbols = crypto_cache.get_all_symbols()
+        available = set(symbols)
+        ordered = [s for s in popular if s in available]
+        pinned = set(ordered)
+        ordered.extend(s for s in symbols if s not in pinned)
+        self._pages = {
+            tab: [(message, client.build_reply_markup(buttons)) for message, buttons in self._build_tab(tab, ordered)]
+            for tab in CRYPTO_LIST_TABS
+        }
+        self._version = version
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.debug(f"Rendered crypto list for {len(ordered)} symbols in {elapsed_ms:.1f}ms")
+    def get(self, client, tab: str, page_number: int) -> Optional[Tuple[int, int, str, Any]]:
+        """Get a rendered page
+        Args:
+            client: The Telegram client used to prebuild the markup
+            tab: The tab key in CRYPTO_LIST_TABS
+            page_number: 1-based page number, clamped to the available pages
+        Returns:
+            Tuple of (page number, total pages, message, reply markup) or None for an unknown tab
+        """
+        crypto_cache.note_request()
+        self._refresh(client)
+        pages = self._pages.get(tab)
+        if not pages:
+            return None
+        page_number = min(max(1, page_number), len(pages))
+        message, markup = pages[page_number - 1]
+        return page_number, len(pages), message, markup
+crypto_list_pages = CryptoListPages()
+async def show_crypto_list(event, client, tab: str = 'irt', page: int = 1):
+    """Show a page of the list of available cryptocurrencies
     Args:
         event: The Telegram event
         client: The Telegram client
+        tab: The quote currency tab, 'irt' or 'usdt'
+        page: 1-based page number
     """
     try:
-        logger.info("Showing crypto list")
-        all_symbols = crypto_cache.get_all_symbols()
-        logger.info(f"Got {len(all_symbols)} symbols from cache")
-        irt_symbols = [s for s in all_symbols if 'IRT' in s]
-        usdt_symbols = [s for s in all_symbols if 'USDT' in s]
-        logger.info(f"Split into {len(irt_symbols)} IRT symbols and {len(usdt_symbols)} USDT symbols")
-        custom_emojis = {
-            'BTC': '₿',
-            'ETH': 'Ξ',
-            'LTC': 'Ł',
-            'USDT': '₮',
-            'BNB': '🔶',
-            'SOL': '☀️',
-            'ADA': '🦊',
-            'XRP': '💧',
-            'DOGE': 'Ð',
-            'DOT': '◉',
-            'SHIB': '🐕',
-            'MATIC': '🔷',
-            'AVAX': '🔺',
-            'TRX': '♦️',
-        }
-        irt_buttons = []
-        for symbol in irt_symbols:
-            base_symbol = symbol.split('IRT')[0]
-            info = crypto_cache.get_crypto_info(base_symbol)
-            emoji = custom_emojis.get(base_symbol, info.get('icon', '🔸'))
-            name = info.get('name', base_symbol)
-            irt_buttons.append(
-                Button.inline(f"{emoji} {name}", f"crypto_{symbol}")
-            )
-        usdt_buttons = []
-        for symbol in usdt_symbols:
-            base_symbol = symbol.split('USDT')[0]
-            info = crypto_cache.get_crypto_info(base_symbol)
-            emoji = custom_emojis.get(base_symbol, info.get('icon', '🔹'))
-            name = info.get('name', base_symbol)
-            usdt_buttons.append(
-                Button.inline(f"{emoji} {name}", f"crypto_{symbol}")
-            )
-        irt_rows = [irt_buttons[i:i+2] for i in range(0, len(irt_buttons), 2)]
-        usdt_rows = [usdt_buttons[i:i+2] for i in range(0, len(usdt_buttons), 2)]
-        buttons = []
-        buttons.extend(irt_rows)
-        buttons.extend(usdt_rows)
-        buttons.append([Button.inline("🏠 بازگشت به منوی اصلی", b"home")])
-        buttons.append([Button.url("📢 کانال ما", "https://t.me/TelebotCraft")])
-        message = "🪙 <b>لیست ارزهای دیجیتال:</b>\n\nلطفا یکی از ارزهای دیجیتال را انتخاب کنید:"
-        logger.info("Sending crypto list message with buttons")
-        await event.respond(message, buttons=buttons, parse_mode='html')
-        logger.info("Crypto list message sent successfully")
+        rendered = crypto_list_pages.get(client, tab, page)
+        if not rendered:
+            await notify_error(event, "لیست ارزهای دیجیتال در دسترس نیست.")
+            return
+        page, total_pages, message, markup = rendered
+        logger.debug(f"Showing crypto list tab {tab} page {page}/{total_pages}")
+        if isinstance(event, events.CallbackQuery.Event):
+            await edit_if_changed(event, message, markup, parse_mode='html')
+        else:
+            await event.respond(message, buttons=markup, parse_mode='html')
     except Exception as e:
         logger.error(f"Error in show_crypto_list: {str(e)}", exc_info=True)
-        await event.answer(f"خطا در نمایش لیست ارزهای دیجیتال: {str(e)}", alert=True)
+        await notify_error(event, f"خطا در نمایش لیست ارزهای دیجیتال: {str(e)}")
+@callback_router.route(ACTION_CRYPTO_LIST_IRT, 'crypto_list_irt', "خطا در نمایش لیست ارزهای دیجیتال.")
+async def handle_crypto_list_irt(event, payload):
+    """Handle toman tab navigation of the crypto list"""
+    await show_crypto_list(event, event.client, 'irt', payload.page)
+@callback_router.route(ACTION_CRYPTO_LIST_USDT, 'crypto_list_usdt', "خطا در نمایش لیست ارزهای دیجیتال.")
+async def handle_crypto_list_usdt(event, payload):
+    """Handle tether tab navigation of the crypto list"""
+    await show_crypto_list(event, event.client, 'usdt', payload.page)
 async def handle_usdt_price(event, client):
     """Handle USDT price requests
     Args:
         event: The Telegram event
         client: The Telegram client
     """
+    if not group_replies.admit(event, ("USDTIRT", None)):
+        return True
     handler = CryptoHandler(
         symbol="USDTIRT",
         name="تتر",
@@ -401,15 +488,28 @@ async def handle_crypto_button(event, client):
             symbol = data.replace('crypto_', '')
     else:
         symbol = data.split('crypto_')[1]
+    await _crypto_handler_for(symbol).handle_crypto(event, client)
+def _crypto_handler_for(symbol: str) -> CryptoHandler:
+    """Build a one-off handler for a market symbol"""
     base_symbol = symbol.split('IRT')[0].split('USDT')[0]
     info = crypto_cache.get_crypto_info(base_symbol)
-    handler = CryptoHandler(
+    return CryptoHandler(
         symbol=symbol,
         name=info.get('name', base_symbol),
         icon=info.get('icon', ''),
         triggers=[base_symbol]
     )
-    await handler.handle_crypto(event, client)
+@callback_router.route(ACTION_CRYPTO_PRICE, 'crypto_price', "خطا در نمایش قیمت ارز دیجیتال.")
+async def handle_crypto_price_callback(event, payload):
+    """Handle a coin button of the crypto list"""
+    symbol = payload.instrument_name
+    if symbol is None:
+        crypto_list_pages.get(event.client, 'irt', 1)
+        symbol = payload.instrument_name
+    if symbol is None:
+        await notify_error(event, "این دکمه منقضی شده است. لطفا لیست را دوباره باز کنید.")
+        return
+    await _crypto_handler_for(symbol).handle_crypto(event, event.client)
 async def get_live_usdt_price() -> Dict[str, Any]:
     """Get the live USDT price from external APIs
 {{ ... }}
@@ -509,16 +609,7 @@ def register_crypto_handlers(client):
     logger.info("Registering crypto handlers...")
     try:
         for symbol_pair in POPULAR_CRYPTO_SYMBOLS:
-            base_symbol = None
-            quote_currency = None
-            if symbol_pair.endswith("IRT"):
-                base_symbol = symbol_pair[:-3]
-                quote_currency = "IRT"
-            elif symbol_pair.endswith("USDT") and symbol_pair != "USDT":
-                base_symbol = symbol_pair[:-4]
-                quote_currency = "USDT"
-            else:
-                continue
+            base_symbol, quote_currency = split_symbol(symbol_pair)
             if not base_symbol:
                 continue
             info = crypto_cache.get_crypto_info(base_symbol)
@@ -526,26 +617,7 @@ def register_crypto_handlers(client):
                 logger.info(f"[USDTIRT_DEBUG] Processing symbol_pair: {symbol_pair}")
                 logger.info(f"[USDTIRT_DEBUG]   Base symbol: {base_symbol}, Quote: {quote_currency}")
                 logger.info(f"[USDTIRT_DEBUG]   Info for {base_symbol}: {info}")
-            triggers = []
-            triggers.append(base_symbol)
-            if info.get('name'):
-                triggers.append(info.get('name'))
-                triggers.append(f"قیمت {info.get('name')}")
-                triggers.append(f"نرخ {info.get('name')}")
-            if quote_currency == "IRT":
-                triggers.append(f"{base_symbol}IRT")
-                triggers.append(f"{base_symbol}/IRT")
-                triggers.append(f"{base_symbol} IRT")
-                if info.get('name'):
-                    triggers.append(f"{info.get('name')} تومان")
-                    triggers.append(f"{info.get('name')} به تومان")
-            elif quote_currency == "USDT":
-                triggers.append(f"{base_symbol}USDT")
-                triggers.append(f"{base_symbol}/USDT")
-                triggers.append(f"{base_symbol} USDT")
-                if info.get('name'):
-                    triggers.append(f"{info.get('name')} دلار")
-                    triggers.append(f"{info.get('name')} به دلار")
+            triggers = crypto_triggers(symbol_pair)
             handler_instance = CryptoHandler(
                 symbol=symbol_pair,
                 name=info.get('name', base_symbol),
@@ -557,6 +629,7 @@ def register_crypto_handlers(client):
             for trigger_word in triggers:
                 if not trigger_word:
                     continue
+                fuzzy_index.add(trigger_word)
                 pattern_regex = rf"^(?:([۰-۹\d\.,\s]+)\s*)?{re.escape(trigger_word)}(?:\s*([۰-۹\d\.,\s]+))?$"
                 if symbol_pair == "USDTIRT":
                     logger.info(f"[USDTIRT_DEBUG]     Registering trigger: '{trigger_word}' with pattern: {pattern_regex}")
@@ -569,7 +642,8 @@ def register_crypto_handlers(client):
                         amount_str = amount_str_before.strip()
                     elif amount_str_after and amount_str_after.strip():
                         amount_str = amount_str_after.strip()
-                    await current_handler.handle_crypto(event, client, amount_str=amount_str)
+                    if group_replies.admit(event, (current_handler.symbol, amount_str)):
+                        await current_handler.handle_crypto(event, client, amount_str=amount_str)
                     raise events.StopPropagation
                 client.add_event_handler(specific_handler, events.NewMessage(pattern=re.compile(pattern_regex, re.IGNORECASE)))
         logger.info(f"Successfully registered crypto handlers.")
@@ -588,8 +662,9 @@ def initialize_crypto_plugin(client):
         lambda e: handle_crypto_button(e, client),
         events.CallbackQuery(pattern=r'^crypto_')
     )
+    fuzzy_index.add_many(USDT_TRIGGERS)
     client.add_event_handler(
         lambda e: handle_usdt_price(e, client),
-        events.NewMessage(pattern=r'(?i)^(usdt|تتر|تتر به تومان|قیمت تتر|نرخ تتر)$')
+        events.NewMessage(pattern=rf"(?i)^({'|'.join(USDT_TRIGGERS)})$")
     )
     logger.info("Crypto plugin initialized successfully")
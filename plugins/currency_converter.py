@@ -209,7 +209,7 @@ async def handle_currency(event, client):
                 amount = float(amount_str)
                 data = event.client.currency_data
                 if not data:
-                    await event.respond('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
+                    await event.reply('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
                     return
                 pkr_rate = 0.15
                 converted_amount = amount * pkr_rate
@@ -219,7 +219,7 @@ async def handle_currency(event, client):
 {formatted_amount} روپیه پاکستان = {formatted_result} تومان
 📊 نرخ تبدیل: 1 روپیه پاکستان = {format_number(pkr_rate)} تومان
 ⏱ آخرین بروزرسانی: نامشخص"""
-                await event.respond(message)
+                await event.reply(message)
                 return
             except ValueError:
                 pass
@@ -240,10 +240,10 @@ async def handle_currency(event, client):
         amount = float(amount_str)
         MAX_AMOUNT = 1000000000
         if amount > MAX_AMOUNT:
-            await event.respond(f'❌ مقدار وارد شده بسیار بزرگ است. لطفاً عددی کمتر از {format_number(MAX_AMOUNT)} وارد کنید.')
+            await event.reply(f'❌ مقدار وارد شده بسیار بزرگ است. لطفاً عددی کمتر از {format_number(MAX_AMOUNT)} وارد کنید.')
             return
     except ValueError:
-        await event.respond('❌ مقدار وارد شده معتبر نیست. لطفاً یک عدد معتبر وارد کنید.')
+        await event.reply('❌ مقدار وارد شده معتبر نیست. لطفاً یک عدد معتبر وارد کنید.')
         return
     from_currency = from_currency.lower().strip()
     to_currency = to_currency.lower().strip()
@@ -602,7 +602,7 @@ async def handle_currency(event, client):
         return
     data = event.client.currency_data
     if not data:
-        await event.respond('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
+        await event.reply('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
         return
     result = await convert_currency(amount, from_code, to_code, data)
     if isinstance(result, dict) and 'error' in result:
@@ -610,10 +610,10 @@ async def handle_currency(event, client):
         if error_type in ['both_currencies_not_found', 'from_currency_not_found', 'to_currency_not_found']:
             return
         else:
-            await event.respond('❌ خطا در تبدیل ارز. لطفاً دوباره تلاش کنید.')
+            await event.reply('❌ خطا در تبدیل ارز. لطفاً دوباره تلاش کنید.')
             return
     if not result:
-        await event.respond('❌ خطا در تبدیل ارز. لطفاً دوباره تلاش کنید.')
+        await event.reply('❌ خطا در تبدیل ارز. لطفاً دوباره تلاش کنید.')
         return
     converted_amount, from_name, to_name, from_price, to_price = result
     if converted_amount == int(converted_amount):
@@ -661,9 +661,9 @@ async def handle_currency(event, client):
 ⏱ آخرین بروزرسانی: {data.get('lastUpdate', 'نامشخص')}"""
     buttons = [
         [Button.url("📢 کانال ما", "https://t.me/TelebotCraft")],
-        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{(await client.get_me()).username}?startgroup=true")]
+        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{client.bot_username}?startgroup=true")]
     ]
-    await event.respond(message, buttons=buttons, parse_mode='html')
+    await event.reply(message, buttons=buttons, parse_mode='html')
 async def convert_currency(amount, from_code, to_code, data):
     """Convert between currencies using the latest exchange rates"""
     if from_code == to_code:
@@ -1,27 +1,36 @@
 from telethon import events
 from telethon.tl.custom import Button
-from .utils import format_number, format_change
+from .snapshot import stale_note
 class CurrencyHandler:
-    def __init__(self, name, flag, triggers):
+    def __init__(self, name, flag, triggers, sections=('mainCurrencies', 'minorCurrencies'),
+                 unavailable_text='متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌'):
         self.name = name
         self.flag = flag
         self.triggers = triggers
+        self.sections = sections
+        self.unavailable_text = unavailable_text
+    def find_quote(self, quotes):
+        """Find the quote of this instrument in the first section that has it"""
+        for section in self.sections:
+            quote = quotes.get(self.name, section)
+            if quote:
+                return quote
+        return None
     async def handle_currency(self, event, client):
         """Handle currency requests"""
-        data = event.client.currency_data
-        if not data:
-            await event.respond('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
+        quotes = event.client.currency_cache.get_quotes()
+        if not quotes:
+            await event.reply(self.unavailable_text)
             return
-        currencies = data.get('mainCurrencies', {}).get('data', [])
-        currency_info = next((c for c in currencies if c['currencyName'] == self.name), None)
-        if not currency_info:
-            await event.respond(f'اطلاعات {self.name} در حال حاضر در دسترس نیست. ❌')
+        quote = self.find_quote(quotes)
+        if not quote:
+            await event.reply(f'اطلاعات {self.name} در حال حاضر در دسترس نیست. ❌')
             return
-        price = format_number(currency_info['livePrice'])
-        change = format_change(currency_info['change'])
-        lowest = format_number(currency_info['lowest'])
-        highest = format_number(currency_info['highest'])
-        time = currency_info['time']
+        price = quote.price_text
+        change = quote.change_text
+        lowest = quote.lowest_text
+        highest = quote.highest_text
+        time = quote.time
         buttons = [
             [Button.inline("💰 قیمت فعلی", b'noop'), Button.inline(f"{price} تومان", b'noop')],
             [Button.inline("📊 تغییرات", b'noop'), Button.inline(f"{change}", b'noop')],
@@ -29,7 +38,10 @@ class CurrencyHandler:
             [Button.inline("⬆️ بیشترین", b'noop'), Button.inline(f"{highest}", b'noop')],
             [Button.inline("🕒 بروزرسانی", b'noop'), Button.inline(f"{time}", b'noop')],
             [Button.url("📢 کانال ما", "https://t.me/TelebotCraft")],
-            [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{(await client.get_me()).username}?startgroup=true")]
+            [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{client.bot_username}?startgroup=true")]
         ]
         message = f"{self.flag} نرخ لحظه‌ای {self.name}:"
-        await event.respond(message, buttons=buttons)
+        note = stale_note(event.client.currency_cache)
+        if note:
+            message = f"{message}\n{note}"
+        await event.reply(message, buttons=buttons)
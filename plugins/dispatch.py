@@ -0,0 +1,245 @@
+"""
+Bounded event dispatcher for the currency bot.
+This module runs message and inline handlers on a fixed pool of workers instead
+of one unbounded task each. Events of one chat run in arrival order, ready chats
+are served by priority (private chat, then group, then inline) and under overload
+the lowest priority or stale work is shed first.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+logger = logging.getLogger('Dispatch')
+PRIORITY_PRIVATE = 0
+PRIORITY_GROUP = 1
+PRIORITY_INLINE = 2
+PRIORITY_NAMES = {
+    PRIORITY_PRIVATE: 'private',
+    PRIORITY_GROUP: 'group',
+    PRIORITY_INLINE: 'inline',
+}
+STALE_AFTER = {
+    PRIORITY_PRIVATE: None,
+    PRIORITY_GROUP: 30.0,
+    PRIORITY_INLINE: 4.0,
+}
+class _Job:
+    """One queued handler call"""
+    __slots__ = ('priority', 'key', 'handler', 'args', 'future', 'enqueued', 'done')
+    def __init__(self, priority: int, key: Hashable, handler: Callable[..., Awaitable], args: Tuple,
+                 future: asyncio.Future):
+        self.priority = priority
+        self.key = key
+        self.handler = handler
+        self.args = args
+        self.future = future
+        self.enqueued = time.monotonic()
+        self.done = False
+def classify(event) -> Tuple[int, Hashable]:
+    """Get the priority and ordering key of a message or callback event"""
+    if getattr(event, 'is_private', False):
+        return PRIORITY_PRIVATE, event.chat_id
+    return PRIORITY_GROUP, getattr(event, 'chat_id', None)
+class EventDispatcher:
+    """Fixed worker pool with per-chat ordering, priorities and load shedding"""
+    def __init__(self, workers: int = 16, max_pending: int = 2000,
+                 stale_after: Optional[Dict[int, Optional[float]]] = None):
+        """Initialize the dispatcher
+        Args:
+            workers: Number of handlers run at the same time
+            max_pending: Queued handlers beyond which lower priority work is shed
+            stale_after: Seconds after which a queued handler of each priority is dropped, None to keep
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.stale_after = stale_after if stale_after is not None else dict(STALE_AFTER)
+        self._chats: Dict[Hashable, Deque[_Job]] = {}
+        self._running: Set[Hashable] = set()
+        self._ready: List[Tuple[int, int, Hashable]] = []
+        self._ready_count: Optional[asyncio.Semaphore] = None
+        self._by_priority: Dict[int, Deque[_Job]] = {priority: deque() for priority in PRIORITY_NAMES}
+        self._depth: Dict[int, int] = {priority: 0 for priority in PRIORITY_NAMES}
+        self._sequence = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        self._stats: Dict[int, Dict[str, float]] = {
+            priority: {
+                'submitted': 0, 'completed': 0, 'failed': 0, 'shed': 0, 'stale': 0,
+                'max_depth': 0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0
+            }
+            for priority in PRIORITY_NAMES
+        }
+    def _ensure_workers(self):
+        """Start the worker pool on first use, inside the running loop"""
+        if self._tasks:
+            return
+        self._ready_count = asyncio.Semaphore(0)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Started {self.workers} dispatch workers with room for {self.max_pending} queued events")
+    def _push_ready(self, key: Hashable):
+        """Offer a chat with queued work to the workers"""
+        head = self._chats[key][0]
+        heapq.heappush(self._ready, (head.priority, next(self._sequence), key))
+        self._ready_count.release()
+    def _discard(self, job: _Job, reason: str):
+        """Drop a queued job without running it"""
+        job.done = True
+        self._depth[job.priority] -= 1
+        self._stats[job.priority][reason] += 1
+        if not job.future.done():
+            job.future.set_result(False)
+    def _evict_below(self, priority: int) -> bool:
+        """Drop the oldest queued job of the lowest priority below the given one
+        Returns:
+            True if a job was dropped
+        """
+        for victim_priority in sorted(self._by_priority, reverse=True):
+            if victim_priority <= priority:
+                break
+            queue = self._by_priority[victim_priority]
+            while queue:
+                job = queue.popleft()
+                if job.done:
+                    continue
+                chat = self._chats.get(job.key)
+                if chat is not None:
+                    chat.remove(job)
+                    if not chat and job.key not in self._running:
+                        del self._chats[job.key]
+                self._discard(job, 'shed')
+                return True
+        return False
+    def submit(self, event, handler: Callable[..., Awaitable], *args, priority: Optional[int] = None,
+               key: Hashable = None) -> Optional[asyncio.Future]:
+        """Queue a handler call for an event
+        Args:
+            event: The event being handled, used to pick the priority and ordering key
+            handler: Coroutine function called with args
+            priority: One of the PRIORITY_* classes, classified from the event by default
+            key: Events with the same key run one at a time in order, defaults to the chat
+        Returns:
+            Future resolved to True once the handler ran or False if it was dropped,
+            or None if the event was shed on arrival
+        """
+        self._ensure_workers()
+        if priority is None or key is None:
+            default_priority, default_key = classify(event)
+            priority = default_priority if priority is None else priority
+            key = default_key if key is None else key
+        stats = self._stats[priority]
+        stats['submitted'] += 1
+        if sum(self._depth.values()) >= self.max_pending and not self._evict_below(priority):
+            stats['shed'] += 1
+            logger.warning(f"Dispatcher full, shedding {PRIORITY_NAMES[priority]} event for {key}")
+            return None
+        job = _Job(priority, key, handler, args, asyncio.get_event_loop().create_future())
+        queue = self._by_priority[priority]
+        while queue and queue[0].done:
+            queue.popleft()
+        queue.append(job)
+        self._depth[priority] += 1
+        stats['max_depth'] = max(stats['max_depth'], self._depth[priority])
+        chat = self._chats.get(key)
+        if chat is None:
+            chat = self._chats[key] = deque()
+        chat.append(job)
+        if len(chat) == 1 and key not in self._running:
+            self._push_ready(key)
+        return job.future
+    def wrap(self, handler: Callable[..., Awaitable], priority: Optional[int] = None,
+             key: Optional[Callable[[Any], Hashable]] = None) -> Callable[..., Awaitable]:
+        """Wrap an event handler so it runs on the dispatcher and waits for its turn
+        Args:
+            handler: Coroutine function called with the event
+            priority: One of the PRIORITY_* classes, classified from the event by default
+            key: Function of the event giving its ordering key, defaults to the chat
+        """
+        async def dispatched(event):
+            future = self.submit(event, handler, event, priority=priority, key=key(event) if key else None)
+            if future is not None:
+                await future
+        return dispatched
+    def _next_job(self, key: Hashable) -> Optional[_Job]:
+        """Take the next runnable job of a chat, dropping stale and cancelled ones"""
+        chat = self._chats.get(key)
+        now = time.monotonic()
+        while chat:
+            job = chat.popleft()
+            stale_after = self.stale_after.get(job.priority)
+            if job.future.cancelled():
+                job.done = True
+                self._depth[job.priority] -= 1
+            elif stale_after is not None and now - job.enqueued > stale_after:
+                self._discard(job, 'stale')
+            else:
+                return job
+        return None
+    async def _worker(self):
+        """Run queued jobs, one chat at a time"""
+        while True:
+            await self._ready_count.acquire()
+            _, _, key = heapq.heappop(self._ready)
+            if key in self._running:
+                continue
+            job = self._next_job(key)
+            if job is None:
+                if key in self._chats and not self._chats[key]:
+                    del self._chats[key]
+                continue
+            self._running.add(key)
+            job.done = True
+            self._depth[job.priority] -= 1
+            stats = self._stats[job.priority]
+            wait_ms = (time.monotonic() - job.enqueued) * 1000
+            stats['wait_ms_total'] += wait_ms
+            stats['wait_ms_max'] = max(stats['wait_ms_max'], wait_ms)
+            try:
+                await job.handler(*job.args)
+                stats['completed'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats['failed'] += 1
+                logger.error(f"Error in dispatched {PRIORITY_NAMES[job.priority]} handler: {str(e)}", exc_info=True)
+            finally:
+                if not job.future.done():
+                    job.future.set_result(True)
+                self._running.discard(key)
+                if self._chats.get(key):
+                    self._push_ready(key)
+                else:
+                    self._chats.pop(key, None)
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Get queue depth, shed counts and wait times per priority class"""
+        result = {}
+        for priority, name in PRIORITY_NAMES.items():
+            stats = self._stats[priority]
+            started = stats['completed'] + stats['failed'] or 1
+            result[name] = {
+                'depth': self._depth[priority],
+                'max_depth': stats['max_depth'],
+                'submitted': stats['submitted'],
+                'completed': stats['completed'],
+                'failed': stats['failed'],
+                'shed': stats['shed'],
+                'stale': stats['stale'],
+                'wait_ms_avg': stats['wait_ms_total'] / started,
+                'wait_ms_max': stats['wait_ms_max']
+            }
+        return result
+    @property
+    def pending(self) -> int:
+        """Get the number of queued handlers"""
+        return sum(self._depth.values())
+    @property
+    def running(self) -> int:
+        """Get the number of handlers running now"""
+        return len(self._running)
+    def stop(self):
+        """Cancel the workers"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+event_dispatcher = EventDispatcher()
@@ -0,0 +1,109 @@
+"""
+Message edit helpers for the currency bot.
+This module remembers a fingerprint of the last content sent to every edited
+message so identical edits are answered locally instead of going to Telegram.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+from telethon.errors import MessageNotModifiedError
+logger = logging.getLogger('Edits')
+UNCHANGED_TOAST = "✅ اطلاعات نمایش داده شده به‌روز است"
+def _button_bytes(button: Any) -> bytes:
+    """Serialize a button or reply markup for fingerprinting"""
+    try:
+        return bytes(button)
+    except TypeError:
+        return repr(button).encode('utf-8')
+def content_fingerprint(text: str, buttons: Any = None, parse_mode: Any = None) -> bytes:
+    """Hash the text, buttons and parse mode of a message
+    Args:
+        text: The message text
+        buttons: A reply markup, a row of buttons or a list of button rows
+        parse_mode: The parse mode used to send the text
+    Returns:
+        A 16-byte digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(text).encode('utf-8'))
+    digest.update(b'\x00' + str(parse_mode).encode('utf-8'))
+    if buttons is not None:
+        rows = buttons if isinstance(buttons, (list, tuple)) else [buttons]
+        for row in rows:
+            digest.update(b'\x01')
+            for button in (row if isinstance(row, (list, tuple)) else [row]):
+                digest.update(b'\x02' + _button_bytes(button))
+    return digest.digest()
+def message_key(event) -> Optional[Tuple[Hashable, Hashable]]:
+    """Get the (chat, message) key of the message a callback belongs to"""
+    message_id = getattr(event, 'message_id', None)
+    if message_id is None:
+        return None
+    if not isinstance(message_id, int):
+        message_id = _button_bytes(message_id)
+    return getattr(event, 'chat_id', None), message_id
+class EditFingerprints:
+    """Bounded LRU of the last content fingerprint per (chat, message)"""
+    def __init__(self, max_entries: int = 4096):
+        """Initialize the store
+        Args:
+            max_entries: Number of messages remembered
+        """
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[Hashable, Hashable], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.sent = 0
+    def is_unchanged(self, key, fingerprint: bytes) -> bool:
+        """Check whether a message already shows the fingerprinted content"""
+        with self._lock:
+            if self._entries.get(key) != fingerprint:
+                return False
+            self._entries.move_to_end(key)
+            return True
+    def remember(self, key, fingerprint: bytes):
+        """Record the content a message now shows"""
+        with self._lock:
+            self._entries[key] = fingerprint
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    @property
+    def stats(self):
+        """Get counters of sent and skipped edits"""
+        return {'entries': len(self._entries), 'sent': self.sent, 'skipped': self.skipped}
+edit_fingerprints = EditFingerprints()
+async def edit_if_changed(event, text: str, buttons: Any = None, parse_mode: Any = (), **kwargs) -> bool:
+    """Edit a callback's message unless it already shows the same content
+    Identical edits are answered with a toast and never sent to Telegram.
+    Args:
+        event: The CallbackQuery event
+        text: The new message text
+        buttons: The new buttons or reply markup
+        parse_mode: Parse mode forwarded to event.edit when given
+    Returns:
+        True if the edit was sent, False if it was skipped
+    """
+    key = message_key(event)
+    fingerprint = content_fingerprint(text, buttons, parse_mode)
+    if key is not None and edit_fingerprints.is_unchanged(key, fingerprint):
+        edit_fingerprints.skipped += 1
+        await event.answer(UNCHANGED_TOAST)
+        return False
+    if parse_mode != ():
+        kwargs['parse_mode'] = parse_mode
+    try:
+        await event.edit(text, buttons=buttons, **kwargs)
+    except MessageNotModifiedError:
+        logger.debug(f"Message {key} was already up to date")
+        edit_fingerprints.skipped += 1
+        if key is not None:
+            edit_fingerprints.remember(key, fingerprint)
+        await event.answer(UNCHANGED_TOAST)
+        return False
+    edit_fingerprints.sent += 1
+    if key is not None:
+        edit_fingerprints.remember(key, fingerprint)
+    return True
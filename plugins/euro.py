@@ -6,12 +6,12 @@ async def handle_currency(event, client):
     """Handle euro currency requests"""
     data = event.client.currency_data
     if not data:
-        await event.respond('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
+        await event.reply('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
         return
     currencies = data.get('mainCurrencies', {}).get('data', [])
     euro_info = next((c for c in currencies if c['currencyName'] == 'یورو'), None)
     if not euro_info:
-        await event.respond('اطلاعات یورو در حال حاضر در دسترس نیست. ❌')
+        await event.reply('اطلاعات یورو در حال حاضر در دسترس نیست. ❌')
         return
     price = format_number(euro_info['livePrice'])
     change = format_change(euro_info['change'])
@@ -25,7 +25,7 @@ async def handle_currency(event, client):
         [Button.inline("⬆️ بیشترین", b'noop'), Button.inline(f"{highest}", b'noop')],
         [Button.inline("🕒 بروزرسانی", b'noop'), Button.inline(f"{time}", b'noop')],
         [Button.url("📢 کانال ما", "https://t.me/TelebotCraft")],
-        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{(await client.get_me()).username}?startgroup=true")]
+        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{client.bot_username}?startgroup=true")]
     ]
     message = f"🇪🇺 نرخ لحظه‌ای یورو:"
-    await event.respond(message, buttons=buttons)
+    await event.reply(message, buttons=buttons)
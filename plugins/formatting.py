@@ -0,0 +1,137 @@
+"""
+Number and change formatting for the currency bot.
+This module is the single implementation behind every format_number and
+format_change helper, using built-in digit grouping instead of slicing loops.
+"""
+import threading
+from typing import Any, Dict, Tuple
+PERSIAN_OUTPUT_DIGITS = str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')
+MAGNITUDE_WORDS = (
+    (1_000_000_000_000, 'تریلیون'),
+    (1_000_000_000, 'میلیارد'),
+    (1_000_000, 'میلیون'),
+    (1_000, 'هزار'),
+)
+MAX_CHANGE_MEMO = 4096
+_change_memo: Dict[Tuple[str, bool], str] = {}
+_change_memo_lock = threading.Lock()
+def to_persian_digits(text: str) -> str:
+    """Replace Latin digits with Persian digits"""
+    return text.translate(PERSIAN_OUTPUT_DIGITS)
+def _group_digits(text: str) -> str:
+    """Group the integer part of a numeric string with commas, keeping its decimals as given"""
+    int_part, separator, dec_part = text.partition('.')
+    if int_part.isdigit():
+        if len(int_part) < 4:
+            return text
+        if len(int_part) < 7:
+            return f"{int_part[:-3]},{int_part[-3:]}{separator}{dec_part}"
+        return f"{int(int_part):,}{separator}{dec_part}"
+    int_part, separator, dec_part = text.replace(',', '').strip().partition('.')
+    sign = ''
+    if int_part[:1] in ('-', '+'):
+        sign, int_part = int_part[0], int_part[1:]
+    if not int_part.isdigit():
+        return text
+    if len(int_part) < 4:
+        return f"{sign}{int_part}{separator}{dec_part}"
+    return f"{sign}{int(int_part):,}{separator}{dec_part}"
+def format_number(number: Any, persian: bool = False) -> str:
+    """Format a number with commas for thousands
+    Strings keep their decimal places, floats drop trailing zeros and non-numeric
+    values such as 'N/A' are returned unchanged.
+    Args:
+        number: An int, float or numeric string such as '82710' or '1,234.5'
+        persian: Whether to output Persian digits
+    Returns:
+        The formatted number
+    """
+    if isinstance(number, str):
+        text = _group_digits(number)
+    elif isinstance(number, int):
+        text = f"{number:,}"
+    elif isinstance(number, float):
+        text = _group_digits(f"{number:f}".rstrip('0').rstrip('.'))
+    else:
+        text = _group_digits(str(number))
+    return text.translate(PERSIAN_OUTPUT_DIGITS) if persian else text
+def format_amount(number: Any, persian: bool = False) -> str:
+    """Format an amount with precision that grows as the value gets smaller
+    Args:
+        number: The amount; ints are grouped without decimals
+        persian: Whether to output Persian digits
+    Returns:
+        The formatted amount
+    """
+    if isinstance(number, float):
+        magnitude = abs(number)
+        if magnitude >= 1000:
+            text = f"{number:,.2f}"
+        elif magnitude >= 100:
+            text = f"{number:,.3f}"
+        elif magnitude >= 10:
+            text = f"{number:,.4f}"
+        elif magnitude >= 1:
+            text = f"{number:,.5f}"
+        else:
+            text = f"{number:,.8f}"
+    else:
+        text = f"{number:,}"
+    return text.translate(PERSIAN_OUTPUT_DIGITS) if persian else text
+def format_magnitude(value: float, precision: int = 2, persian: bool = False) -> str:
+    """Format a large value with a magnitude word, e.g. '1.25 میلیون'
+    Args:
+        value: The value to format
+        precision: Decimal places shown before the magnitude word
+        persian: Whether to output Persian digits
+    Returns:
+        The formatted value; values below a thousand are only grouped
+    """
+    magnitude = abs(value)
+    if magnitude < 1_000:
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return format_number(value, persian)
+    for threshold, word in MAGNITUDE_WORDS:
+        if magnitude >= threshold:
+            text = '%.*f %s' % (precision, value / threshold, word)
+            return text.translate(PERSIAN_OUTPUT_DIGITS) if persian else text
+def _format_change(change: str, persian: bool) -> str:
+    """Format a raw change string such as '(0.58%) 4,800' with an arrow and sign"""
+    try:
+        text = change.strip('()')
+        if '(' in change and ')' in text:
+            text = text.split(')')[-1].strip()
+        value = text.split()[-1].replace(',', '')
+        try:
+            negative = float(value) < 0 or change.strip('() ').startswith('-')
+        except ValueError:
+            negative = change.strip('() ').startswith('-')
+        formatted = format_number(value.lstrip('-+'), persian)
+        return f"📉 {formatted}-" if negative else f"📈 {formatted}+"
+    except Exception:
+        return change
+def format_change(change: Any, persian: bool = False) -> str:
+    """Format a price change with an arrow and sign
+    Results are memoized per raw string until clear_change_memo is called for a new snapshot.
+    Args:
+        change: The raw change field, e.g. '(0.58%) 4,800'
+        persian: Whether to output Persian digits
+    Returns:
+        The formatted change, or the input as text if it cannot be parsed
+    """
+    if not isinstance(change, str):
+        return str(change)
+    key = (change, persian)
+    formatted = _change_memo.get(key)
+    if formatted is None:
+        formatted = _format_change(change, persian)
+        with _change_memo_lock:
+            if len(_change_memo) >= MAX_CHANGE_MEMO:
+                _change_memo.clear()
+            _change_memo[key] = formatted
+    return formatted
+def clear_change_memo():
+    """Forget memoized change strings, called when a new snapshot replaces the old one"""
+    with _change_memo_lock:
+        _change_memo.clear()
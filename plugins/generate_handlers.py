@@ -1,6 +1,8 @@
-import os
 import json
-import re
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from plugins.instruments import save_instruments
 COMPREHENSIVE_CURRENCY_CONFIGS = [
     {'name': 'دلار', 'flag': '🇺🇸', 'triggers': ['Dollar', 'USD', 'Usd', 'dollar', 'usd', 'دلار', 'دلار آمریکا']},
     {'name': 'یورو', 'flag': '🇪🇺', 'triggers': ['EUR', 'Euro', 'Eur', 'euro', 'eur', 'یورو', 'یورو اروپا']},
@@ -177,48 +179,8 @@ COMPREHENSIVE_CURRENCY_CONFIGS = [
     {'name': 'دوبرا سائوتومه و پرنسیپ', 'flag': '🇸🇹', 'triggers': ['STN', 'São Tomé and Príncipe Dobra', 'Stn', 'dobra', 'são tomé and príncipe dobra', 'stn', 'دوبرا سائوتومه و پرنسیپ']},
     {'name': 'دلار کارائیب شرقی', 'flag': '🌴', 'triggers': ['East Caribbean Dollar', 'XCD', 'Xcd', 'east caribbean dollar', 'xcd', 'دلار کارائیب شرقی']}
 ]
-TEMPLATE = '''from telethon import events
-from telethon.tl.custom import Button
-from .utils import format_number, format_change
-TRIGGERS = {triggers}
-async def handle_currency(event, client):
-    """Handle {name} currency requests"""
-    data = event.client.currency_data
-    if not data:
-        await event.respond('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
-        return
-    currencies = data.get('mainCurrencies', {{}}).get('data', [])
-    currency_info = next((c for c in currencies if c['currencyName'] == '{name}'), None)
-    if not currency_info:
-        currencies = data.get('minorCurrencies', {{}}).get('data', [])
-        currency_info = next((c for c in currencies if c['currencyName'] == '{name}'), None)
-    if not currency_info:
-        await event.respond('اطلاعات {name} در حال حاضر در دسترس نیست. ❌')
-        return
-    price = format_number(currency_info['livePrice'])
-    change = format_change(currency_info['change'])
-    lowest = format_number(currency_info['lowest'])
-    highest = format_number(currency_info['highest'])
-    time = currency_info['time']
-    buttons = [
-        [Button.inline("💰 قیمت فعلی", b'noop'), Button.inline(f"{{price}} تومان", b'noop')],
-        [Button.inline("📊 تغییرات", b'noop'), Button.inline(f"{{change}}", b'noop')],
-        [Button.inline("⬇️ کمترین", b'noop'), Button.inline(f"{{lowest}}", b'noop')],
-        [Button.inline("⬆️ بیشترین", b'noop'), Button.inline(f"{{highest}}", b'noop')],
-        [Button.inline("🕒 بروزرسانی", b'noop'), Button.inline(f"{{time}}", b'noop')],
-        [Button.url("📢 کانال ما", "https://t.me/TelebotCraft")],
-        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{{(await client.get_me()).username}}?startgroup=true")]
-    ]
-    message = f"{flag} نرخ لحظه‌ای {name}:"
-    await event.respond(message, buttons=buttons)
-'''
-def make_filename(name):
-    """Convert currency name to a valid filename"""
-    filename = name.replace(' ', '_')
-    filename = re.sub(r'[\/:*?"<>|]', '', filename)
-    return f"{filename}.py"
 def generate_handlers():
-    """Generate handler files for all currencies from generation_data.json"""
+    """Generate the currency entries of instruments.json from generation_data.json"""
     try:
         with open('../generation_data.json', 'r', encoding='utf-8') as f:
             generation_data = json.load(f)
@@ -234,8 +196,13 @@ def generate_handlers():
     if not currency_groups_to_process:
         print("No currency data found in generation_data.json to process.")
         return
+    instruments = []
+    seen = set()
     for item in currency_groups_to_process:
         currency_name = item['currencyName']
+        if currency_name in seen:
+            continue
+        seen.add(currency_name)
         currency_config = config_map.get(currency_name)
         if not currency_config:
             print(f"Warning: No configuration found for '{currency_name}' in COMPREHENSIVE_CURRENCY_CONFIGS. Using defaults.")
@@ -243,21 +210,11 @@ def generate_handlers():
             triggers = [currency_name]
         else:
             flag = currency_config.get('flag', '🌐')
-            triggers = currency_config.get('triggers', [currency_name])
+            triggers = list(currency_config.get('triggers', [currency_name]))
             if currency_name not in triggers:
                 triggers.insert(0, currency_name)
-        filename = make_filename(currency_name)
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                handler_code = TEMPLATE.format(
-                    name=currency_name,
-                    flag=flag,
-                    triggers=repr(triggers)
-                )
-                f.write(handler_code)
-            print(f"Generated handler for {currency_name}")
-        except Exception as e:
-            print(f"Error generating handler for {currency_name}: {e}")
-    print("Currency handlers generation complete!")
+        instruments.append({'kind': 'currency', 'name': currency_name, 'flag': flag, 'triggers': triggers})
+    save_instruments('currency', instruments)
+    print(f"Generated {len(instruments)} currency instruments")
 if __name__ == '__main__':
     generate_handlers()
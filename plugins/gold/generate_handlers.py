@@ -1,6 +1,8 @@
-import os
 import json
-import re
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from plugins.instruments import save_instruments
 GOLD_TYPES = [
     {
         'name': 'انس طلا',
@@ -112,43 +114,6 @@ NEW_GOLD_SYMBOLS_DATA = [
   { "currency": "حباب سکه گرمی", "symbol": "🫧" }
 ]
 NEW_GOLD_SYMBOLS_MAP = {item["currency"]: item["symbol"] for item in NEW_GOLD_SYMBOLS_DATA}
-TEMPLATE = '''from telethon import events
-from telethon.tl.custom import Button
-from ..utils import format_number, format_change
-TRIGGERS = {triggers}
-async def handle_gold(event, client):
-    """Handle {name} gold type requests"""
-    data = event.client.gold_data
-    if not data:
-        await event.respond('متاسفانه در حال حاضر امکان دریافت اطلاعات طلا وجود ندارد. ❌')
-        return
-    gold_types = data.get('data', [])
-    gold_info = next((g for g in gold_types if g['currencyName'] == '{name}'), None)
-    if not gold_info:
-        await event.respond('اطلاعات {name} در حال حاضر در دسترس نیست. ❌')
-        return
-    price = format_number(gold_info['livePrice'])
-    change = format_change(gold_info['change'])
-    lowest = format_number(gold_info['lowest'])
-    highest = format_number(gold_info['highest'])
-    time = gold_info['time']
-    buttons = [
-        [Button.inline("💰 قیمت فعلی", b'noop'), Button.inline(f"{{price}} تومان", b'noop')],
-        [Button.inline("📊 تغییرات", b'noop'), Button.inline(f"{{change}}", b'noop')],
-        [Button.inline("⬇️ کمترین", b'noop'), Button.inline(f"{{lowest}}", b'noop')],
-        [Button.inline("⬆️ بیشترین", b'noop'), Button.inline(f"{{highest}}", b'noop')],
-        [Button.inline("🕒 بروزرسانی", b'noop'), Button.inline(f"{{time}}", b'noop')],
-        [Button.url("📢 کانال ما", "https://t.me/TelebotCraft")],
-        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{{(await client.get_me()).username}}?startgroup=true")]
-    ]
-    message = f"{symbol} نرخ لحظه‌ای {name}:"
-    await event.respond(message, buttons=buttons)
-'''
-def make_filename(name):
-    """Convert gold type name to a valid filename"""
-    filename = name.replace(' ', '_')
-    filename = re.sub(r'[\\/:*?"<>|]', '', filename)
-    return f"{filename}.py"
 def get_existing_config(name, old_configs):
     """Find an existing config for a gold type by name"""
     for config in old_configs:
@@ -156,43 +121,36 @@ def get_existing_config(name, old_configs):
             return config
     return None
 def generate_gold_handlers():
-    """Generate handler files for all gold types from generation_data.json"""
+    """Generate the gold entries of instruments.json from generation_data.json"""
     try:
         with open('../../generation_data.json', 'r', encoding='utf-8') as f:
             data = json.load(f)
     except Exception as e:
         print(f"Error loading generation_data.json: {e}")
         return
-    if 'GoldType' in data and 'data' in data['GoldType']:
-        for item in data['GoldType']['data']:
-            gold_name = item['name']
-            symbol = '🥇'
-            if gold_name in NEW_GOLD_SYMBOLS_MAP:
-                symbol = NEW_GOLD_SYMBOLS_MAP[gold_name]
-            else:
-                existing_config_old = get_existing_config(gold_name, GOLD_TYPES)
-                if existing_config_old and 'symbol' in existing_config_old:
-                    symbol = existing_config_old['symbol']
-            existing_config_for_triggers = get_existing_config(gold_name, GOLD_TYPES)
-            triggers = [gold_name]
-            if existing_config_for_triggers and 'triggers' in existing_config_for_triggers:
-                for trigger in existing_config_for_triggers['triggers']:
-                    if trigger not in triggers:
-                        triggers.append(trigger)
-            filename = make_filename(gold_name)
-            try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    handler_code = TEMPLATE.format(
-                        name=gold_name,
-                        symbol=symbol,
-                        triggers=repr(triggers)
-                    )
-                    f.write(handler_code)
-                print(f"Generated gold handler for {gold_name}")
-            except Exception as e:
-                print(f"Error generating gold handler for {gold_name}: {e}")
-    else:
+    if 'GoldType' not in data or 'data' not in data['GoldType']:
         print("No 'GoldType' data found in generation_data.json")
-    print("Gold handlers generation complete!")
+        return
+    instruments = []
+    seen = set()
+    for item in data['GoldType']['data']:
+        gold_name = item['currencyName']
+        if gold_name in seen:
+            continue
+        seen.add(gold_name)
+        symbol = '🥇'
+        existing_config = get_existing_config(gold_name, GOLD_TYPES)
+        if gold_name in NEW_GOLD_SYMBOLS_MAP:
+            symbol = NEW_GOLD_SYMBOLS_MAP[gold_name]
+        elif existing_config and 'symbol' in existing_config:
+            symbol = existing_config['symbol']
+        triggers = [gold_name]
+        if existing_config and 'triggers' in existing_config:
+            for trigger in existing_config['triggers']:
+                if trigger not in triggers:
+                    triggers.append(trigger)
+        instruments.append({'kind': 'gold', 'name': gold_name, 'flag': symbol, 'triggers': triggers})
+    save_instruments('gold', instruments)
+    print(f"Generated {len(instruments)} gold instruments")
 if __name__ == '__main__':
     generate_gold_handlers()
@@ -28,11 +28,11 @@ async def handle_gold_command(event, client):
     """Handle /gold command to display all gold prices"""
     data = event.client.gold_data
     if not data:
-        await event.respond('متاسفانه در حال حاضر امکان دریافت اطلاعات طلا وجود ندارد. ❌')
+        await event.reply('متاسفانه در حال حاضر امکان دریافت اطلاعات طلا وجود ندارد. ❌')
         return
     gold_types = data.get('GoldType', {}).get('data', [])
     if not gold_types:
-        await event.respond('اطلاعات طلا در حال حاضر در دسترس نیست. ❌')
+        await event.reply('اطلاعات طلا در حال حاضر در دسترس نیست. ❌')
         return
     header_row = [
         Button.inline("💱 نوع", b'noop_header'),
@@ -56,11 +56,11 @@ async def handle_gold_command(event, client):
                 all_buttons.append(item_row)
     footer_buttons = [
         [Button.url("📢 عضویت در کانال ما", "https://t.me/TelebotCraft")],
-        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{(await client.get_me()).username}?startgroup=true")]
+        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{client.bot_username}?startgroup=true")]
     ]
     all_buttons.extend(footer_buttons)
     if gold_types:
         last_update = gold_types[0]['time']
-        await event.respond(f"💎 نرخ لحظه‌ای طلا و سکه (آخرین بروزرسانی: {last_update}):", buttons=all_buttons)
+        await event.reply(f"💎 نرخ لحظه‌ای طلا و سکه (آخرین بروزرسانی: {last_update}):", buttons=all_buttons)
     else:
-        await event.respond('اطلاعات طلا در حال حاضر در دسترس نیست. ❌')
+        await event.reply('اطلاعات طلا در حال حاضر در دسترس نیست. ❌')
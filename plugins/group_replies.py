@@ -0,0 +1,81 @@
+"""
+Group reply coalescing for the currency bot.
+When several members of a group ask for the same instrument within a few seconds,
+only the first request is answered and the rest are counted as suppressed,
+so repeated questions do not spend the group's send budget.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+logger = logging.getLogger('GroupReplies')
+class GroupReplyCoalescer:
+    """Per-group window in which identical requests are answered once"""
+    def __init__(self, window: float = 10.0, max_entries: int = 10000):
+        """Initialize the coalescer
+        Args:
+            window: Seconds after an answer during which the same request in the same group is suppressed, 0 to disable
+            max_entries: Number of (group, request) pairs remembered
+        """
+        self.window = window
+        self.max_entries = max_entries
+        self._answered: 'OrderedDict[Tuple[Hashable, Hashable], float]' = OrderedDict()
+        self.admitted = 0
+        self.suppressed = 0
+    def admit(self, event, request: Hashable) -> bool:
+        """Decide whether a request should be answered
+        Private chats are always answered. In groups the window starts at the answered
+        request and is not extended by the suppressed ones, so a reply goes out at least once per window.
+        Args:
+            event: The message event
+            request: What was asked for, e.g. the instrument name, so different triggers of one instrument coalesce
+        Returns:
+            False if the same request in this group was answered within the window
+        """
+        if self.window <= 0 or getattr(event, 'is_private', True):
+            return True
+        key = (event.chat_id, request)
+        now = time.monotonic()
+        answered_at = self._answered.get(key)
+        if answered_at is not None and now - answered_at < self.window:
+            self.suppressed += 1
+            logger.debug(f"Suppressed repeated request {request} in chat {event.chat_id}")
+            return False
+        self._answered[key] = now
+        self._answered.move_to_end(key)
+        while len(self._answered) > self.max_entries:
+            self._answered.popitem(last=False)
+        self.admitted += 1
+        return True
+    def release(self, chat_id: Hashable, request: Hashable):
+        """Forget that a request was answered in a group, so the next one is answered again"""
+        if self._answered.pop((chat_id, request), None) is not None:
+            self.admitted -= 1
+    def follow(self, event, request: Hashable, future: Optional[asyncio.Future]):
+        """Release an admitted request if its queued reply never ran
+        Args:
+            event: The message event passed to admit
+            request: The request passed to admit
+            future: What the dispatcher returned for the reply, None if it was shed on arrival
+        """
+        if self.window <= 0 or getattr(event, 'is_private', True):
+            return
+        chat_id = event.chat_id
+        if future is None:
+            self.release(chat_id, request)
+            return
+        def released(done: asyncio.Future):
+            if done.cancelled() or done.result() is False:
+                self.release(chat_id, request)
+        future.add_done_callback(released)
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Get counters of answered and suppressed group requests"""
+        return {
+            'window': self.window,
+            'admitted': self.admitted,
+            'suppressed': self.suppressed,
+            'entries': len(self._answered)
+        }
+group_replies = GroupReplyCoalescer()
@@ -0,0 +1,151 @@
+"""
+Typed ingest layer for the data caches.
+This module decodes feed payloads with orjson when it is available and parses
+every numeric field once into slotted records that handlers can read directly.
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .formatting import format_number, format_change
+try:
+    import orjson
+except ImportError:
+    orjson = None
+logger = logging.getLogger('Ingest')
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+QUOTE_SECTIONS = ('mainCurrencies', 'minorCurrencies', 'GoldType')
+PERSIAN_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩٬', '01234567890123456789,')
+CHANGE_PATTERN = re.compile(r'\(\s*([-+]?[\d.,]+)\s*%\s*\)\s*([-+]?[\d.,]+)?')
+def decode_json(body) -> Any:
+    """Decode a JSON payload with the fastest available parser
+    Args:
+        body: Raw bytes or text of the payload
+    Returns:
+        The decoded document
+    Raises:
+        ValueError: If the payload is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+def parse_number(value: Any) -> Optional[float]:
+    """Parse a feed number such as '82,710' or '۸۲۷۱۰' into a float
+    Args:
+        value: The raw field value
+    Returns:
+        The parsed number, or None if the value is not numeric
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).translate(PERSIAN_DIGITS).replace(',', '').strip())
+    except ValueError:
+        return None
+def parse_change(value: Any) -> Tuple[Optional[float], Optional[float]]:
+    """Parse a change string such as '(0.58%) 4,800'
+    Args:
+        value: The raw change field
+    Returns:
+        Tuple of (change percent, change value); either may be None
+    """
+    if not value:
+        return None, None
+    text = str(value).translate(PERSIAN_DIGITS)
+    match = CHANGE_PATTERN.search(text)
+    if not match:
+        return None, parse_number(text.strip('()'))
+    percent = parse_number(match.group(1))
+    amount = parse_number(match.group(2))
+    if percent is not None and amount is not None and percent < 0 < amount:
+        amount = -amount
+    return percent, amount
+class Quote:
+    """A single fiat or gold quote parsed from the currency feed"""
+    __slots__ = (
+        'section', 'name', 'live_price', 'lowest', 'highest', 'change_percent', 'change_value',
+        'time', 'price_text', 'lowest_text', 'highest_text', 'change_text'
+    )
+    def __init__(self, section: str, item: Dict[str, Any]):
+        """Parse a raw feed item
+        Args:
+            section: Feed section the item belongs to (e.g. 'mainCurrencies')
+            item: The raw item dict from the payload
+        """
+        live_price = item.get('livePrice', 'N/A')
+        lowest = item.get('lowest', 'N/A')
+        highest = item.get('highest', 'N/A')
+        change = item.get('change', 'N/A')
+        self.section = section
+        self.name = item.get('currencyName', '')
+        self.live_price = parse_number(live_price)
+        self.lowest = parse_number(lowest)
+        self.highest = parse_number(highest)
+        self.change_percent, self.change_value = parse_change(change)
+        self.time = item.get('time', '')
+        self.price_text = format_number(live_price)
+        self.lowest_text = format_number(lowest)
+        self.highest_text = format_number(highest)
+        self.change_text = format_change(change) if isinstance(change, str) else str(change)
+    def __repr__(self) -> str:
+        return f"Quote({self.section!r}, {self.name!r}, {self.live_price!r})"
+class QuoteBook:
+    """All quotes of one currency feed snapshot, indexed by section and name"""
+    __slots__ = ('sections', 'by_name')
+    def __init__(self, data: Optional[Dict[str, Any]]):
+        """Build the quote book from a decoded payload
+        Args:
+            data: The decoded currency feed payload
+        """
+        self.sections: Dict[str, List[Quote]] = {}
+        self.by_name: Dict[str, Quote] = {}
+        if not data:
+            return
+        for section in QUOTE_SECTIONS:
+            quotes = [Quote(section, item) for item in data.get(section, {}).get('data', [])]
+            self.sections[section] = quotes
+            for quote in quotes:
+                self.by_name.setdefault(quote.name, quote)
+    def get(self, name: str, section: Optional[str] = None) -> Optional[Quote]:
+        """Get a quote by currency name, optionally restricted to one section"""
+        if section is None:
+            return self.by_name.get(name)
+        return next((quote for quote in self.sections.get(section, ()) if quote.name == name), None)
+    def section(self, section: str) -> List[Quote]:
+        """Get every quote of a section in feed order"""
+        return self.sections.get(section, [])
+    def prices(self) -> Dict[Tuple[str, str], Optional[float]]:
+        """Map every (section, name) pair to its live price"""
+        return {(quote.section, quote.name): quote.live_price for quote in self}
+    def __iter__(self) -> Iterator[Quote]:
+        for quotes in self.sections.values():
+            yield from quotes
+    def __len__(self) -> int:
+        return sum(len(quotes) for quotes in self.sections.values())
+class Orderbook:
+    """A crypto market summary parsed from a Nobitex orderbook entry"""
+    __slots__ = (
+        'symbol', 'last_trade_price', 'previous_price', 'price_change', 'price_change_percent',
+        'best_ask', 'best_bid', 'last_update', 'timestamp'
+    )
+    def __init__(self, symbol: str, entry: Dict[str, Any]):
+        """Parse a cached orderbook entry
+        Args:
+            symbol: The market symbol (e.g. 'BTCIRT')
+            entry: The cache entry built by CryptoCache
+        """
+        asks = entry.get('asks') or []
+        bids = entry.get('bids') or []
+        self.symbol = symbol
+        self.last_trade_price = parse_number(entry.get('lastTradePrice'))
+        self.previous_price = parse_number(entry.get('previousPrice'))
+        self.price_change = entry.get('priceChange')
+        self.price_change_percent = entry.get('priceChangePercent')
+        self.best_ask = parse_number(asks[0][0]) if asks and asks[0] else None
+        self.best_bid = parse_number(bids[0][0]) if bids and bids[0] else None
+        self.last_update = entry.get('lastUpdate')
+        self.timestamp = entry.get('timestamp')
+    def __repr__(self) -> str:
+        return f"Orderbook({self.symbol!r}, {self.last_trade_price!r})"
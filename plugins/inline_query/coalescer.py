@@ -0,0 +1,88 @@
+"""
+Per-user coalescing of inline queries.
+Telegram sends an inline query on every keystroke. This module keeps at most one
+query in flight per user, cancels superseded ones and debounces under load.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict
+logger = logging.getLogger(__name__)
+class InlineCoalescer:
+    """Run only the latest inline query of each user"""
+    def __init__(self, max_debounce: float = 0.3, typing_debounce: float = 0.08,
+                 typing_gap: float = 0.4, low_rate: float = 20, high_rate: float = 200):
+        """Initialize the coalescer
+        Args:
+            max_debounce: Longest delay applied before handling a query, in seconds
+            typing_debounce: Delay applied when the same user is still typing quickly
+            typing_gap: Queries from one user closer than this count as typing
+            low_rate: Global queries per second below which no load debounce is applied
+            high_rate: Global queries per second at which max_debounce is reached
+        """
+        self.max_debounce = max_debounce
+        self.typing_debounce = typing_debounce
+        self.typing_gap = typing_gap
+        self.low_rate = low_rate
+        self.high_rate = high_rate
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._last_seen: Dict[int, float] = {}
+        self._arrivals = deque()
+        self._stats: Dict[str, int] = {'received': 0, 'answered': 0, 'superseded': 0, 'failed': 0}
+    def _rate(self, now: float) -> float:
+        """Get the global inline query rate over the last second"""
+        arrivals = self._arrivals
+        arrivals.append(now)
+        while arrivals and now - arrivals[0] > 1.0:
+            arrivals.popleft()
+        return float(len(arrivals))
+    def debounce_for(self, user_id: int, now: float) -> float:
+        """Decide how long to wait before handling a user's query"""
+        rate = self._rate(now)
+        delay = 0.0
+        if rate > self.low_rate:
+            load = min(1.0, (rate - self.low_rate) / (self.high_rate - self.low_rate))
+            delay = self.max_debounce * load
+        last_seen = self._last_seen.get(user_id)
+        if last_seen is not None and now - last_seen < self.typing_gap:
+            delay = max(delay, self.typing_debounce)
+        return delay
+    async def _run(self, user_id: int, delay: float, handler: Callable[..., Awaitable], event):
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            await handler(event)
+            self._stats['answered'] += 1
+        except asyncio.CancelledError:
+            self._stats['superseded'] += 1
+            raise
+        except Exception as e:
+            self._stats['failed'] += 1
+            logger.error(f"Error handling inline query from {user_id}: {str(e)}")
+        finally:
+            if self._tasks.get(user_id) is asyncio.current_task():
+                del self._tasks[user_id]
+    def wrap(self, handler: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        """Wrap an inline query handler so only each user's latest query is handled"""
+        async def coalesced(event):
+            user_id = event.sender_id
+            now = time.monotonic()
+            self._stats['received'] += 1
+            delay = self.debounce_for(user_id, now)
+            self._last_seen[user_id] = now
+            previous = self._tasks.get(user_id)
+            if previous and not previous.done():
+                previous.cancel()
+            self._tasks[user_id] = asyncio.ensure_future(self._run(user_id, delay, handler, event))
+            if len(self._last_seen) > 10000:
+                cutoff = now - 60
+                self._last_seen = {uid: seen for uid, seen in self._last_seen.items() if seen > cutoff}
+        return coalesced
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Get counters of received, answered and superseded queries"""
+        stats = dict(self._stats)
+        stats['in_flight'] = len(self._tasks)
+        return stats
+inline_coalescer = InlineCoalescer()
@@ -1,11 +1,21 @@
 """
 Inline query handler for the currency bot.
-This module handles inline queries for currency prices.
+This module handles inline queries for currency, gold and crypto prices.
 """
+import asyncio
 import logging
 import re
 from telethon import events
-from ..utils import format_number, format_change
+from ..cache import FEED_NAME as CURRENCY_FEED
+from ..crypto.crypto_cache import crypto_cache, crypto_triggers, split_symbol, CRYPTO_INFO, POPULAR_CRYPTO_SYMBOLS, FEED_NAME as CRYPTO_FEED
+from ..dispatch import event_dispatcher, PRIORITY_INLINE
+from ..gold.generate_handlers import GOLD_TYPES
+from ..polling import poll_scheduler
+from ..search import fuzzy_index, normalize_text
+from .coalescer import inline_coalescer
+from .result_cache import InlineResultCache
+from .search_index import SearchIndex
+from .templates import ASSET_CRYPTO, ASSET_FIAT, ASSET_GOLD, render_crypto, render_fiat, render_gold
 logger = logging.getLogger(__name__)
 CURRENCY_MAPPING = {}
 def initialize_currency_mapping(comprehensive_config):
@@ -19,55 +29,104 @@ def initialize_currency_mapping(comprehensive_config):
                 'flag': config['flag']
             }
     logger.info(f"Initialized currency mapping with {len(CURRENCY_MAPPING)} entries")
+POPULAR_CURRENCIES = ['دلار', 'یورو', 'پوند انگلیس', 'درهم امارات', 'لیر ترکیه',
+                      'دلار کانادا', 'دلار استرالیا', 'یوان چین', 'ین ژاپن', 'فرانک سوئیس']
+POPULAR_GOLD = ['سکه امامی', 'طلای 18 عیار', 'انس طلا', 'سکه بهار آزادی', 'نیم سکه', 'ربع سکه']
+POPULAR_CRYPTO = ['USDTIRT', 'BTCIRT', 'ETHIRT', 'BTCUSDT', 'ETHUSDT']
+INLINE_SECTIONS = ('mainCurrencies', 'minorCurrencies')
+MAX_INLINE_RESULTS = 50
+search_index = SearchIndex()
+result_cache = InlineResultCache()
+rendered_results = {}
+def popular_first(keys, popular):
+    """Order keys with the popular ones first, in their popularity order"""
+    keys = list(dict.fromkeys(keys))
+    head = [key for key in popular if key in keys]
+    return head + [key for key in keys if key not in head]
+def build_catalog(quotes, orderbooks):
+    """Pre-render every instrument and list its search terms, most popular first
+    Returns:
+        Tuple of (search entries, rendered results keyed by (asset type, key))
+    """
+    aliases = {}
+    for trigger, info in CURRENCY_MAPPING.items():
+        aliases.setdefault(info['name'], []).append(trigger)
+    fiat, gold, crypto = [], [], []
+    rendered = {}
+    quoted = [quote.name for section in INLINE_SECTIONS for quote in quotes.section(section)]
+    for name in popular_first(sorted(quoted), POPULAR_CURRENCIES):
+        flag = CURRENCY_MAPPING.get(name.lower(), {'flag': '🌐'}).get('flag', '🌐')
+        rendered[(ASSET_FIAT, name)] = render_fiat(quotes.get(name), flag)
+        fiat.append((ASSET_FIAT, name, flag, aliases.get(name, [])))
+    gold_configs = {config['name']: config for config in GOLD_TYPES}
+    for name in popular_first([quote.name for quote in quotes.section('GoldType')], POPULAR_GOLD):
+        config = gold_configs.get(name, {})
+        flag = config.get('symbol', '🏅')
+        rendered[(ASSET_GOLD, name)] = render_gold(quotes.get(name, 'GoldType'), flag)
+        gold.append((ASSET_GOLD, name, flag, config.get('triggers', [])))
+    for symbol in popular_first([s for s in POPULAR_CRYPTO_SYMBOLS if s in orderbooks], POPULAR_CRYPTO):
+        base_symbol, _ = split_symbol(symbol)
+        if not base_symbol:
+            continue
+        info = CRYPTO_INFO.get(base_symbol, {'name': base_symbol, 'icon': base_symbol})
+        rendered[(ASSET_CRYPTO, symbol)] = render_crypto(orderbooks[symbol], info)
+        crypto.append((ASSET_CRYPTO, symbol, info.get('icon', ''), crypto_triggers(symbol)))
+    head = fiat[:5] + gold[:3] + crypto[:2]
+    entries = head + fiat[5:] + gold[3:] + crypto[2:]
+    return entries, rendered
+def catalog_version(client):
+    """Get the combined snapshot version of every inline data source"""
+    return client.currency_cache.version, crypto_cache.version
+def get_search_index(client):
+    """Get the inline search index, rebuilding it and the rendered results when any source changed"""
+    global rendered_results
+    version = catalog_version(client)
+    if search_index.version != version:
+        entries, rendered = build_catalog(client.currency_cache.get_quotes(), crypto_cache.get_orderbooks())
+        rendered_results = rendered
+        search_index.build(entries, version)
+    return search_index
 async def handle_inline_query(event):
-    """Handle inline queries for currency prices"""
+    """Handle inline queries for currency, gold and crypto prices"""
     builder = event.builder
-    query = event.text.lower().strip()
+    query = normalize_text(event.text)
     client = event.client
-    data = client.currency_cache.get_data()
-    results = []
-    if not data:
-        results.append(
+    if not client.currency_cache.get_quotes() and not crypto_cache.get_all_symbols():
+        await event.answer([
             builder.article(
                 title="خطا در دریافت اطلاعات",
                 description="متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد.",
                 text="متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌"
             )
-        )
-        await event.answer(results)
+        ])
         return
-    all_currencies = []
-    if 'mainCurrencies' in data and 'data' in data['mainCurrencies']:
-        all_currencies.extend(data['mainCurrencies']['data'])
-    if 'minorCurrencies' in data and 'data' in data['minorCurrencies']:
-        all_currencies.extend(data['minorCurrencies']['data'])
-    currency_data_map = {c['currencyName']: c for c in all_currencies}
-    if not query:
-        popular_currencies = ['دلار', 'یورو', 'پوند انگلیس', 'درهم امارات', 'لیر ترکیه',
-                             'دلار کانادا', 'دلار استرالیا', 'یوان چین', 'ین ژاپن', 'فرانک سوئیس']
-        for currency_name in popular_currencies:
-            if currency_name in currency_data_map:
-                flag = CURRENCY_MAPPING.get(currency_name.lower(), {'flag': '🌐'}).get('flag', '🌐')
-                results.append(create_currency_result(builder, currency_name, currency_data_map[currency_name], flag))
-        remaining_currencies = [name for name in currency_data_map.keys() if name not in popular_currencies]
-        remaining_currencies.sort()
-        remaining_slots = 50 - len(results)
-        for currency_name in remaining_currencies[:remaining_slots]:
-            flag = CURRENCY_MAPPING.get(currency_name.lower(), {'flag': '🌐'}).get('flag', '🌐')
-            results.append(create_currency_result(builder, currency_name, currency_data_map[currency_name], flag))
-    else:
-        matched_currencies = set()
-        for search_term, currency_info in CURRENCY_MAPPING.items():
-            if query in search_term or search_term in query:
-                currency_name = currency_info['name']
-                if currency_name in currency_data_map and currency_name not in matched_currencies:
-                    results.append(create_currency_result(builder, currency_name, currency_data_map[currency_name], currency_info['flag']))
-                    matched_currencies.add(currency_name)
-        for currency_name, currency_data in currency_data_map.items():
-            if currency_name not in matched_currencies and query in currency_name.lower():
-                flag = CURRENCY_MAPPING.get(currency_name.lower(), {'flag': '🌐'}).get('flag', '🌐')
-                results.append(create_currency_result(builder, currency_name, currency_data, flag))
-                matched_currencies.add(currency_name)
+    version = catalog_version(client)
+    results = result_cache.get(query, version)
+    if results is None:
+        results = await build_inline_results(builder, client, query)
+        result_cache.put(query, version, results)
+    try:
+        offset = max(0, int(event.offset or 0))
+    except ValueError:
+        offset = 0
+    end = offset + MAX_INLINE_RESULTS
+    next_offset = str(end) if end < len(results) else None
+    cache_time = min(poll_scheduler.seconds_until_next(CURRENCY_FEED), poll_scheduler.seconds_until_next(CRYPTO_FEED))
+    await event.answer(
+        results[offset:end],
+        cache_time=int(cache_time),
+        next_offset=next_offset
+    )
+async def build_inline_results(builder, client, query):
+    """Build every inline result for a query, best matches first"""
+    index = get_search_index(client)
+    results = search_instruments(builder, index, query)
+    if not results:
+        match = fuzzy_index.lookup(query)
+        if match and match[1] > 0:
+            suggestion = match[0]
+            logger.info(f"Inline fuzzy match for '{query}': '{suggestion}'")
+            results = search_instruments(builder, index, suggestion, suggested=True)
     if not results:
         results.append(
             builder.article(
@@ -76,31 +135,29 @@ async def handle_inline_query(event):
                 text="ارز مورد نظر یافت نشد. لطفا با کلمه کلیدی دیگری جستجو کنید. ❌"
             )
         )
-    await event.answer(results[:50])
-def create_currency_result(builder, currency_name, currency_data, flag):
-    """Create an inline result for a currency"""
-    price = format_number(currency_data['livePrice'])
-    change = format_change(currency_data['change'])
-    lowest = format_number(currency_data['lowest'])
-    highest = format_number(currency_data['highest'])
-    time = currency_data['time']
-    title = f"{flag} {currency_name}"
-    description = f"قیمت: {price} تومان | تغییرات: {change}"
-    content = f"{flag} نرخ لحظه‌ای {currency_name}:\n\n"
-    content += f"💰 قیمت فعلی: {price} تومان\n"
-    content += f"📊 تغییرات: {change}\n"
-    content += f"⬇️ کمترین: {lowest}\n"
-    content += f"⬆️ بیشترین: {highest}\n"
-    content += f"🕒 بروزرسانی: {time}\n\n"
-    content += "📢 @TelebotCraft"
+    return list(await asyncio.gather(*results))
+def search_instruments(builder, index, query, suggested=False):
+    """Build inline results for every instrument matching the query"""
+    results = []
+    for entry in index.search(query):
+        rendered = rendered_results.get((entry.kind, entry.key))
+        if rendered:
+            results.append(create_inline_result(builder, rendered, suggested))
+    return results
+def create_inline_result(builder, rendered, suggested=False):
+    """Create an inline result from a pre-rendered template"""
+    title = rendered.title
+    if suggested:
+        title = f"🤔 منظورتان {rendered.title} بود؟"
     return builder.article(
         title=title,
-        description=description,
-        text=content
+        description=rendered.description,
+        text=rendered.text
     )
 def register_inline_handlers(client):
     """Register inline query handlers"""
     from ..generate_handlers import COMPREHENSIVE_CURRENCY_CONFIGS
     initialize_currency_mapping(COMPREHENSIVE_CURRENCY_CONFIGS)
-    client.add_event_handler(handle_inline_query, events.InlineQuery())
+    dispatched = event_dispatcher.wrap(handle_inline_query, PRIORITY_INLINE, key=lambda event: ('inline', event.sender_id))
+    client.add_event_handler(inline_coalescer.wrap(dispatched), events.InlineQuery())
     logger.info("Registered inline query handler")
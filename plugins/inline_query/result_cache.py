@@ -0,0 +1,49 @@
+"""
+Result cache for inline queries.
+This module keeps built inline results per normalized query for the current
+data snapshot, so a repeated query only costs a dictionary lookup.
+"""
+import logging
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+logger = logging.getLogger(__name__)
+class InlineResultCache:
+    """LRU cache of built inline results, cleared whenever the snapshot version changes"""
+    def __init__(self, max_entries: int = 512):
+        """Initialize the cache
+        Args:
+            max_entries: Number of distinct queries kept per snapshot
+        """
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, List[Any]]' = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self.hits = 0
+        self.misses = 0
+    def _check_version(self, version: Hashable):
+        """Drop every entry built from an older snapshot"""
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+    def get(self, query: str, version: Hashable) -> Optional[List[Any]]:
+        """Get the cached results of a query, or None on a miss"""
+        self._check_version(version)
+        results = self._entries.get(query)
+        if results is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(query)
+        self.hits += 1
+        return results
+    def put(self, query: str, version: Hashable, results: List[Any]):
+        """Store the built results of a query"""
+        self._check_version(version)
+        self._entries[query] = results
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    @property
+    def stats(self):
+        """Get hit and miss counters"""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,141 @@
+"""
+Search index for inline queries.
+This module keeps a prefix trie and a character n-gram index over instrument
+names, codes and aliases so inline queries are answered without scanning every alias.
+"""
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from ..search import normalize_text
+logger = logging.getLogger(__name__)
+MATCH_EXACT = 0
+MATCH_PREFIX = 1
+MATCH_CONTAINED = 2
+MATCH_SUBSTRING = 3
+GRAM_SIZES = (2, 3)
+class SearchEntry:
+    """A searchable instrument with its display data"""
+    __slots__ = ('kind', 'key', 'flag', 'terms', 'rank')
+    def __init__(self, kind: str, key: str, flag: str, terms: Tuple[str, ...], rank: int):
+        self.kind = kind
+        self.key = key
+        self.flag = flag
+        self.terms = terms
+        self.rank = rank
+    def __repr__(self) -> str:
+        return f"SearchEntry({self.kind!r}, {self.key!r}, rank={self.rank})"
+class TrieNode:
+    """Node of the prefix trie, holding every entry whose term passes through it"""
+    __slots__ = ('children', 'ids')
+    def __init__(self):
+        self.children: Dict[str, 'TrieNode'] = {}
+        self.ids: Set[int] = set()
+class SearchIndex:
+    """Prefix trie plus character n-gram index, rebuilt once per data snapshot"""
+    def __init__(self, max_query_words: int = 4):
+        """Initialize an empty index
+        Args:
+            max_query_words: Longest word sequence of a query tested as a whole term
+        """
+        self.max_query_words = max_query_words
+        self._entries: List[SearchEntry] = []
+        self._root = TrieNode()
+        self._terms: Dict[str, Set[int]] = {}
+        self._grams: Dict[str, Set[int]] = {}
+        self._version: Optional[object] = None
+    @property
+    def version(self) -> Optional[object]:
+        """Get the snapshot version the index was built for"""
+        return self._version
+    def build(self, entries: Iterable[Tuple[str, str, str, Iterable[str]]], version: object = None):
+        """Rebuild the index
+        Args:
+            entries: Tuples of (asset type, key, flag, search terms) in popularity order
+            version: Snapshot version the entries were taken from
+        """
+        started = time.perf_counter()
+        built: List[SearchEntry] = []
+        root = TrieNode()
+        terms_index: Dict[str, Set[int]] = {}
+        grams: Dict[str, Set[int]] = {}
+        for kind, key, flag, terms in entries:
+            entry_id = len(built)
+            normalized = tuple(dict.fromkeys(term for term in (normalize_text(t) for t in (key, *terms)) if term))
+            built.append(SearchEntry(kind, key, flag, normalized, entry_id))
+            for term in normalized:
+                terms_index.setdefault(term, set()).add(entry_id)
+                node = root
+                for char in term:
+                    node = node.children.setdefault(char, TrieNode())
+                    node.ids.add(entry_id)
+                for size in GRAM_SIZES:
+                    for i in range(len(term) - size + 1):
+                        grams.setdefault(term[i:i + size], set()).add(entry_id)
+        self._entries = built
+        self._root = root
+        self._terms = terms_index
+        self._grams = grams
+        self._version = version
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Built inline search index with {len(built)} entries and {len(grams)} n-grams in {elapsed_ms:.1f}ms")
+    def entries(self) -> List[SearchEntry]:
+        """Get every entry in popularity order"""
+        return self._entries
+    def _prefix_ids(self, query: str) -> Set[int]:
+        """Find entries with a term starting with the query"""
+        node = self._root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+    def _contained_ids(self, query: str) -> Set[int]:
+        """Find entries with a whole term that appears as a word sequence in the query"""
+        words = query.split()
+        found: Set[int] = set()
+        for start in range(len(words)):
+            for end in range(start + 1, min(len(words), start + self.max_query_words) + 1):
+                found.update(self._terms.get(' '.join(words[start:end]), ()))
+        return found
+    def _substring_ids(self, query: str) -> Set[int]:
+        """Find entries with a term containing the query, narrowed by the n-gram index"""
+        size = min(len(query), GRAM_SIZES[-1])
+        if size < GRAM_SIZES[0]:
+            return set()
+        candidates: Optional[Set[int]] = None
+        for i in range(len(query) - size + 1):
+            ids = self._grams.get(query[i:i + size])
+            if not ids:
+                return set()
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        entries = self._entries
+        return {entry_id for entry_id in candidates if any(query in term for term in entries[entry_id].terms)}
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchEntry]:
+        """Find entries matching the query, best matches first
+        Args:
+            query: The raw query text
+            limit: Maximum number of entries to return
+        Returns:
+            Entries ranked by match quality, then popularity
+        """
+        query = normalize_text(query)
+        if not query:
+            return self._entries[:limit] if limit else list(self._entries)
+        scores: Dict[int, int] = {}
+        for quality, ids in (
+            (MATCH_EXACT, self._terms.get(query, ())),
+            (MATCH_PREFIX, self._prefix_ids(query)),
+            (MATCH_CONTAINED, self._contained_ids(query)),
+            (MATCH_SUBSTRING, self._substring_ids(query)),
+        ):
+            for entry_id in ids:
+                if entry_id not in scores:
+                    scores[entry_id] = quality
+        ranked = sorted(scores, key=lambda entry_id: (scores[entry_id], entry_id))
+        if limit:
+            ranked = ranked[:limit]
+        return [self._entries[entry_id] for entry_id in ranked]
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,98 @@
+"""
+Inline result templates for the currency bot.
+This module pre-renders the title, description and message text of every
+instrument once per snapshot, with one template per asset type.
+"""
+from typing import Dict, Optional
+from ..ingest import Orderbook, Quote
+from ..crypto.crypto_cache import split_symbol
+ASSET_FIAT = 'fiat'
+ASSET_GOLD = 'gold'
+ASSET_CRYPTO = 'crypto'
+FIAT_TEMPLATE = (
+    "{flag} نرخ لحظه‌ای {name}:\n\n"
+    "💰 قیمت فعلی: {price} تومان\n"
+    "📊 تغییرات: {change}\n"
+    "⬇️ کمترین: {lowest}\n"
+    "⬆️ بیشترین: {highest}\n"
+    "🕒 بروزرسانی: {time}\n\n"
+    "📢 @TelebotCraft"
+)
+GOLD_TEMPLATE = (
+    "{flag} نرخ لحظه‌ای {name}:\n\n"
+    "💰 قیمت فعلی: {price}\n"
+    "📊 تغییرات: {change}\n"
+    "⬇️ کمترین: {lowest}\n"
+    "⬆️ بیشترین: {highest}\n"
+    "🕒 بروزرسانی: {time}\n\n"
+    "📢 @TelebotCraft"
+)
+CRYPTO_TEMPLATE = (
+    "{flag} نرخ لحظه‌ای {name} ({pair}):\n\n"
+    "💰 قیمت: {price} {unit}\n"
+    "{change_line}"
+    "📈 قیمت فروش: {ask} {unit}\n"
+    "📉 قیمت خرید: {bid} {unit}\n\n"
+    "📢 @TelebotCraft"
+)
+class RenderedResult:
+    """Pre-rendered texts of one inline result"""
+    __slots__ = ('title', 'description', 'text')
+    def __init__(self, title: str, description: str, text: str):
+        self.title = title
+        self.description = description
+        self.text = text
+def render_fiat(quote: Quote, flag: str) -> RenderedResult:
+    """Render a fiat currency quote"""
+    return RenderedResult(
+        title=f"{flag} {quote.name}",
+        description=f"قیمت: {quote.price_text} تومان | تغییرات: {quote.change_text}",
+        text=FIAT_TEMPLATE.format(
+            flag=flag, name=quote.name, price=quote.price_text, change=quote.change_text,
+            lowest=quote.lowest_text, highest=quote.highest_text, time=quote.time
+        )
+    )
+def render_gold(quote: Quote, flag: str) -> RenderedResult:
+    """Render a gold, coin or bullion quote"""
+    return RenderedResult(
+        title=f"{flag} {quote.name}",
+        description=f"قیمت: {quote.price_text} | تغییرات: {quote.change_text}",
+        text=GOLD_TEMPLATE.format(
+            flag=flag, name=quote.name, price=quote.price_text, change=quote.change_text,
+            lowest=quote.lowest_text, highest=quote.highest_text, time=quote.time
+        )
+    )
+def _format_crypto_price(value: Optional[float], divisor: int) -> str:
+    """Format a crypto price, converting Rials to Tomans when divisor is 10"""
+    if not value:
+        return "N/A"
+    value = value / divisor
+    if value >= 1:
+        return f"{int(value):,}" if value >= 100 else f"{value:,.2f}"
+    return f"{value:.8f}".rstrip('0')
+def render_crypto(record: Orderbook, info: Dict[str, str]) -> RenderedResult:
+    """Render a crypto market summary"""
+    base_symbol, quote_currency = split_symbol(record.symbol)
+    divisor = 10 if quote_currency == 'IRT' else 1
+    unit = 'تومان' if quote_currency == 'IRT' else 'دلار'
+    name = info.get('name', base_symbol)
+    flag = info.get('icon', '🪙')
+    price = _format_crypto_price(record.last_trade_price, divisor)
+    change_line = ""
+    change = ""
+    if record.price_change_percent:
+        arrow = "🟢 ↗️" if record.price_change_percent > 0 else "🔴 ↘️"
+        change = f"{record.price_change_percent:+.2f}%"
+        change_line = f"{arrow} تغییرات: {change}\n"
+    description = f"قیمت: {price} {unit}"
+    if change:
+        description += f" | تغییرات: {change}"
+    return RenderedResult(
+        title=f"{flag} {name} ({base_symbol}/{quote_currency})",
+        description=description,
+        text=CRYPTO_TEMPLATE.format(
+            flag=flag, name=name, pair=f"{base_symbol}/{quote_currency}", price=price, unit=unit,
+            change_line=change_line, ask=_format_crypto_price(record.best_ask, divisor),
+            bid=_format_crypto_price(record.best_bid, divisor)
+        )
+    )
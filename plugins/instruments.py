@@ -0,0 +1,124 @@
+"""
+Instrument registry for the currency bot.
+This module serves every fiat and gold instrument listed in instruments.json
+through a single message handler, instead of one generated plugin module each.
+"""
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+from telethon import events
+from .currency_template import CurrencyHandler
+from .dispatch import event_dispatcher
+from .group_replies import group_replies
+from .search import fuzzy_index
+logger = logging.getLogger('Instruments')
+INSTRUMENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instruments.json')
+KIND_CURRENCY = 'currency'
+KIND_GOLD = 'gold'
+KIND_SECTIONS = {
+    KIND_CURRENCY: ('mainCurrencies', 'minorCurrencies'),
+    KIND_GOLD: ('GoldType',),
+}
+KIND_UNAVAILABLE_TEXT = {
+    KIND_CURRENCY: 'متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌',
+    KIND_GOLD: 'متاسفانه در حال حاضر امکان دریافت اطلاعات طلا وجود ندارد. ❌',
+}
+def save_instruments(kind: str, instruments: List[Dict], path: str = INSTRUMENTS_PATH):
+    """Replace the instruments of one kind in instruments.json, keeping the other kinds
+    Args:
+        kind: KIND_CURRENCY or KIND_GOLD
+        instruments: The new entries of that kind
+        path: The instruments file to rewrite
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            existing = [item for item in json.load(f) if item['kind'] != kind]
+    except FileNotFoundError:
+        existing = []
+    lines = ['    ' + json.dumps(item, ensure_ascii=False) for item in existing + instruments]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[\n' + ',\n'.join(lines) + '\n]\n')
+class InstrumentCatalog:
+    """Every fiat and gold instrument, keyed by its exact triggers"""
+    def __init__(self, path: str = INSTRUMENTS_PATH):
+        """Initialize the catalog
+        Args:
+            path: JSON file listing the kind, name, flag and triggers of every instrument
+        """
+        self.path = path
+        self._instruments: List[CurrencyHandler] = []
+        self._by_trigger: Dict[str, CurrencyHandler] = {}
+        self._overrides: Dict[str, Callable[..., Awaitable]] = {}
+    def load(self) -> int:
+        """Load the instrument list from disk
+        Returns:
+            Number of instruments loaded
+        """
+        with open(self.path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        self._instruments = [
+            CurrencyHandler(
+                name=entry['name'],
+                flag=entry['flag'],
+                triggers=entry['triggers'],
+                sections=KIND_SECTIONS[entry['kind']],
+                unavailable_text=KIND_UNAVAILABLE_TEXT[entry['kind']]
+            )
+            for entry in entries
+        ]
+        return len(self._instruments)
+    def override(self, name: str):
+        """Register a custom handler for one instrument
+        The handler is called as handler(event, client, instrument) instead of the generic reply.
+        Args:
+            name: The instrument name as it appears in the feed
+        """
+        def decorator(handler: Callable[..., Awaitable]):
+            self._overrides[name] = handler
+            return handler
+        return decorator
+    def match(self, text: str) -> Optional[CurrencyHandler]:
+        """Find the instrument whose trigger is exactly the message text"""
+        if not text:
+            return None
+        return self._by_trigger.get(text.strip())
+    async def _respond(self, instrument: CurrencyHandler, event):
+        """Reply to a message that matched an instrument trigger"""
+        override = self._overrides.get(instrument.name)
+        if override:
+            await override(event, event.client, instrument)
+        else:
+            await instrument.handle_currency(event, event.client)
+    async def handle(self, event):
+        """Queue the reply to a matched message on the dispatcher, unless the group was just answered"""
+        instrument = event.pattern_match
+        event.client.currency_cache.note_request()
+        if group_replies.admit(event, instrument.name):
+            future = event_dispatcher.submit(event, self._respond, instrument, event)
+            group_replies.follow(event, instrument.name, future)
+    def register(self, client):
+        """Claim the triggers not taken by a custom plugin module and register the handler
+        Must be called after the hand-written plugin modules are registered so they keep priority.
+        """
+        if not self._instruments:
+            self.load()
+        self._by_trigger = {}
+        skipped = 0
+        for instrument in self._instruments:
+            for trigger in instrument.triggers:
+                pattern_key = f"^{trigger}$"
+                if pattern_key in client.registered_message_patterns:
+                    skipped += 1
+                    continue
+                self._by_trigger[trigger] = instrument
+                client.registered_message_patterns.add(pattern_key)
+                fuzzy_index.add(trigger)
+        client.add_event_handler(self.handle, events.NewMessage(pattern=self.match, incoming=True))
+        logger.info(
+            f"Registered {len(self._instruments)} instruments with {len(self._by_trigger)} triggers "
+            f"({skipped} already handled by custom plugins)"
+        )
+    def __len__(self) -> int:
+        return len(self._instruments)
+instrument_catalog = InstrumentCatalog()
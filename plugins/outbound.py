@@ -0,0 +1,278 @@
+"""
+Outbound message scheduler for the currency bot.
+Every send and edit made through the client passes through this module, which
+paces them with token buckets per chat and globally, lets interactive replies
+jump ahead of alerts and broadcasts, and retries after FloodWait errors.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set
+from telethon import utils
+from telethon.errors import FloodWaitError
+logger = logging.getLogger('Outbound')
+LANE_INTERACTIVE = 0
+LANE_ALERT = 1
+LANE_BROADCAST = 2
+LANE_NAMES = {
+    LANE_INTERACTIVE: 'interactive',
+    LANE_ALERT: 'alert',
+    LANE_BROADCAST: 'broadcast',
+}
+MAX_FLOOD_WAIT = {
+    LANE_INTERACTIVE: 30,
+    LANE_ALERT: 120,
+    LANE_BROADCAST: 600,
+}
+SCHEDULED_METHODS = ('send_message', 'send_file', 'edit_message', 'forward_messages')
+_current_lane = contextvars.ContextVar('outbound_lane', default=LANE_INTERACTIVE)
+_in_scheduled_call = contextvars.ContextVar('outbound_in_scheduled_call', default=False)
+@contextmanager
+def outbound_lane(lane: int):
+    """Send everything awaited inside the block on the given lane"""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+class TokenBucket:
+    """Token bucket refilled continuously, which can also be blocked for a while"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+    def __init__(self, rate: float, capacity: float):
+        """Initialize the bucket
+        Args:
+            rate: Tokens added per second
+            capacity: Largest burst
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+    def delay(self, now: float) -> float:
+        """Get the seconds until a token can be taken"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    def take(self):
+        """Take one token, after delay() returned 0"""
+        self.tokens -= 1
+    def block(self, seconds: float):
+        """Refuse tokens for the given time"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+    @property
+    def idle(self) -> bool:
+        """Whether the bucket is full and unblocked, so it can be forgotten"""
+        now = time.monotonic()
+        return now >= self.blocked_until and self.tokens + (now - self.updated) * self.rate >= self.capacity
+class _Waiter:
+    """A send waiting for its tokens"""
+    __slots__ = ('key', 'future')
+    def __init__(self, key: Hashable, future: asyncio.Future):
+        self.key = key
+        self.future = future
+def chat_key(entity: Any) -> Optional[int]:
+    """Get the marked peer id of a send target, or None for targets without a chat such as inline messages"""
+    if isinstance(entity, int):
+        return entity
+    try:
+        return utils.get_peer_id(entity)
+    except Exception:
+        return None
+class OutboundScheduler:
+    """Paces outbound sends and edits per chat and globally"""
+    def __init__(self, global_rate: float = 30, private_rate: float = 1, private_burst: float = 3,
+                 group_rate: float = 20 / 60, group_burst: float = 3, broadcast_rate: float = 20,
+                 max_retries: int = 3):
+        """Initialize the scheduler
+        Args:
+            global_rate: Messages per second across all chats, also the global burst
+            private_rate: Messages per second in one private chat
+            private_burst: Messages a private chat may receive at once
+            group_rate: Messages per second in one group
+            group_burst: Messages a group may receive at once
+            broadcast_rate: Share of the global rate broadcasts may use, leaving room for replies
+            max_retries: FloodWait retries before a send is dropped
+        """
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._lanes: Dict[int, TokenBucket] = {LANE_BROADCAST: TokenBucket(broadcast_rate, broadcast_rate)}
+        self._chats: Dict[Hashable, TokenBucket] = {}
+        self._queues: Dict[int, Deque[_Waiter]] = {lane: deque() for lane in LANE_NAMES}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._stats: Dict[int, Dict[str, float]] = {
+            lane: {
+                'sent': 0, 'dropped': 0, 'failed': 0, 'flood_waits': 0,
+                'latency_ms_total': 0.0, 'latency_ms_max': 0.0
+            }
+            for lane in LANE_NAMES
+        }
+    def _chat_bucket(self, key: Hashable) -> Optional[TokenBucket]:
+        """Get the bucket of a chat, creating it on first use"""
+        if key is None:
+            return None
+        bucket = self._chats.get(key)
+        if bucket is None:
+            if len(self._chats) > 10000:
+                self._chats = {chat: chat_bucket for chat, chat_bucket in self._chats.items() if not chat_bucket.idle}
+            if key < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.private_rate, self.private_burst)
+            self._chats[key] = bucket
+        return bucket
+    def _delay(self, key: Hashable, lane: int, now: float) -> float:
+        """Get the seconds until a send to a chat on a lane may go out"""
+        delay = self._global.delay(now)
+        lane_bucket = self._lanes.get(lane)
+        if lane_bucket is not None:
+            delay = max(delay, lane_bucket.delay(now))
+        chat_bucket = self._chat_bucket(key)
+        if chat_bucket is not None:
+            delay = max(delay, chat_bucket.delay(now))
+        return delay
+    def _take(self, key: Hashable, lane: int):
+        """Take the tokens of one send"""
+        self._global.take()
+        if lane in self._lanes:
+            self._lanes[lane].take()
+        chat_bucket = self._chat_bucket(key)
+        if chat_bucket is not None:
+            chat_bucket.take()
+    def _grant_next(self, now: float) -> Optional[float]:
+        """Grant the first waiter whose buckets have tokens, by lane then arrival
+        Returns:
+            0 after a grant, the seconds until the next waiter could go, or None if nobody waits
+        """
+        wait = None
+        blocked: Set[Hashable] = set()
+        for lane, queue in self._queues.items():
+            for waiter in list(queue):
+                if waiter.future.done():
+                    queue.remove(waiter)
+                    continue
+                if waiter.key in blocked:
+                    continue
+                delay = self._delay(waiter.key, lane, now)
+                if delay <= 0:
+                    queue.remove(waiter)
+                    self._take(waiter.key, lane)
+                    waiter.future.set_result(None)
+                    return 0.0
+                blocked.add(waiter.key)
+                wait = delay if wait is None else min(wait, delay)
+        return wait
+    async def _pump(self):
+        """Hand out tokens to waiting sends as they become available"""
+        while True:
+            wait = self._grant_next(time.monotonic())
+            if wait == 0:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+    async def _acquire(self, key: Hashable, lane: int):
+        """Wait until a send to a chat may go out on a lane"""
+        if not any(self._queues.values()) and self._delay(key, lane, time.monotonic()) <= 0:
+            self._take(key, lane)
+            return
+        if self._pump_task is None or self._pump_task.done():
+            self._wakeup = asyncio.Event()
+            self._pump_task = asyncio.ensure_future(self._pump())
+        future = asyncio.get_event_loop().create_future()
+        self._queues[lane].append(_Waiter(key, future))
+        self._wakeup.set()
+        await future
+    async def run(self, key: Hashable, call: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Run one outbound call once its chat, lane and global budget allow it
+        A FloodWait pauses the chat and also the lane, or every lane when the lane has no
+        bucket of its own, since Telegram may be throttling the whole account.
+        Args:
+            key: Marked peer id of the target chat, None when it has none
+            call: The client method to call
+        Returns:
+            Whatever the call returns
+        Raises:
+            FloodWaitError: If Telegram asks for a longer wait than the lane tolerates or retries run out
+        """
+        lane = _current_lane.get()
+        stats = self._stats[lane]
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            await self._acquire(key, lane)
+            try:
+                result = await call(*args, **kwargs)
+            except FloodWaitError as e:
+                stats['flood_waits'] += 1
+                chat_bucket = self._chat_bucket(key)
+                if chat_bucket is not None:
+                    chat_bucket.block(e.seconds)
+                self._lanes.get(lane, self._global).block(e.seconds)
+                attempt += 1
+                if e.seconds > MAX_FLOOD_WAIT[lane] or attempt > self.max_retries:
+                    stats['dropped'] += 1
+                    logger.warning(f"Dropping {LANE_NAMES[lane]} send to {key} after FloodWait of {e.seconds}s")
+                    raise
+                logger.info(f"FloodWait of {e.seconds}s for {key}, retrying {LANE_NAMES[lane]} send")
+                continue
+            except Exception:
+                stats['failed'] += 1
+                raise
+            latency_ms = (time.monotonic() - started) * 1000
+            stats['sent'] += 1
+            stats['latency_ms_total'] += latency_ms
+            stats['latency_ms_max'] = max(stats['latency_ms_max'], latency_ms)
+            return result
+    def install(self, client):
+        """Route the client's send and edit methods through the scheduler
+        Event helpers such as respond, reply and edit call these methods, so they are paced too.
+        A method called from inside another scheduled call, such as send_message with a file
+        calling send_file, goes straight through so one message takes one token.
+        """
+        for name in SCHEDULED_METHODS:
+            original = getattr(client, name, None)
+            if original is None:
+                continue
+            @functools.wraps(original)
+            async def scheduled(entity, *args, _original=original, **kwargs):
+                if _in_scheduled_call.get():
+                    return await _original(entity, *args, **kwargs)
+                token = _in_scheduled_call.set(True)
+                try:
+                    return await self.run(chat_key(entity), _original, entity, *args, **kwargs)
+                finally:
+                    _in_scheduled_call.reset(token)
+            setattr(client, name, scheduled)
+        logger.info(f"Outbound sends scheduled through {', '.join(SCHEDULED_METHODS)}")
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Get queue length, sent, dropped and latency counters per lane"""
+        result = {}
+        for lane, name in LANE_NAMES.items():
+            stats = self._stats[lane]
+            result[name] = {
+                'queued': len(self._queues[lane]),
+                'sent': stats['sent'],
+                'dropped': stats['dropped'],
+                'failed': stats['failed'],
+                'flood_waits': stats['flood_waits'],
+                'latency_ms_avg': stats['latency_ms_total'] / (stats['sent'] or 1),
+                'latency_ms_max': stats['latency_ms_max']
+            }
+        return result
+outbound_scheduler = OutboundScheduler()
@@ -0,0 +1,248 @@
+"""
+Polling helpers for the data caches.
+This module sends conditional requests, short-circuits unchanged payloads
+before they are decoded, and decides how often each feed is polled.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+logger = logging.getLogger('Polling')
+POLL_CHANGED = 'changed'
+POLL_NOT_MODIFIED = 'not_modified'
+POLL_UNCHANGED = 'unchanged'
+POLL_FAILED = 'failed'
+class ConditionalPoller:
+    """Fetch a URL with ETag/Last-Modified validators and a content-hash fallback"""
+    def __init__(self, url: str, timeout: float = 30, name: str = 'feed'):
+        """Initialize the poller
+        Args:
+            url: The URL to poll
+            timeout: Request timeout in seconds
+            name: Feed name used in log messages
+        """
+        self.url = url
+        self.timeout = timeout
+        self.name = name
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._content_hash: Optional[bytes] = None
+        self._pending: Optional[Tuple[bytes, Optional[str], Optional[str]]] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            'requests': 0,
+            'changed': 0,
+            'not_modified': 0,
+            'unchanged': 0,
+            'failed': 0
+        }
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+    def fetch(self) -> Tuple[str, Optional[bytes]]:
+        """Fetch the URL unless the server or the body hash says nothing changed
+        Returns:
+            Tuple of (status, raw body); the body is only set for POLL_CHANGED
+        """
+        headers = {}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+        self._count('requests')
+        try:
+            response = requests.get(self.url, headers=headers, timeout=self.timeout)
+        except Exception as e:
+            logger.error(f"Error fetching {self.name}: {str(e)}")
+            self._count('failed')
+            return POLL_FAILED, None
+        if response.status_code == 304:
+            self._count('not_modified')
+            logger.debug(f"{self.name} not modified (HTTP 304)")
+            return POLL_NOT_MODIFIED, None
+        if response.status_code != 200:
+            logger.warning(f"{self.name} request failed with status code: {response.status_code}")
+            self._count('failed')
+            return POLL_FAILED, None
+        body = response.content
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        if digest == self._content_hash:
+            self._count('unchanged')
+            logger.debug(f"{self.name} payload unchanged, skipping decode")
+            return POLL_UNCHANGED, None
+        self._pending = (digest, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return POLL_CHANGED, body
+    def accept(self):
+        """Remember the validators of the last changed payload once it was applied"""
+        if self._pending is None:
+            return
+        self._content_hash, self._etag, self._last_modified = self._pending
+        self._pending = None
+        self._count('changed')
+    def reject(self):
+        """Discard the validators of a payload that could not be applied"""
+        self._pending = None
+        self._count('failed')
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Get request counters, including how many refreshes were skipped"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['skipped'] = stats['not_modified'] + stats['unchanged']
+        return stats
+TEHRAN_TZ = timezone(timedelta(hours=3, minutes=30))
+MARKET_CALENDAR = [
+    {'days': (5, 6, 0, 1, 2), 'start': 9, 'end': 18, 'interval': 30},
+    {'days': (3,), 'start': 9, 'end': 13, 'interval': 45},
+]
+CRYPTO_CALENDAR = [
+    {'days': (0, 1, 2, 3, 4, 5, 6), 'start': 0, 'end': 24, 'interval': 60},
+]
+class FeedSchedule:
+    """Polling policy of a single feed"""
+    def __init__(self, base_interval: float, min_interval: float = 15, max_interval: float = 600,
+                 calendar: Optional[List[Dict[str, Any]]] = None, off_hours_interval: Optional[float] = None,
+                 high_volatility: float = 0.25, low_volatility: float = 0.02,
+                 spike_requests: int = 60, spike_window: float = 60):
+        """Initialize the feed schedule
+        Args:
+            base_interval: Interval used when no calendar window applies and off_hours_interval is unset
+            min_interval: Lower bound of every decision, in seconds
+            max_interval: Upper bound of every decision, in seconds
+            calendar: Tehran-time windows as dicts with days (Monday=0), start and end hours and interval
+            off_hours_interval: Interval outside every calendar window
+            high_volatility: Changed-instrument ratio above which polling speeds up
+            low_volatility: Changed-instrument ratio below which polling slows down
+            spike_requests: Requests within spike_window that trigger an early refresh
+            spike_window: Length of the request-rate window in seconds
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.calendar = calendar or []
+        self.off_hours_interval = off_hours_interval or base_interval
+        self.high_volatility = high_volatility
+        self.low_volatility = low_volatility
+        self.spike_requests = spike_requests
+        self.spike_window = spike_window
+class PollScheduler:
+    """Adaptive polling scheduler driven by a Tehran-time calendar, volatility and request rate"""
+    def __init__(self, history: int = 5):
+        """Initialize the scheduler
+        Args:
+            history: Number of recent snapshots used to estimate volatility
+        """
+        self._history = history
+        self._feeds: Dict[str, FeedSchedule] = {}
+        self._volatility: Dict[str, deque] = {}
+        self._requests: Dict[str, deque] = {}
+        self._wake: Dict[str, threading.Event] = {}
+        self._last_poll: Dict[str, float] = {}
+        self._decisions: Dict[str, Dict[str, Any]] = {}
+        self._early_refreshes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    def register(self, feed: str, schedule: FeedSchedule):
+        """Register a feed with its polling policy"""
+        with self._lock:
+            self._feeds[feed] = schedule
+            self._volatility[feed] = deque(maxlen=self._history)
+            self._requests[feed] = deque(maxlen=max(1, schedule.spike_requests))
+            self._wake[feed] = threading.Event()
+            self._last_poll[feed] = 0
+            self._early_refreshes[feed] = 0
+    def _calendar_interval(self, schedule: FeedSchedule, now: datetime) -> Tuple[float, str]:
+        """Find the calendar interval that applies at the given Tehran time"""
+        hour = now.hour + now.minute / 60
+        for window in schedule.calendar:
+            if now.weekday() in window['days'] and window['start'] <= hour < window['end']:
+                return window['interval'], f"market {window['start']:02d}-{window['end']:02d}"
+        return schedule.off_hours_interval, 'off hours'
+    def observe(self, feed: str, changed: int, total: int):
+        """Record how many instruments changed in the latest poll
+        Args:
+            feed: The feed name
+            changed: Number of instruments whose price changed
+            total: Number of instruments in the snapshot
+        """
+        with self._lock:
+            if feed in self._volatility:
+                self._volatility[feed].append(changed / total if total else 0.0)
+                self._last_poll[feed] = time.time()
+    def next_interval(self, feed: str) -> float:
+        """Decide how long to wait before the next poll of a feed"""
+        with self._lock:
+            schedule = self._feeds[feed]
+            history = list(self._volatility[feed])
+        interval, reason = self._calendar_interval(schedule, datetime.now(TEHRAN_TZ))
+        volatility = sum(history) / len(history) if history else None
+        if volatility is not None:
+            if volatility >= schedule.high_volatility:
+                interval /= 2
+                reason += ', volatile'
+            elif volatility <= schedule.low_volatility:
+                interval *= 2
+                reason += ', quiet'
+        interval = min(max(interval, schedule.min_interval), schedule.max_interval)
+        with self._lock:
+            self._decisions[feed] = {
+                'interval': interval,
+                'reason': reason,
+                'volatility': volatility,
+                'request_rate': self._request_rate(feed),
+                'next_poll_at': time.time() + interval,
+                'early_refreshes': self._early_refreshes[feed]
+            }
+        return interval
+    def wait(self, feed: str, timeout: float) -> bool:
+        """Sleep until the next poll is due or an early refresh is requested
+        Returns:
+            True if the wait was cut short by an early refresh
+        """
+        wake = self._wake[feed]
+        woken = wake.wait(timeout)
+        wake.clear()
+        return woken
+    def wake(self, feed: str):
+        """Wake a feed's poll loop immediately"""
+        if feed in self._wake:
+            self._wake[feed].set()
+    def _request_rate(self, feed: str) -> float:
+        """Get the recent request rate of a feed in requests per minute"""
+        requests_seen = self._requests[feed]
+        if len(requests_seen) < 2:
+            return 0.0
+        span = max(time.time() - requests_seen[0], 1.0)
+        return len(requests_seen) * 60 / span
+    def note_request(self, feed: str):
+        """Record a user request for a feed and refresh early when requests spike"""
+        now = time.time()
+        with self._lock:
+            schedule = self._feeds.get(feed)
+            if schedule is None:
+                return
+            requests_seen = self._requests[feed]
+            requests_seen.append(now)
+            spiking = len(requests_seen) == requests_seen.maxlen and now - requests_seen[0] <= schedule.spike_window
+            due = now - self._last_poll[feed] >= schedule.min_interval
+            if not (spiking and due):
+                return
+            self._last_poll[feed] = now
+            self._early_refreshes[feed] += 1
+        logger.info(f"Request spike on {feed}, refreshing early")
+        self.wake(feed)
+    def seconds_until_next(self, feed: str) -> float:
+        """Get the seconds left until the next scheduled poll of a feed, or 0 if unknown"""
+        with self._lock:
+            decision = self._decisions.get(feed)
+        if not decision:
+            return 0
+        return max(0.0, decision['next_poll_at'] - time.time())
+    def decisions(self) -> Dict[str, Dict[str, Any]]:
+        """Get the latest scheduling decision of every feed"""
+        with self._lock:
+            return {feed: dict(decision) for feed, decision in self._decisions.items()}
+poll_scheduler = PollScheduler()
@@ -0,0 +1,161 @@
+"""
+Per-user rate limiting for the currency bot.
+Runs ahead of every other handler and drops messages, button presses and inline
+queries from users who exceed their budget. Buckets live in parallel arrays
+indexed through one dict, refill lazily on use and are evicted once idle.
+"""
+import logging
+import time
+from array import array
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from telethon import events
+logger = logging.getLogger('RateLimit')
+KIND_MESSAGE = 'message'
+KIND_CALLBACK = 'callback'
+KIND_INLINE = 'inline'
+DEFAULT_BUDGETS: Dict[str, Tuple[float, float]] = {
+    KIND_MESSAGE: (1.0, 5),
+    KIND_CALLBACK: (2.0, 8),
+    KIND_INLINE: (2.0, 10),
+}
+THROTTLED_TEXT = "⏳ درخواست‌های شما زیاد است، لطفاً چند لحظه صبر کنید."
+MAX_OFFENDERS = 1000
+class UserBuckets:
+    """Token buckets of many users stored in parallel arrays"""
+    def __init__(self, rate: float, burst: float, sweep_interval: float = 60.0):
+        """Initialize the table
+        Args:
+            rate: Tokens added per second to each user's bucket
+            burst: Largest number of requests a user may make at once
+            sweep_interval: Seconds between evictions of full, idle buckets
+        """
+        self.rate = rate
+        self.burst = burst
+        self.sweep_interval = sweep_interval
+        self._slots: Dict[int, int] = {}
+        self._tokens = array('d')
+        self._stamps = array('d')
+        self._free: List[int] = []
+        self._last_sweep = time.monotonic()
+    def allow(self, user_id: int, now: float) -> bool:
+        """Take a token from a user's bucket, refilling it for the time since its last use
+        Returns:
+            False if the bucket is empty
+        """
+        if now - self._last_sweep >= self.sweep_interval:
+            self.evict_idle(now)
+        slot = self._slots.get(user_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._tokens[slot] = self.burst - 1
+                self._stamps[slot] = now
+            else:
+                slot = len(self._tokens)
+                self._tokens.append(self.burst - 1)
+                self._stamps.append(now)
+            self._slots[user_id] = slot
+            return True
+        tokens = min(self.burst, self._tokens[slot] + (now - self._stamps[slot]) * self.rate)
+        self._stamps[slot] = now
+        if tokens >= 1:
+            self._tokens[slot] = tokens - 1
+            return True
+        self._tokens[slot] = tokens
+        return False
+    def evict_idle(self, now: float) -> int:
+        """Forget users whose bucket has refilled completely, since a new bucket is identical
+        Returns:
+            Number of users evicted
+        """
+        self._last_sweep = now
+        tokens, stamps, rate, burst = self._tokens, self._stamps, self.rate, self.burst
+        idle = [user_id for user_id, slot in self._slots.items() if tokens[slot] + (now - stamps[slot]) * rate >= burst]
+        for user_id in idle:
+            self._free.append(self._slots.pop(user_id))
+        return len(idle)
+    def __len__(self) -> int:
+        return len(self._slots)
+class UserRateLimiter:
+    """Separate per-user budgets for messages, button presses and inline queries"""
+    def __init__(self, budgets: Dict[str, Tuple[float, float]] = DEFAULT_BUDGETS):
+        """Initialize the limiter
+        Args:
+            budgets: Rate per second and burst of each kind of request
+        """
+        self._buckets = {kind: UserBuckets(rate, burst) for kind, (rate, burst) in budgets.items()}
+        self._exempt: Set[int] = set()
+        self._is_request: Optional[Callable[[Any], bool]] = None
+        self._notified: Set[int] = set()
+        self._stats = {kind: {'allowed': 0, 'throttled': 0} for kind in budgets}
+        self._offenders: Counter = Counter()
+    def allow(self, kind: str, user_id: int) -> bool:
+        """Check and charge one request of a user"""
+        if user_id in self._exempt:
+            return True
+        if self._buckets[kind].allow(user_id, time.monotonic()):
+            self._stats[kind]['allowed'] += 1
+            return True
+        self._stats[kind]['throttled'] += 1
+        self._offenders[user_id] += 1
+        if len(self._offenders) > MAX_OFFENDERS:
+            self._offenders = Counter(dict(self._offenders.most_common(MAX_OFFENDERS // 2)))
+        return False
+    async def guard_message(self, event):
+        """Stop a message over budget, telling a private chat once per streak
+        Messages that ask the bot for nothing pass without being charged.
+        """
+        user_id = event.sender_id
+        if user_id is None or (self._is_request is not None and not self._is_request(event)):
+            return
+        if self.allow(KIND_MESSAGE, user_id):
+            self._notified.discard(user_id)
+            return
+        if event.is_private and user_id not in self._notified:
+            self._notified.add(user_id)
+            await event.respond(THROTTLED_TEXT)
+        raise events.StopPropagation
+    async def guard_callback(self, event):
+        """Stop a button press over budget, answering it with a toast"""
+        if self.allow(KIND_CALLBACK, event.sender_id):
+            return
+        await event.answer(THROTTLED_TEXT)
+        raise events.StopPropagation
+    async def guard_inline(self, event):
+        """Drop an inline query over budget"""
+        if self.allow(KIND_INLINE, event.sender_id):
+            return
+        raise events.StopPropagation
+    def register(self, client, exempt: Iterable[int] = (), is_request: Optional[Callable[[Any], bool]] = None):
+        """Register the guards ahead of every other handler
+        Args:
+            client: The Telegram client instance
+            exempt: User IDs that are never limited, such as admins
+            is_request: Tells whether a message matched a command or trigger; other messages
+                are not charged. Every message is charged when not given
+        """
+        self._exempt = set(exempt)
+        self._is_request = is_request
+        client.add_event_handler(self.guard_message, events.NewMessage(incoming=True))
+        client.add_event_handler(self.guard_callback, events.CallbackQuery())
+        client.add_event_handler(self.guard_inline, events.InlineQuery())
+        logger.info(f"Rate limiting {', '.join(self._buckets)} per user")
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Get allowed and throttled counts and tracked users per kind"""
+        return {
+            kind: {
+                'allowed': stats['allowed'],
+                'throttled': stats['throttled'],
+                'tracked': len(self._buckets[kind])
+            }
+            for kind, stats in self._stats.items()
+        }
+    def top_offenders(self, limit: int = 5) -> List[Tuple[int, int]]:
+        """Get the users throttled most often with their counts"""
+        return self._offenders.most_common(limit)
+    @property
+    def throttled_users(self) -> int:
+        """Get the number of distinct users throttled recently"""
+        return len(self._offenders)
+rate_limiter = UserRateLimiter()
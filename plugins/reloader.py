@@ -0,0 +1,281 @@
+"""
+Hot reload of the currency and gold plugin modules.
+This module loads the plugin files in plugins/ and plugins/gold/, serves all of
+their triggers through one message handler and watches the files for changes.
+A changed file is executed again and its entry in the trigger table is swapped
+in one assignment, so requests already running keep the module they started with.
+Only files whose source declares a plugin handler are executed; shared modules
+living next to the plugins are never loaded a second time.
+"""
+import ast
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from telethon import events
+from .dispatch import event_dispatcher
+from .group_replies import group_replies
+from .search import fuzzy_index
+logger = logging.getLogger('Reloader')
+PLUGIN_DIRECTORIES: Tuple[str, ...] = ('plugins', os.path.join('plugins', 'gold'))
+TRIGGER_HANDLERS = ('handle_currency', 'handle_gold')
+GOLD_COMMAND_HANDLER = 'handle_gold_command'
+GOLD_COMMAND_TRIGGER = '/gold'
+MAX_HISTORY = 50
+class LoadedPlugin:
+    """One loaded plugin file and the triggers it claimed"""
+    __slots__ = ('path', 'module', 'handler', 'triggers', 'stamp')
+    def __init__(self, path: str, module, handler: str, triggers: Tuple[str, ...], stamp: Tuple[int, int]):
+        self.path = path
+        self.module = module
+        self.handler = handler
+        self.triggers = triggers
+        self.stamp = stamp
+class ReloadReport:
+    """Outcome of loading, reloading or removing one plugin file"""
+    __slots__ = ('at', 'path', 'action', 'duration_ms', 'added', 'removed', 'error')
+    def __init__(self, path: str, action: str, duration_ms: float, added: int = 0, removed: int = 0,
+                 error: Optional[str] = None):
+        self.at = time.time()
+        self.path = path
+        self.action = action
+        self.duration_ms = duration_ms
+        self.added = added
+        self.removed = removed
+        self.error = error
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """Get the modification time and size of a file, or None if it is gone"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+def _declares_plugin(path: str) -> bool:
+    """Tell from a file's source, without executing it, whether it is a plugin
+    A plugin defines TRIGGERS with handle_currency or handle_gold, or handle_gold_command, at module level.
+    Files that cannot be read or parsed count as plugins so loading them reports the error.
+    """
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+    except (OSError, SyntaxError, ValueError):
+        return True
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Assign):
+            names.update(target.id for target in node.targets if isinstance(target, ast.Name))
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            names.add(node.target.id)
+    return GOLD_COMMAND_HANDLER in names or ('TRIGGERS' in names and not names.isdisjoint(TRIGGER_HANDLERS))
+def _execute_module(path: str):
+    """Execute a plugin file as a fresh module in its package
+    Raises:
+        Exception: Whatever the module raised while executing
+    """
+    module_name = os.path.splitext(os.path.normpath(path))[0].replace(os.sep, '.')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    if spec is None:
+        raise ImportError(f"Could not create spec for module {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[module_name] = module
+    return module
+class PluginReloader:
+    """Trigger table of the plugin modules, reloaded when their files change"""
+    def __init__(self, directories: Tuple[str, ...] = PLUGIN_DIRECTORIES, interval: float = 2.0):
+        """Initialize the reloader
+        Args:
+            directories: Directories that may hold plugin files
+            interval: Seconds between checks for changed files
+        """
+        self.directories = directories
+        self.interval = interval
+        self.client = None
+        self._plugins: Dict[str, LoadedPlugin] = {}
+        self._by_trigger: Dict[str, LoadedPlugin] = {}
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._watched: Set[str] = set()
+        self._history: Deque[ReloadReport] = deque(maxlen=MAX_HISTORY)
+        self._task: Optional[asyncio.Task] = None
+    def _plugin_files(self, directory: str) -> List[str]:
+        """List the Python files of a directory in a stable order, plugins or not"""
+        try:
+            names = sorted(
+                entry.name for entry in os.scandir(directory)
+                if entry.name.endswith('.py') and entry.name != '__init__.py'
+            )
+        except OSError:
+            return []
+        return [os.path.join(directory, name) for name in names]
+    def _swap(self, path: str, plugin: Optional[LoadedPlugin], triggers: Tuple[str, ...]) -> Tuple[int, int]:
+        """Replace the triggers of one file in the table with a single assignment
+        Args:
+            path: The plugin file
+            plugin: The new plugin, or None to remove the file
+            triggers: Triggers the new plugin asks for
+        Returns:
+            Number of triggers added and removed
+        """
+        patterns = self.client.registered_message_patterns
+        previous = self._plugins.get(path)
+        released = set(previous.triggers) if previous else set()
+        table = {trigger: owner for trigger, owner in self._by_trigger.items() if owner.path != path}
+        claimed = []
+        for trigger in triggers:
+            pattern_key = f"^{trigger}$"
+            if pattern_key in patterns and trigger not in released:
+                logger.warning(f"Skipping duplicate handler registration for trigger '{trigger}' from {path}. It's already handled.")
+                continue
+            claimed.append(trigger)
+            if plugin is not None:
+                table[trigger] = plugin
+        if plugin is not None:
+            plugin.triggers = tuple(claimed)
+            self._plugins[path] = plugin
+        else:
+            self._plugins.pop(path, None)
+        self._by_trigger = table
+        for trigger in released.difference(claimed):
+            patterns.discard(f"^{trigger}$")
+        added = [trigger for trigger in claimed if trigger not in released]
+        for trigger in added:
+            patterns.add(f"^{trigger}$")
+            fuzzy_index.add(trigger)
+        return len(added), len(released.difference(claimed))
+    def _load(self, path: str, stamp: Tuple[int, int]) -> Optional[ReloadReport]:
+        """Execute a plugin file and swap it into the table
+        Returns:
+            A report, or None for a file that defines no plugin handler
+        """
+        started = time.perf_counter()
+        reloading = path in self._plugins
+        self._stamps[path] = stamp
+        if not _declares_plugin(path):
+            if not reloading:
+                return None
+            added, removed = self._swap(path, None, ())
+            return ReloadReport(path, 'removed', (time.perf_counter() - started) * 1000, added, removed)
+        try:
+            module = _execute_module(path)
+        except Exception as e:
+            logger.error(f"Failed to load module {path}: {e}")
+            return ReloadReport(path, 'failed', (time.perf_counter() - started) * 1000, error=str(e))
+        triggers: Tuple[str, ...] = ()
+        handler = None
+        if hasattr(module, 'TRIGGERS') and hasattr(module, 'handle_currency'):
+            handler, triggers = 'handle_currency', tuple(dict.fromkeys(module.TRIGGERS))
+        elif hasattr(module, 'TRIGGERS') and hasattr(module, 'handle_gold'):
+            handler, triggers = 'handle_gold', tuple(dict.fromkeys(module.TRIGGERS))
+        elif hasattr(module, GOLD_COMMAND_HANDLER):
+            handler, triggers = GOLD_COMMAND_HANDLER, (GOLD_COMMAND_TRIGGER,)
+        if handler is None and not reloading:
+            return None
+        plugin = LoadedPlugin(path, module, handler, triggers, stamp) if handler else None
+        added, removed = self._swap(path, plugin, triggers)
+        action = 'removed' if plugin is None else 'reloaded' if reloading else 'loaded'
+        return ReloadReport(path, action, (time.perf_counter() - started) * 1000, added, removed)
+    def _unload(self, path: str) -> ReloadReport:
+        """Drop a deleted plugin file from the table"""
+        started = time.perf_counter()
+        self._stamps.pop(path, None)
+        added, removed = self._swap(path, None, ())
+        return ReloadReport(path, 'removed', (time.perf_counter() - started) * 1000, added, removed)
+    def load_directory(self, client, directory: str):
+        """Load every plugin file of a directory and register the shared handler on first use
+        Args:
+            client: The Telegram client instance
+            directory: One of the configured plugin directories
+        """
+        if self.client is None:
+            self.client = client
+            client.add_event_handler(self.handle, events.NewMessage(pattern=self.match, incoming=True))
+        self._watched.add(directory)
+        for path in self._plugin_files(directory):
+            stamp = _file_stamp(path)
+            if stamp is None:
+                continue
+            report = self._load(path, stamp)
+            if report is None:
+                continue
+            if report.action != 'failed':
+                logger.info(f"Registered {len(self._plugins[path].triggers)} triggers from {path}")
+    def match(self, text: str) -> Optional[LoadedPlugin]:
+        """Find the plugin whose trigger is exactly the message text"""
+        if not text:
+            return None
+        return self._by_trigger.get(text.strip())
+    async def _run(self, plugin: LoadedPlugin, event):
+        """Call the plugin handler with the cache data it expects on the client"""
+        client = self.client
+        data = client.currency_cache.get_data()
+        client.currency_data = data
+        if plugin.handler != 'handle_currency':
+            client.gold_data = data.get('GoldType', {}) if data else {}
+        try:
+            await getattr(plugin.module, plugin.handler)(event, client)
+        except Exception as e:
+            logger.error(f"Error in plugin {plugin.path}: {str(e)}", exc_info=True)
+    async def handle(self, event):
+        """Queue the plugin that matched on the dispatcher, unless the group was just answered"""
+        plugin = event.pattern_match
+        self.client.currency_cache.note_request()
+        if group_replies.admit(event, plugin.path):
+            future = event_dispatcher.submit(event, self._run, plugin, event)
+            group_replies.follow(event, plugin.path, future)
+    def scan(self) -> List[ReloadReport]:
+        """Reload the plugin files that changed, appeared or disappeared since the last scan
+        Returns:
+            One report per affected file
+        """
+        reports = []
+        seen = set()
+        for directory in self._watched:
+            for path in self._plugin_files(directory):
+                seen.add(path)
+                stamp = _file_stamp(path)
+                if stamp is None or self._stamps.get(path) == stamp:
+                    continue
+                report = self._load(path, stamp)
+                if report is not None:
+                    reports.append(report)
+        for path in [path for path in self._stamps if path not in seen]:
+            if path in self._plugins:
+                reports.append(self._unload(path))
+            else:
+                self._stamps.pop(path)
+        for report in reports:
+            self._history.append(report)
+            logger.info(f"Plugin {report.path} {report.action} in {report.duration_ms:.1f}ms "
+                        f"(+{report.added}/-{report.removed} triggers){f': {report.error}' if report.error else ''}")
+        return reports
+    async def watch(self):
+        """Check the plugin files for changes until stopped"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"Error checking plugin files: {str(e)}")
+    def start(self):
+        """Start watching the loaded plugin directories"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.watch())
+            logger.info(f"Watching {len(self._watched)} plugin directories every {self.interval}s")
+    def stop(self):
+        """Stop watching"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    @property
+    def history(self) -> List[ReloadReport]:
+        """Get the most recent reports, newest first"""
+        return list(reversed(self._history))
+    def __len__(self) -> int:
+        return len(self._plugins)
+plugin_reloader = PluginReloader()
@@ -0,0 +1,6 @@
+"""
+Search module for the currency bot.
+This module handles typo-tolerant lookup of currency, gold and crypto triggers.
+"""
+from .fuzzy_index import fuzzy_index, normalize_text
+from .fuzzy_handler import register_fuzzy_handlers, is_request_message
@@ -0,0 +1,64 @@
+"""
+"Did you mean" handler for the currency bot.
+This module answers messages that miss every exact trigger with the closest known alias.
+"""
+import logging
+import re
+from telethon import events
+from telethon.tl.custom import Button
+from .fuzzy_index import fuzzy_index
+logger = logging.getLogger(__name__)
+MAX_QUERY_LENGTH = 32
+MAX_QUERY_WORDS = 3
+DIGIT_PATTERN = re.compile(r'[\d۰-۹]')
+AMOUNT_PATTERN = re.compile(r'^[\d۰-۹\.,\s]+|[\d۰-۹\.,\s]+$')
+CONVERSION_PATTERN = re.compile(r'\d+\s*[a-zA-Z\u0600-\u06FF]+')
+def is_candidate_query(text: str) -> bool:
+    """Check whether a message looks like a mistyped instrument name"""
+    if not text or len(text) > MAX_QUERY_LENGTH or text.startswith('/'):
+        return False
+    if DIGIT_PATTERN.search(text):
+        return False
+    return len(text.split()) <= MAX_QUERY_WORDS
+def is_request_message(event) -> bool:
+    """Check whether a message asks the bot for something
+    Commands, exact triggers with or without an amount and conversions are requests
+    everywhere; in private chats so is anything the fuzzy fallback would answer.
+    """
+    text = (event.raw_text or '').strip()
+    if not text:
+        return False
+    if text.startswith('/') or CONVERSION_PATTERN.match(text):
+        return True
+    if fuzzy_index.is_exact(text) or fuzzy_index.is_exact(AMOUNT_PATTERN.sub('', text)):
+        return True
+    return bool(event.is_private) and is_candidate_query(text)
+async def handle_fuzzy_fallback(event):
+    """Suggest the closest trigger when no exact handler matched the message"""
+    if getattr(event.message, 'via_bot_id', None):
+        return
+    text = (event.raw_text or '').strip()
+    if not is_candidate_query(text) or fuzzy_index.is_exact(text):
+        return
+    match = fuzzy_index.lookup(text)
+    if not match:
+        return
+    suggestion, distance = match
+    logger.info(f"Fuzzy match for '{text}': '{suggestion}' (distance {distance})")
+    buttons = [
+        [Button.switch_inline(f"🔎 {suggestion}", query=suggestion, same_peer=True)]
+    ]
+    await event.reply(
+        f"🤔 منظورتان «{suggestion}» بود؟\n\nبرای دریافت نرخ، «{suggestion}» را ارسال کنید.",
+        buttons=buttons
+    )
+def register_fuzzy_handlers(client):
+    """Build the fuzzy index and register the fallback handler
+    Must be called after every exact trigger handler has been registered.
+    """
+    fuzzy_index.build()
+    client.add_event_handler(
+        handle_fuzzy_fallback,
+        events.NewMessage(incoming=True, func=lambda e: e.is_private)
+    )
+    logger.info("Registered fuzzy fallback handler")
@@ -0,0 +1,163 @@
+"""
+Fuzzy index for trigger aliases.
+This module builds a SymSpell-style deletion dictionary over every trigger alias
+so misspelled queries can be mapped back to a known trigger.
+"""
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+logger = logging.getLogger(__name__)
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ـ': None,
+    '‌': ' ',
+    '‏': None,
+    '‎': None,
+})
+WHITESPACE_PATTERN = re.compile(r'\s+')
+def normalize_text(text: str) -> str:
+    """Normalize a query or alias for comparison
+    Args:
+        text: The raw text
+    Returns:
+        Lower-cased text with unified Persian letters and collapsed whitespace
+    """
+    text = str(text).translate(CHARACTER_MAP).lower()
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+def edit_distance(source: str, target: str, max_distance: int) -> int:
+    """Compute the optimal string alignment distance, bounded by max_distance
+    Args:
+        source: The first string
+        target: The second string
+        max_distance: Distances above this value are reported as max_distance + 1
+    Returns:
+        The edit distance, or max_distance + 1 if it exceeds the bound
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        row_minimum = i
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            if value < row_minimum:
+                row_minimum = value
+        if row_minimum > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+class FuzzyIndex:
+    """Deletion-dictionary index mapping misspelled text to known trigger aliases"""
+    def __init__(self, max_distance: int = 2, prefix_length: int = 8, min_query_length: int = 3):
+        """Initialize the fuzzy index
+        Args:
+            max_distance: Largest edit distance ever accepted
+            prefix_length: Number of leading characters used to generate deletes
+            min_query_length: Shorter queries are never corrected
+        """
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_query_length = min_query_length
+        self._aliases: Dict[str, Tuple[str, int]] = {}
+        self._deletes: Dict[str, List[str]] = {}
+        self._built = False
+        self._lock = threading.Lock()
+    def add(self, alias: str, target: Optional[str] = None):
+        """Register a trigger alias
+        Args:
+            alias: The trigger text as typed by users
+            target: The trigger that should be suggested (defaults to alias)
+        """
+        key = normalize_text(alias)
+        if not key or key in self._aliases:
+            return
+        with self._lock:
+            self._aliases[key] = (target or alias, len(self._aliases))
+            self._built = False
+    def add_many(self, aliases):
+        """Register several trigger aliases at once"""
+        for alias in aliases:
+            if alias:
+                self.add(alias)
+    def _generate_deletes(self, text: str, max_distance: int) -> Set[str]:
+        """Generate every string reachable from text by up to max_distance deletions"""
+        results = {text}
+        frontier = {text}
+        for _ in range(max_distance):
+            next_frontier = set()
+            for word in frontier:
+                if len(word) <= 1:
+                    continue
+                for i in range(len(word)):
+                    deleted = word[:i] + word[i + 1:]
+                    if deleted not in results:
+                        next_frontier.add(deleted)
+            results.update(next_frontier)
+            frontier = next_frontier
+        return results
+    def build(self):
+        """Build the deletion dictionary from all registered aliases"""
+        with self._lock:
+            deletes: Dict[str, List[str]] = {}
+            for key in self._aliases:
+                for deleted in self._generate_deletes(key[:self.prefix_length], self.max_distance):
+                    deletes.setdefault(deleted, []).append(key)
+            self._deletes = deletes
+            self._built = True
+        logger.info(f"Built fuzzy index with {len(self._aliases)} aliases and {len(self._deletes)} delete entries")
+    def is_exact(self, text: str) -> bool:
+        """Check whether text is already a known alias"""
+        return normalize_text(text) in self._aliases
+    def allowed_distance(self, query: str) -> int:
+        """Get the edit distance allowed for a query of this length"""
+        if len(query) <= 4:
+            return min(1, self.max_distance)
+        return self.max_distance
+    def lookup(self, text: str) -> Optional[Tuple[str, int]]:
+        """Find the best alias within the allowed edit distance
+        Args:
+            text: The query text
+        Returns:
+            Tuple of (suggested trigger, distance) or None if nothing is close enough
+        """
+        query = normalize_text(text)
+        if len(query) < self.min_query_length:
+            return None
+        if not self._built:
+            self.build()
+        exact = self._aliases.get(query)
+        if exact:
+            return exact[0], 0
+        max_distance = self.allowed_distance(query)
+        best: Optional[Tuple[int, int, int, str]] = None
+        seen: Set[str] = set()
+        for deleted in self._generate_deletes(query[:self.prefix_length], max_distance):
+            for candidate in self._deletes.get(deleted, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(query, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                target, order = self._aliases[candidate]
+                rank = (distance, abs(len(candidate) - len(query)), order, target)
+                if best is None or rank < best:
+                    best = rank
+        if best is None:
+            return None
+        return best[3], best[0]
+    def __len__(self) -> int:
+        return len(self._aliases)
+fuzzy_index = FuzzyIndex()
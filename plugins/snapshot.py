@@ -0,0 +1,90 @@
+"""
+Snapshot persistence for the data caches.
+This module stores the last known good payload of a cache on disk so a restarted
+bot can answer immediately while the first live fetch is still running.
+"""
+import json
+import logging
+import os
+import time
+import zlib
+from typing import Any, Optional, Tuple
+logger = logging.getLogger('Snapshot')
+SNAPSHOT_VERSION = 1
+STALE_NOTE = "⚠️ داده‌های ذخیره‌شده ({age} پیش)، در انتظار بروزرسانی"
+def save_snapshot(path: str, payload: Any, saved_at: Optional[float] = None) -> bool:
+    """Atomically write a compressed snapshot to disk
+    Args:
+        path: Destination file path
+        payload: JSON-serializable cache payload
+        saved_at: Timestamp of the data (defaults to now)
+    Returns:
+        True if the snapshot was written, False otherwise
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        document = {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': saved_at if saved_at is not None else time.time(),
+            'data': payload
+        }
+        encoded = json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(encoded, 6))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logger.error(f"Error saving snapshot {path}: {str(e)}")
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+def load_snapshot(path: str) -> Optional[Tuple[Any, float]]:
+    """Load a snapshot written by save_snapshot
+    Args:
+        path: Snapshot file path
+    Returns:
+        Tuple of (payload, saved_at) or None if there is no usable snapshot
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            document = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        if document.get('version') != SNAPSHOT_VERSION or 'data' not in document:
+            logger.warning(f"Ignoring snapshot {path} with unsupported format")
+            return None
+        saved_at = float(document.get('saved_at', 0))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Loaded snapshot {path} ({time.time() - saved_at:.0f}s old) in {elapsed_ms:.1f}ms")
+        return document['data'], saved_at
+    except Exception as e:
+        logger.error(f"Error loading snapshot {path}: {str(e)}")
+        return None
+def format_age(seconds: float) -> str:
+    """Format an age in seconds as a short Persian phrase"""
+    if seconds < 60:
+        return "چند ثانیه"
+    if seconds < 3600:
+        return f"{int(seconds / 60)} دقیقه"
+    if seconds < 86400:
+        return f"{int(seconds / 3600)} ساعت"
+    return f"{int(seconds / 86400)} روز"
+def stale_note(cache) -> str:
+    """Get the line that marks data restored from a snapshot with its age
+    Args:
+        cache: A cache with is_stale and data_age
+    Returns:
+        The note, or an empty string once live data has been fetched
+    """
+    if not cache.is_stale:
+        return ''
+    return STALE_NOTE.format(age=format_age(cache.data_age))
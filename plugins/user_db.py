@@ -6,17 +6,21 @@ import os
 import json
 import logging
 import sqlite3
+import threading
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger('UserDB')
+BUSY_TIMEOUT = 30.0
 class UserDatabase:
     """Database for storing user information"""
     def __init__(self, db_path: str = 'data/users.db'):
         """Initialize the user database
+        Writes may run in executor threads, so they wait for a migration's write lock
+        off the event loop and are serialized on the shared cursor.
         Args:
             db_path: Path to the SQLite database file
         """
@@ -24,13 +28,14 @@ class UserDatabase:
         self.db_path = db_path
         self.conn = None
         self.cursor = None
+        self._lock = threading.RLock()
         self._connect()
         self._create_tables()
         logger.info(f"User database initialized at {db_path}")
     def _connect(self):
         """Connect to the SQLite database"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
             self.cursor = self.conn.cursor()
             logger.debug("Connected to the user database")
         except sqlite3.Error as e:
@@ -68,7 +73,8 @@ class UserDatabase:
             raise
     def add_user(self, user_id: int, username: Optional[str] = None,
                  first_name: Optional[str] = None, last_name: Optional[str] = None,
-                 is_bot: bool = False, language_code: Optional[str] = None) -> bool:
+                 is_bot: bool = False, language_code: Optional[str] = None,
+                 access_hash: Optional[int] = None) -> bool:
         """Add a new user or update an existing user
         Args:
             user_id: The Telegram user ID
@@ -77,9 +83,15 @@ class UserDatabase:
             last_name: The user's last name
             is_bot: Whether the user is a bot
             language_code: The user's language code
+            access_hash: The access hash the bot sees the user with, kept if None
         Returns:
             True if successful, False otherwise
         """
+        with self._lock:
+            return self._add_user(user_id, username, first_name, last_name, is_bot, language_code, access_hash)
+    def _add_user(self, user_id: int, username: Optional[str], first_name: Optional[str], last_name: Optional[str],
+                  is_bot: bool, language_code: Optional[str], access_hash: Optional[int]) -> bool:
+        """Add or update a user while holding the write lock"""
         try:
             current_time = int(time.time())
             if username:
@@ -91,15 +103,16 @@ class UserDatabase:
                 self.cursor.execute('''
                     UPDATE users
                     SET username = ?, first_name = ?, last_name = ?,
-                        language_code = ?, last_seen = ?, interaction_count = ?
+                        language_code = ?, last_seen = ?, interaction_count = ?,
+                        access_hash = COALESCE(?, access_hash)
                     WHERE user_id = ?
                 ''', (username, first_name, last_name, language_code,
-                      current_time, interaction_count, user_id))
+                      current_time, interaction_count, access_hash, user_id))
                 logger.debug(f"Updated user {user_id} ({username}), interaction count: {interaction_count}")
             else:
                 self.cursor.execute('''
-                    INSERT INTO users (user_id, username, first_name, last_name, is_bot, language_code, first_seen, last_seen, interaction_count)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+                    INSERT INTO users (user_id, username, first_name, last_name, is_bot, language_code, first_seen, last_seen, interaction_count, access_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
                     ON CONFLICT(user_id) DO UPDATE SET
                         username = COALESCE(excluded.username, username),
                         first_name = COALESCE(excluded.first_name, first_name),
@@ -107,8 +120,9 @@ class UserDatabase:
                         is_bot = COALESCE(excluded.is_bot, is_bot),
                         language_code = COALESCE(excluded.language_code, language_code),
                         last_seen = excluded.last_seen,
-                        interaction_count = users.interaction_count + 1
-                ''', (user_id, username, first_name, last_name, is_bot, language_code, current_time, current_time))
+                        interaction_count = users.interaction_count + 1,
+                        access_hash = COALESCE(excluded.access_hash, access_hash)
+                ''', (user_id, username, first_name, last_name, is_bot, language_code, current_time, current_time, access_hash))
             self.conn.commit()
             self.log_user_action(user_id, 'user_updated')
             return True
@@ -200,6 +214,16 @@ class UserDatabase:
         except sqlite3.Error as e:
             logger.error(f"Error getting all users: {str(e)}")
             return []
+    def get_delivery_targets(self) -> List[Tuple[int, Optional[int]]]:
+        """Get the ID and stored access hash of every user, for bulk delivery
+        Returns:
+            List of (user_id, access_hash) tuples; access_hash is None for users not seen since it was stored
+        """
+        try:
+            return self.conn.execute("SELECT user_id, access_hash FROM users").fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error getting delivery targets: {str(e)}")
+            return []
     def get_user_count(self) -> int:
         """Get the total number of users in the database
         Returns:
@@ -220,23 +244,24 @@ class UserDatabase:
         Returns:
             True if successful, False otherwise
         """
-        try:
-            current_time = int(time.time())
-            self.cursor.execute('''
-                INSERT INTO user_stats (user_id, action, timestamp)
-                VALUES (?, ?, ?)
-            ''', (user_id, action, current_time))
-            self.cursor.execute('''
-                UPDATE users
-                SET last_seen = ?, interaction_count = interaction_count + 1
-                WHERE user_id = ?
-            ''', (current_time, user_id))
-            self.conn.commit()
-            return True
-        except sqlite3.Error as e:
-            logger.error(f"Error logging action for user {user_id}: {str(e)}")
-            self.conn.rollback()
-            return False
+        with self._lock:
+            try:
+                current_time = int(time.time())
+                self.cursor.execute('''
+                    INSERT INTO user_stats (user_id, action, timestamp)
+                    VALUES (?, ?, ?)
+                ''', (user_id, action, current_time))
+                self.cursor.execute('''
+                    UPDATE users
+                    SET last_seen = ?, interaction_count = interaction_count + 1
+                    WHERE user_id = ?
+                ''', (current_time, user_id))
+                self.conn.commit()
+                return True
+            except sqlite3.Error as e:
+                logger.error(f"Error logging action for user {user_id}: {str(e)}")
+                self.conn.rollback()
+                return False
     def close(self):
         """Close the database connection"""
         if self.conn:
@@ -6,7 +6,7 @@ async def handle_currency(event, client):
     """Handle ین ژاپن currency requests"""
     data = event.client.currency_data
     if not data:
-        await event.respond('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
+        await event.reply('متاسفانه در حال حاضر امکان دریافت اطلاعات نرخ ارز وجود ندارد. ❌')
         return
     currencies = data.get('mainCurrencies', {}).get('data', [])
     currency_info = next((c for c in currencies if c['currencyName'] == 'ین ژاپن'), None)
@@ -14,7 +14,7 @@ async def handle_currency(event, client):
         currencies = data.get('minorCurrencies', {}).get('data', [])
         currency_info = next((c for c in currencies if c['currencyName'] == 'ین ژاپن'), None)
     if not currency_info:
-        await event.respond('اطلاعات ین ژاپن در حال حاضر در دسترس نیست. ❌')
+        await event.reply('اطلاعات ین ژاپن در حال حاضر در دسترس نیست. ❌')
         return
     price = format_number(currency_info['livePrice'])
     change = format_change(currency_info['change'])
@@ -28,7 +28,7 @@ async def handle_currency(event, client):
         [Button.inline("⬆️ بیشترین", b'noop'), Button.inline(f"{highest}", b'noop')],
         [Button.inline("🕒 بروزرسانی", b'noop'), Button.inline(f"{time}", b'noop')],
         [Button.url("📢 کانال ما", "https://t.me/TelebotCraft")],
-        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{(await client.get_me()).username}?startgroup=true")]
+        [Button.url("➕ افزودن ربات به گروه", f"https://t.me/{client.bot_username}?startgroup=true")]
     ]
     message = f"🇯🇵 نرخ لحظه‌ای ین ژاپن:"
-    await event.respond(message, buttons=buttons)
+    await event.reply(message, buttons=buttons)
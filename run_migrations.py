@@ -1,36 +1,135 @@
 """
 Run database migrations
+Every applied migration is recorded in the schema_version table, so a boot
+against an up-to-date database only compares file names with one query.
+A migration module defines upgrade(conn), which runs inside a transaction the
+runner commits together with its schema_version row; it must not commit itself.
+Migrations that set ONLINE = True, such as index builds on large tables, are
+left out of the boot pass and applied by run_migrations(online=True) while the
+bot is already serving.
+Separately from the migrations, the boot pass switches the database to WAL
+journal mode, so readers are not blocked while an online migration writes.
+The switch is persistent: the database stays in WAL mode, with its -wal and -shm
+files next to it while connections are open, and is only changed once.
 """
 import os
-import sys
+import time
 import logging
+import sqlite3
+import importlib.util
 from pathlib import Path
+from types import ModuleType
+from typing import Dict
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger('migrations')
-def run_migrations():
-    """Run all migration scripts in the migrations directory"""
-    migrations_dir = Path(__file__).parent / 'migrations'
+DB_PATH = os.path.join('data', 'users.db')
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+SCHEMA_TABLE = 'schema_version'
+JOURNAL_MODE = 'wal'
+def discover_migrations(migrations_dir: Path = MIGRATIONS_DIR) -> Dict[int, Path]:
+    """Find the migration files, keyed by the version number that prefixes their name
+    Raises:
+        ValueError: If two files share a version number
+    """
+    migrations: Dict[int, Path] = {}
     if not migrations_dir.exists():
-        logger.info("No migrations directory found")
-        return
-    migration_files = sorted([f for f in migrations_dir.glob('*.py')
-                            if f.name != '__init__.py' and f.name.startswith(('0', '1', '2', '3', '4', '5', '6', '7', '8', '9'))])
-    if not migration_files:
-        logger.info("No migration files found")
-        return
-    logger.info(f"Found {len(migration_files)} migration(s) to run")
-    sys.path.insert(0, str(migrations_dir.parent))
-    for migration_file in migration_files:
-        try:
-            module_name = f"migrations.{migration_file.stem}"
-            logger.info(f"Running migration: {module_name}")
-            module = __import__(module_name, fromlist=['run_migration'])
-            module.run_migration()
-        except Exception as e:
-            logger.error(f"Error running migration {migration_file.name}: {str(e)}")
-            raise
+        return migrations
+    for entry in os.scandir(migrations_dir):
+        name = entry.name
+        if not name.endswith('.py') or not name[:1].isdigit():
+            continue
+        version = int(name.split('_', 1)[0].split('.', 1)[0])
+        if version in migrations:
+            raise ValueError(f"Migrations {migrations[version].name} and {name} share version {version}")
+        migrations[version] = Path(entry.path)
+    return migrations
+def _load_migration(path: Path) -> ModuleType:
+    """Import a migration module from its file"""
+    spec = importlib.util.spec_from_file_location(f"migrations.{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, 'upgrade'):
+        raise AttributeError(f"Migration {path.name} does not define upgrade(conn)")
+    return module
+def _apply(conn: sqlite3.Connection, version: int, name: str, module: ModuleType):
+    """Apply one migration and record it in a single transaction"""
+    started = time.perf_counter()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        module.upgrade(conn)
+        conn.execute(
+            f"INSERT INTO {SCHEMA_TABLE} (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+            (version, name, int(time.time()), (time.perf_counter() - started) * 1000)
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    logger.info(f"Applied migration {name} in {(time.perf_counter() - started) * 1000:.1f}ms")
+def ensure_journal_mode(conn: sqlite3.Connection, mode: str = JOURNAL_MODE) -> bool:
+    """Switch the database to the given journal mode if it is not already in it
+    Returns:
+        True if the mode was changed
+    """
+    current = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    if current.lower() == mode:
+        return False
+    changed = conn.execute(f'PRAGMA journal_mode={mode}').fetchone()[0]
+    if changed.lower() != mode:
+        logger.warning(f"Could not switch the database from {current} to {mode} journal mode")
+        return False
+    logger.info(f"Switched the database from {current} to {mode} journal mode")
+    return True
+def run_migrations(db_path: str = DB_PATH, online: bool = False, migrations_dir: Path = MIGRATIONS_DIR) -> int:
+    """Apply the pending migrations in version order
+    Args:
+        db_path: Path to the SQLite database file
+        online: Apply the ONLINE migrations instead of the ones that must finish before boot
+        migrations_dir: Directory holding the migration files
+    Returns:
+        Number of migrations applied
+    """
+    if not os.path.exists(db_path):
+        logger.info("Database file not found, nothing to migrate")
+        return 0
+    available = discover_migrations(migrations_dir)
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at INTEGER NOT NULL,
+                duration_ms REAL NOT NULL
+            )
+        ''')
+        if not online:
+            ensure_journal_mode(conn)
+        applied = {row[0] for row in conn.execute(f"SELECT version FROM {SCHEMA_TABLE}")}
+        pending = sorted(version for version in available if version not in applied)
+        if not pending:
+            logger.debug(f"Database schema is up to date at version {max(applied, default=0)}")
+            return 0
+        count = 0
+        for version in pending:
+            path = available[version]
+            module = _load_migration(path)
+            if bool(getattr(module, 'ONLINE', False)) != online:
+                if not online:
+                    logger.info(f"Deferring online migration {path.stem} until after startup")
+                continue
+            try:
+                _apply(conn, version, path.stem, module)
+            except Exception as e:
+                logger.error(f"Error running migration {path.name}: {str(e)}")
+                raise
+            count += 1
+        return count
+    finally:
+        conn.close()
 if __name__ == "__main__":
     run_migrations()
+    run_migrations(online=True)